@@ -0,0 +1,79 @@
+"""
+Compares GML with the binary graph format of ``save_graph_binary``.
+
+Run from the repository root:
+
+    python benchmarks/bench_graph_storage.py --nodes 20000
+    python benchmarks/bench_graph_storage.py --gml data/Gorokhova_friends_network_new_updated.gml
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import networkx as nx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from code.get_friends import load_graph_arrays, load_graph_binary, save_graph, save_graph_binary  # noqa: E402
+
+
+def synthetic_friends_graph(num_nodes: int, avg_degree: int = 20, seed: int = 0) -> nx.Graph:
+    """
+    Builds a friends graph with VK-like string IDs and node attributes.
+    """
+    rng = random.Random(seed)
+    base = nx.barabasi_albert_graph(num_nodes, max(1, avg_degree // 2), seed=seed)
+    ids = {node: str(rng.randint(1, 10 ** 9)) for node in base}
+    G = nx.relabel_nodes(base, ids)
+    for node in G:
+        G.nodes[node].update({
+            'vk_id': node,
+            'name': f'Name{node} Surname{node}',
+            'sex': rng.choice(['female', 'male']),
+            'city': {'id': rng.randint(1, 100), 'title': f'City{rng.randint(1, 100)}'},
+            'friends_count': rng.randint(0, 5000),
+        })
+    return G
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def directory_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=10000, help='size of the synthetic graph')
+    parser.add_argument('--gml', default='', help='benchmark an existing GML file instead')
+    args = parser.parse_args()
+
+    graph = nx.read_gml(args.gml) if args.gml else synthetic_friends_graph(args.nodes)
+    print(f"Nodes: {graph.number_of_nodes()}, edges: {graph.number_of_edges()}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gml_path = os.path.join(tmp, 'graph.gml')
+        binary_path = os.path.join(tmp, 'graph')
+        results = [
+            ('write GML', timed(save_graph, graph, gml_path)[0], directory_size(gml_path)),
+            ('write binary', timed(save_graph_binary, graph, binary_path)[0], directory_size(binary_path)),
+            ('read GML', timed(nx.read_gml, gml_path)[0], None),
+            ('read binary -> nx.Graph', timed(load_graph_binary, binary_path)[0], None),
+            ('mmap binary arrays', timed(load_graph_arrays, binary_path)[0], None),
+        ]
+
+    print(f"{'operation':<26}{'seconds':>10}{'size, KB':>12}")
+    for name, seconds, size in results:
+        print(f"{name:<26}{seconds:>10.4f}{'' if size is None else f'{size / 1024:.0f}':>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Measures how the BFS distance sweep scales with the number of worker processes.
+
+Run from the repository root:
+
+    python benchmarks/bench_parallel_bfs.py --nodes 20000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from distances import as_csr, parallel_bfs_sweep  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=10000, help='size of the Barabasi-Albert test graph')
+    parser.add_argument('--m', type=int, default=5, help='edges added per node')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    graph = as_csr(nx.barabasi_albert_graph(args.nodes, args.m, seed=0))
+    print(f"Nodes: {graph.number_of_nodes()}, edges: {graph.number_of_edges()}, cores: {os.cpu_count()}")
+
+    reference = None
+    print(f"{'workers':>8}{'seconds':>10}{'speedup':>10}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        stats = parallel_bfs_sweep(graph, workers=workers)
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference = (seconds, stats)
+        elif not np.array_equal(stats.histogram, reference[1].histogram):
+            raise RuntimeError(f"{workers} workers gave a different distance histogram")
+        print(f"{workers:>8}{seconds:>10.3f}{reference[0] / seconds:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
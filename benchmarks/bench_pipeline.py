@@ -0,0 +1,251 @@
+"""
+Times and memory-profiles every stage of the crawl -> build -> analyse -> plot pipeline.
+
+Works offline: friend-of-friend JSON files are generated at the requested sizes,
+and the crawl stage runs against the local stub VK API (``code/vk_stub_server.py``).
+Results are written as JSON and can be compared with a stored baseline; the
+script exits with status 1 if a stage got slower than the tolerance allows.
+
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 --output results.json
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 --output baseline.json
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 --baseline baseline.json --tolerance 0.25
+    python benchmarks/bench_pipeline.py --sizes 100000 1000000 --stages create_graph_from_json save_graph_binary
+
+Large sizes skip the stages that do not scale to them (see ``--exact-limit``,
+``--plot-limit`` and ``--crawl-limit``); skipped stages are recorded as such.
+"""
+import argparse
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import matplotlib
+matplotlib.use('Agg')
+import networkx as nx  # noqa: E402
+import numpy as np  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+from code.crawler import fetch_friends_of_each_friend_concurrent  # noqa: E402
+from code.get_friends import create_graph_from_json, save_graph, save_graph_binary  # noqa: E402
+from code.vk_stub_server import StubVKServer, generate_friendships  # noqa: E402
+from metrics_cache import metrics_cache  # noqa: E402
+from plot_utils import show_graph  # noqa: E402
+from random_graphs import barabasi_albert_graph  # noqa: E402
+from utils_for_analysis import compare_network_models, get_network_summary  # noqa: E402
+
+STAGES = ('crawl', 'create_graph_from_json', 'save_graph', 'save_graph_binary', 'get_network_summary',
+          'compare_network_models', 'show_graph')
+
+
+def write_friends_json(path: str, num_friends: int, avg_friends: int = 20, outside_friends: int = 20,
+                       seed: int = 0) -> None:
+    """
+    Writes a synthetic friend-of-friend file in the format of ``fetch_friends_of_each_friend``.
+
+    Mutual friendships follow a Barabási–Albert graph on the friends, so degrees
+    are heavy-tailed like in real ego networks. Every record also lists
+    ``outside_friends`` IDs of people outside the network, which the graph
+    builder has to skip. Records are written one at a time.
+
+    Args:
+        path (str): Output JSON file.
+        num_friends (int): Number of friends (nodes).
+        avg_friends (int): Average number of mutual friends.
+        outside_friends (int): Friends outside the network per record.
+        seed (int): Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(10 ** 9, size=num_friends + num_friends * outside_friends // 4 + 1, replace=False) + 1
+    friend_ids, outside_ids = ids[:num_friends], ids[num_friends:]
+    graph = barabasi_albert_graph(num_friends, max(1, min(avg_friends // 2, num_friends - 1)), seed=seed)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[')
+        for i in range(num_friends):
+            mutual = friend_ids[graph.neighbors(i)]
+            outside = outside_ids[rng.integers(0, len(outside_ids), size=outside_friends)]
+            record = {
+                'id': int(friend_ids[i]),
+                'first_name': f'Name{i}',
+                'last_name': f'Surname{i}',
+                'sex': int(rng.integers(1, 3)),
+                'city': {'id': int(i % 100), 'title': f'City{i % 100}'},
+                'friends_ids': [str(friend) for friend in np.concatenate([mutual, outside]).tolist()],
+            }
+            file.write((',\n' if i else '') + json.dumps(record, ensure_ascii=False))
+        file.write(']\n')
+
+
+def run_crawl(num_users: int, avg_friends: int, requests_per_second: int) -> int:
+    """Crawls the friends of user 1 from the stub API; returns the number of records."""
+    friendships = generate_friendships(num_users, avg_friends=avg_friends)
+    with StubVKServer(friendships, requests_per_second=requests_per_second) as server:
+        friends = fetch_friends_of_each_friend_concurrent('1', 'offline-token', requests_per_second=requests_per_second,
+                                                          batch_size=25, api_url=server.url)
+    return len(friends)
+
+
+def measure(function: Callable[[], Any], repeat: int, memory: bool,
+            profile_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs a stage ``repeat`` times for the best wall time, then once more under
+    ``tracemalloc`` for the peak of traced allocations (so tracing does not skew the times).
+    """
+    times, result = [], None
+    for _ in range(repeat):
+        metrics_cache.clear()
+        start = time.perf_counter()
+        if profile_path is not None and not times:
+            profiler = cProfile.Profile()
+            result = profiler.runcall(function)
+            profiler.dump_stats(profile_path)
+        else:
+            result = function()
+        times.append(time.perf_counter() - start)
+    measurement = {'seconds': min(times), 'runs': len(times)}
+    if memory:
+        metrics_cache.clear()
+        tracemalloc.start()
+        function()
+        measurement['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    measurement['result'] = result
+    return measurement
+
+
+def run_size(size: int, args: argparse.Namespace, directory: str) -> List[Dict[str, Any]]:
+    json_path = os.path.join(directory, f'friends_{size}.json')
+    write_friends_json(json_path, size, avg_friends=args.avg_friends, seed=args.seed)
+    graph = create_graph_from_json(json_path)
+    exact = size <= args.exact_limit
+
+    stages = {
+        'crawl': (size <= args.crawl_limit,
+                  lambda: run_crawl(size, args.avg_friends, args.requests_per_second)),
+        'create_graph_from_json': (True, lambda: create_graph_from_json(json_path)),
+        'save_graph': (True, lambda: save_graph(graph, os.path.join(directory, 'graph.gml'))),
+        'save_graph_binary': (True, lambda: save_graph_binary(graph, os.path.join(directory, 'graph'))),
+        'get_network_summary': (True, lambda: get_network_summary(graph, approximate=not exact,
+                                                                  time_budget=None if exact else 60.0)),
+        'compare_network_models': (exact, lambda: compare_network_models(
+            graph, degree_sequence(graph), p=2 * graph.number_of_edges() / max(size * (size - 1), 1),
+            m_ba=max(1, args.avg_friends // 2))),
+        'show_graph': (size <= args.plot_limit, lambda: show_graph(
+            graph, figsize=(20, 12), show=False, save_file=os.path.join(directory, 'graph.png'))),
+    }
+
+    records = []
+    for stage in args.stages:
+        enabled, function = stages[stage]
+        record = {'size': size, 'stage': stage, 'nodes': graph.number_of_nodes(), 'edges': graph.number_of_edges()}
+        if stage == 'get_network_summary':
+            record['approximate'] = not exact
+        if not enabled:
+            record['status'] = 'skipped'
+        else:
+            profile_path = os.path.join(args.profile_dir, f'{stage}_{size}.prof') if args.profile_dir else None
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if not args.verbose else sys.stdout):
+                measurement = measure(function, args.repeat, not args.no_memory, profile_path)
+            result = measurement.pop('result')
+            if stage == 'crawl':
+                record['records'] = result
+            record.update(measurement, status='ok')
+        records.append(record)
+        print(format_record(record), flush=True)
+    return records
+
+
+def degree_sequence(graph: nx.Graph) -> np.ndarray:
+    return np.array([degree for _, degree in graph.degree()])
+
+
+def format_record(record: Dict[str, Any], ratio: Optional[float] = None) -> str:
+    if record['status'] != 'ok':
+        return f"{record['size']:>9}  {record['stage']:<24}{'skipped':>10}"
+    memory = f"{record['peak_memory_mb']:>10.1f}" if 'peak_memory_mb' in record else f"{'-':>10}"
+    line = f"{record['size']:>9}  {record['stage']:<24}{record['seconds']:>10.3f}{memory}"
+    return line if ratio is None else f"{line}{ratio:>9.2f}x"
+
+
+def compare_with_baseline(records: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Prints every stage's time relative to the baseline run and returns the regressions,
+    i.e. stages more than ``tolerance`` (a fraction) slower than in the baseline.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = {(record['size'], record['stage']): record for record in json.load(file)['results']}
+    print(f"\nCompared with {baseline_path}:")
+    regressions = []
+    for record in records:
+        reference = baseline.get((record['size'], record['stage']))
+        if record['status'] != 'ok' or reference is None or reference.get('status') != 'ok':
+            continue
+        ratio = record['seconds'] / reference['seconds'] if reference['seconds'] else float('inf')
+        print(format_record(record, ratio) + ('  REGRESSION' if ratio > 1 + tolerance else ''))
+        if ratio > 1 + tolerance:
+            regressions.append({'size': record['size'], 'stage': record['stage'], 'ratio': ratio})
+    return regressions
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'networkx': nx.__version__,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='numbers of friends (nodes)')
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=STAGES)
+    parser.add_argument('--avg-friends', type=int, default=20, help='average number of mutual friends')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per stage, the fastest is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--exact-limit', type=int, default=20000,
+                        help='larger graphs get approximate distances and skip compare_network_models')
+    parser.add_argument('--plot-limit', type=int, default=100000, help='largest size show_graph is run on')
+    parser.add_argument('--crawl-limit', type=int, default=10000, help='largest size crawled from the stub API')
+    parser.add_argument('--requests-per-second', type=int, default=1000, help='quota of the stub API and crawler')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run of every stage')
+    parser.add_argument('--profile-dir', default='', help='write a cProfile dump of every stage here')
+    parser.add_argument('--output', default='', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default='', help='compare with the results of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown against the baseline')
+    parser.add_argument('--verbose', action='store_true', help='show what the stages print')
+    args = parser.parse_args()
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+
+    print(f"{'size':>9}  {'stage':<24}{'seconds':>10}{'peak, MB':>10}")
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            records.extend(run_size(size, args, directory))
+
+    results = {'environment': environment(), 'arguments': vars(args), 'results': records}
+    if args.baseline:
+        results['regressions'] = compare_with_baseline(records, args.baseline, args.tolerance)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+    if results.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
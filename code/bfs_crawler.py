@@ -0,0 +1,166 @@
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .crawler import ConcurrentCrawler
+except ImportError:  # executed from inside the code/ directory
+    from crawler import ConcurrentCrawler
+
+EDGE_DTYPE = np.int64
+
+
+class IntIdSet:
+    """
+    Set of integer VK IDs kept as one sorted NumPy array.
+
+    Takes 8 bytes per ID instead of the ~100 bytes of a Python ``str`` in a ``set``,
+    and answers membership for a whole array of IDs at once.
+    """
+
+    def __init__(self):
+        self._ids = np.empty(0, dtype=EDGE_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return bool(self.contains(np.array([user_id], dtype=EDGE_DTYPE))[0])
+
+    def contains(self, user_ids: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            user_ids (np.ndarray): IDs to look up.
+
+        Returns:
+            np.ndarray: Boolean mask, True where the ID is in the set.
+        """
+        positions = np.searchsorted(self._ids, user_ids)
+        positions[positions == len(self._ids)] = 0
+        return self._ids[positions] == user_ids if len(self._ids) else np.zeros(len(user_ids), dtype=bool)
+
+    def update(self, user_ids: np.ndarray) -> None:
+        self._ids = np.union1d(self._ids, np.asarray(user_ids, dtype=EDGE_DTYPE))
+
+
+def _merge_counts(ids: np.ndarray, counts: np.ndarray, new_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Adds ``new_ids`` to a (unique ids, occurrence counts) pair."""
+    new_ids, new_counts = np.unique(new_ids, return_counts=True)
+    merged_ids, inverse = np.unique(np.concatenate([ids, new_ids]), return_inverse=True)
+    merged_counts = np.bincount(inverse, weights=np.concatenate([counts, new_counts]), minlength=len(merged_ids))
+    return merged_ids, merged_counts.astype(EDGE_DTYPE)
+
+
+def load_edges(edges_path: str) -> np.ndarray:
+    """
+    Memory-maps an edge file written by ``BFSCrawler``.
+
+    Args:
+        edges_path (str): Path to the edge file.
+
+    Returns:
+        np.ndarray: Array of shape (number of edges, 2) with VK IDs of the endpoints.
+    """
+    return np.memmap(edges_path, dtype=EDGE_DTYPE, mode="r").reshape(-1, 2)
+
+
+class BFSCrawler:
+    """
+    Crawls the friendship graph breadth-first to a given depth.
+
+    Users of every level are expanded in order of how many already crawled users
+    are friends with them, so a ``max_nodes`` budget is spent on the best connected
+    part of the frontier. Each edge is appended to a binary file of int64 pairs as
+    soon as it is discovered and written once, so only the ID sets stay in memory.
+
+    Args:
+        crawler (ConcurrentCrawler): Fetcher used for the friends lists, with its rate
+            limit, batching and cache.
+        depth (int): Number of hops from the seed user to expand.
+        max_nodes (Optional[int]): Maximum number of users whose friends are fetched.
+        chunk_size (int): Number of users fetched between two writes to disk.
+    """
+
+    def __init__(self, crawler: ConcurrentCrawler, depth: int = 2, max_nodes: Optional[int] = None,
+                 chunk_size: int = 1000):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.crawler = crawler
+        self.depth = depth
+        self.max_nodes = max_nodes
+        self.chunk_size = chunk_size
+
+    def crawl(self, seed_id: str, edges_path: str) -> Dict[str, Any]:
+        """
+        Runs the crawl from ``seed_id`` and writes the discovered edges to ``edges_path``.
+
+        Args:
+            seed_id (str): VK user ID the crawl starts from.
+            edges_path (str): Path of the binary edge file, read it back with ``load_edges``.
+
+        Returns:
+            Dict[str, Any]: Crawl statistics: ``nodes_fetched``, ``nodes_seen`` (users
+            queued for expansion), ``edges_written`` and ``depth_reached``.
+
+        Raises:
+            VKAPIError: If the access token is rejected (error 5); the edges of the
+                chunks fetched before are already in ``edges_path``.
+        """
+        seen = IntIdSet()
+        expanded = IntIdSet()
+        frontier = np.array([int(seed_id)], dtype=EDGE_DTYPE)
+        seen.update(frontier)
+        budget = self.max_nodes if self.max_nodes is not None else np.inf
+        stats = {"nodes_fetched": 0, "nodes_seen": 1, "edges_written": 0, "depth_reached": 0}
+
+        with open(edges_path, "wb") as edges_file:
+            for level in range(self.depth):
+                frontier = frontier[:int(min(len(frontier), budget - stats["nodes_fetched"]))]
+                if len(frontier) == 0:
+                    break
+                level_start = time.perf_counter()
+                next_ids = np.empty(0, dtype=EDGE_DTYPE)
+                next_counts = np.empty(0, dtype=EDGE_DTYPE)
+
+                for start in range(0, len(frontier), self.chunk_size):
+                    chunk = frontier[start:start + self.chunk_size]
+                    results = self.crawler.fetch_many([str(user_id) for user_id in chunk])
+                    chunk_edges = []
+                    chunk_friends = []
+                    fetched = np.zeros(len(chunk), dtype=bool)
+                    for i, user_id in enumerate(chunk):
+                        friends_ids = results.get(str(user_id))
+                        if isinstance(friends_ids, Exception) or friends_ids is None:
+                            self.crawler.instrumentation.event("friends_failed", user_id=str(user_id),
+                                                               error=repr(friends_ids))
+                            continue
+                        friends = np.array(friends_ids, dtype=EDGE_DTYPE)
+                        # an edge to an already expanded user was written from that user's side
+                        done = expanded.contains(friends) | np.isin(friends, chunk[:i][fetched[:i]])
+                        new = friends[~done]
+                        chunk_edges.append(np.column_stack([np.full(len(new), user_id, dtype=EDGE_DTYPE), new]))
+                        chunk_friends.append(friends)
+                        fetched[i] = True
+                    expanded.update(chunk[fetched])
+                    stats["nodes_fetched"] += int(fetched.sum())
+
+                    if chunk_edges:
+                        edges = np.concatenate(chunk_edges)
+                        edges.tofile(edges_file)
+                        stats["edges_written"] += len(edges)
+                    if chunk_friends and level + 1 < self.depth:
+                        discovered = np.concatenate(chunk_friends)
+                        discovered = discovered[~seen.contains(discovered)]
+                        next_ids, next_counts = _merge_counts(next_ids, next_counts, discovered)
+                    edges_file.flush()
+
+                stats["depth_reached"] = level + 1
+                seen.update(next_ids)
+                stats["nodes_seen"] = len(seen)
+                # most connected users first, ties broken by ID for reproducibility
+                frontier = next_ids[np.lexsort((next_ids, -next_counts))]
+                self.crawler.instrumentation.record("crawl.level", time.perf_counter() - level_start,
+                                                    level=level + 1, users_fetched=stats["nodes_fetched"])
+
+        return stats
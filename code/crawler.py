@@ -0,0 +1,405 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .get_friends import (API_URL, AUTH_ERROR_CODE, PROFILE_ERROR_CODES, RATE_LIMIT_ERROR_CODE, VKAPIError,
+                              attach_friends_ids, call_execute, request_friends)
+    from .instrumentation import CACHE_HITS, CACHE_MISSES, RATE_LIMIT_WAITS, RETRIES, Instrumentation, instrumentation
+    from .response_cache import FRIENDS_IDS, ResponseCache
+except ImportError:  # executed from inside the code/ directory
+    from get_friends import (API_URL, AUTH_ERROR_CODE, PROFILE_ERROR_CODES, RATE_LIMIT_ERROR_CODE, VKAPIError,
+                             attach_friends_ids, call_execute, request_friends)
+    from instrumentation import CACHE_HITS, CACHE_MISSES, RATE_LIMIT_WAITS, RETRIES, Instrumentation, instrumentation
+    from response_cache import FRIENDS_IDS, ResponseCache
+
+# VK allows 3 requests per second for user access tokens
+DEFAULT_REQUESTS_PER_SECOND = 3.0
+# Maximum number of API calls a single `execute` request may contain
+EXECUTE_BATCH_SIZE = 25
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how many requests are started per second.
+
+    Args:
+        rate (float): Tokens added per second, i.e. the API's per-second quota.
+        capacity (Optional[float]): Maximum burst size, defaults to a single request.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else 1.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is available and takes it.
+
+        Returns:
+            float: Seconds spent waiting for the token.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """
+    Creates an HTTP session whose connection pool fits ``pool_size`` parallel requests.
+
+    Args:
+        pool_size (int): Number of connections kept alive per host.
+
+    Returns:
+        requests.Session: The pooled session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def build_friends_execute_code(user_ids: List[str]) -> str:
+    """
+    Builds the VKScript for an ``execute`` request returning the friends IDs of several users.
+
+    Args:
+        user_ids (List[str]): Up to ``EXECUTE_BATCH_SIZE`` VK user IDs.
+
+    Returns:
+        str: VKScript returning an array with one ``friends.get`` result per user.
+    """
+    if len(user_ids) > EXECUTE_BATCH_SIZE:
+        raise ValueError(f"execute accepts at most {EXECUTE_BATCH_SIZE} calls, got {len(user_ids)}")
+    calls = ",".join(f'API.friends.get({{"user_id":{int(user_id)},"count":5000}})' for user_id in user_ids)
+    return f"return [{calls}];"
+
+
+def request_friends_ids_batch(user_ids: List[str], access_token: str,
+                              session: Optional[requests.Session] = None,
+                              api_url: str = API_URL) -> List[Union[List[str], VKAPIError]]:
+    """
+    Fetches the friends IDs of several users in a single ``execute`` round-trip.
+
+    Args:
+        user_ids (List[str]): Up to ``EXECUTE_BATCH_SIZE`` VK user IDs.
+        access_token (str): VK API access token.
+        session (Optional[requests.Session]): Session to reuse pooled connections.
+        api_url (str): Base URL of the API.
+
+    Returns:
+        List[Union[List[str], VKAPIError]]: Friends IDs of every user, in the order of ``user_ids``,
+        or the error of a sub-call that failed, e.g. because the profile is private.
+
+    Raises:
+        VKAPIError: If the whole ``execute`` request was rejected.
+    """
+    code = build_friends_execute_code(user_ids)
+    results = call_execute(code, access_token, session=session, api_url=api_url)
+    return [
+        [str(friend_id) for friend_id in result.get("items", [])] if isinstance(result, dict) else result
+        for result in results
+    ]
+
+
+class ConcurrentCrawler:
+    """
+    Fetches friends lists in a thread pool under a shared token-bucket limit.
+
+    With ``batch_size`` above one, friends lists are requested through the VK
+    ``execute`` method, packing up to 25 ``friends.get`` calls into one request.
+
+    A rejected access token (error 5) stops the whole crawl: requests still queued
+    are dropped and the error is raised, as in ``fetch_friends_of_each_friend``.
+    The crawler then raises it for every later request too.
+
+    Args:
+        access_token (str): VK API access token.
+        requests_per_second (float): API quota enforced by the token bucket.
+        max_workers (int): Maximum number of requests in flight.
+        max_retries (int): Retries of a request rejected for exceeding the quota and of
+            batch sub-calls that failed for another reason than a hidden or deleted profile.
+        batch_size (int): Number of users per ``execute`` request, 1 disables batching.
+        api_url (str): Base URL of the API, overridable for a local stub server.
+        session (Optional[requests.Session]): Session to use instead of a new pooled one.
+        cache (Optional[ResponseCache]): Store every friends list is written to as soon as
+            it arrives; users with a fresh cached entry are not requested again.
+        instrumentation (Instrumentation): Receives the retry, rate-limit and cache counters,
+            the progress and the failures; the shared ``instrumentation`` by default.
+    """
+
+    def __init__(self, access_token: str, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 max_workers: int = 8, max_retries: int = 3, batch_size: int = 1, api_url: str = API_URL,
+                 session: Optional[requests.Session] = None, cache: Optional[ResponseCache] = None,
+                 instrumentation: Instrumentation = instrumentation):
+        if not 1 <= batch_size <= EXECUTE_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {EXECUTE_BATCH_SIZE}")
+        self.access_token = access_token
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.batch_size = batch_size
+        self.api_url = api_url
+        self.limiter = TokenBucket(requests_per_second)
+        self.session = session if session is not None else create_session(max_workers)
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self._auth_error = None
+
+    def _store(self, user_id: str, friends_ids: List[str]) -> None:
+        if self.cache is not None:
+            self.cache.put(FRIENDS_IDS, user_id, friends_ids)
+
+    def _acquire(self) -> None:
+        waited = self.limiter.acquire()
+        if waited > 0:
+            self.instrumentation.count(RATE_LIMIT_WAITS)
+            self.instrumentation.record("rate_limit_wait", waited)
+
+    def _call_with_retries(self, request, *args):
+        for attempt in range(self.max_retries + 1):
+            # requests queued before the token was rejected are not sent
+            if self._auth_error is not None:
+                raise self._auth_error
+            self._acquire()
+            try:
+                return request(*args, self.access_token, session=self.session, api_url=self.api_url)
+            except VKAPIError as error:
+                if error.code == AUTH_ERROR_CODE:
+                    self._auth_error = error
+                if error.code != RATE_LIMIT_ERROR_CODE or attempt == self.max_retries:
+                    raise
+                self.instrumentation.count(RETRIES)
+                time.sleep(1.0 / self.limiter.rate)
+
+    def fetch_friends_ids(self, user_id: str) -> List[str]:
+        """
+        Fetches the friends IDs of a user, waiting for the limiter before each attempt.
+
+        Args:
+            user_id (str): VK user ID.
+
+        Returns:
+            List[str]: IDs of the user's friends, empty (and cached as such) if the
+            profile is hidden, deleted or banned.
+
+        Raises:
+            VKAPIError: On any other error, e.g. an invalid token or a quota that keeps
+                being exceeded; nothing is cached then, so a resumed crawl asks again.
+        """
+        try:
+            friends = self._call_with_retries(request_friends, user_id)
+        except VKAPIError as error:
+            if error.code not in PROFILE_ERROR_CODES:
+                raise
+            self.instrumentation.event("friends_failed", user_id=user_id, error=error.message, code=error.code)
+            self._store(user_id, [])
+            return []
+        friends_ids = [str(friend.get("id")) for friend in friends]
+        self._store(user_id, friends_ids)
+        return friends_ids
+
+    def fetch_friends_ids_batch(self, user_ids: List[str]) -> List[Union[List[str], VKAPIError]]:
+        """
+        Fetches the friends IDs of up to ``batch_size`` users with one ``execute`` request.
+
+        Args:
+            user_ids (List[str]): VK user IDs.
+
+        Returns:
+            List[Union[List[str], VKAPIError]]: Friends IDs per user, the error of failed sub-calls.
+        """
+        return self._call_with_retries(request_friends_ids_batch, user_ids)
+
+    def _fetch_all_batched(self, executor: ThreadPoolExecutor, user_ids: List[str],
+                           advance: Callable[[int], None]) -> Dict[str, Any]:
+        results = {}
+        pending = user_ids
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.instrumentation.count(RETRIES, len(pending))
+            batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+            futures = [executor.submit(self.fetch_friends_ids_batch, batch) for batch in batches]
+            failed = []
+            for batch, future in zip(batches, futures):
+                try:
+                    batch_results = future.result()
+                except Exception as e:
+                    if isinstance(e, VKAPIError) and e.code == AUTH_ERROR_CODE:
+                        self._abort(futures, batch[0], e)
+                    for user_id in batch:
+                        results[user_id] = e
+                    advance(len(batch))
+                    continue
+                retry = 0
+                for user_id, friends_ids in zip(batch, batch_results):
+                    if not isinstance(friends_ids, VKAPIError):
+                        results[user_id] = friends_ids
+                        self._store(user_id, friends_ids)
+                    elif friends_ids.code == AUTH_ERROR_CODE:
+                        self._auth_error = friends_ids
+                        self._abort(futures, user_id, friends_ids)
+                    elif friends_ids.code in PROFILE_ERROR_CODES:
+                        # hidden or deleted profiles fail the same way every time: no retry,
+                        # an empty friends list, as fetch_friends_ids gives
+                        self.instrumentation.event("friends_failed", user_id=user_id, error=friends_ids.message,
+                                                   code=friends_ids.code)
+                        results[user_id] = []
+                        self._store(user_id, [])
+                    else:
+                        failed.append(user_id)
+                        results[user_id] = friends_ids
+                        retry += 1
+                advance(len(batch) - retry)
+            pending = failed
+            if not pending:
+                break
+        # sub-calls that kept failing for other reasons keep their error and are not cached
+        advance(len(pending))
+        return results
+
+    def _abort(self, futures: List[Future], user_id: str, error: VKAPIError) -> None:
+        for future in futures:
+            future.cancel()
+        self.instrumentation.event("friends_failed", user_id=user_id, error=error.message, code=error.code)
+        raise error
+
+    def fetch_many(self, user_ids: List[str]) -> Dict[str, Any]:
+        """
+        Fetches the friends IDs of many users, from the cache where possible.
+
+        Args:
+            user_ids (List[str]): VK user IDs.
+
+        Returns:
+            Dict[str, Any]: Friends IDs per user, or the exception that stopped
+            the user's friends list from being fetched.
+
+        Raises:
+            VKAPIError: If the access token is rejected (error 5). The lists fetched
+                before stay in ``cache``, so the crawl can be resumed with a new token.
+        """
+        results = {}
+        to_fetch = user_ids
+        if self.cache is not None:
+            to_fetch = []
+            for user_id in user_ids:
+                cached = self.cache.get(FRIENDS_IDS, user_id)
+                if cached is None:
+                    to_fetch.append(user_id)
+                else:
+                    results[user_id] = cached
+            self.instrumentation.count(CACHE_HITS, len(results))
+            self.instrumentation.count(CACHE_MISSES, len(to_fetch))
+
+        with self.instrumentation.progress("friends lists", total=len(to_fetch)) as advance, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            if self.batch_size > 1:
+                results.update(self._fetch_all_batched(executor, to_fetch, advance))
+            else:
+                futures = [executor.submit(self.fetch_friends_ids, user_id) for user_id in to_fetch]
+                for user_id, future in zip(to_fetch, futures):
+                    try:
+                        results[user_id] = future.result()
+                    except Exception as e:
+                        if isinstance(e, VKAPIError) and e.code == AUTH_ERROR_CODE:
+                            self._abort(futures, user_id, e)
+                        results[user_id] = e
+                    advance()
+        return results
+
+    def fetch_friends_of_each_friend(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Fetches the friends of each friend of the user concurrently.
+
+        Args:
+            user_id (str): VK user ID.
+
+        Returns:
+            List[Dict[str, Any]]: A list of friends with their friends' IDs added,
+            in the same order as the user's friends list.
+
+        Raises:
+            VKAPIError: If the access token is rejected (error 5), see ``fetch_many``.
+        """
+        try:
+            friends = self._call_with_retries(request_friends, user_id)
+        except requests.exceptions.JSONDecodeError:
+            self.instrumentation.event("friends_failed", user_id=str(user_id), error="invalid JSON")
+            friends = []
+        except VKAPIError as error:
+            self.instrumentation.event("friends_failed", user_id=str(user_id), error=error.message, code=error.code)
+            if error.code == AUTH_ERROR_CODE:
+                raise
+            friends = []
+        if not friends:
+            self.instrumentation.event("no_friends", user_id=str(user_id))
+            return []
+
+        friend_ids = [str(friend.get("id")) for friend in friends]
+        results = self.fetch_many(friend_ids)
+
+        processed_friends = []
+        for friend, friend_id in zip(friends, friend_ids):
+            result = results[friend_id]
+            if isinstance(result, Exception):
+                self.instrumentation.event("friends_failed", user_id=friend_id, error=repr(result))
+                continue
+            processed_friends.append(attach_friends_ids(friend, result))
+        return processed_friends
+
+
+def fetch_friends_of_each_friend_concurrent(user_id: str, access_token: str,
+                                            requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                                            max_workers: int = 8,
+                                            batch_size: int = 1,
+                                            api_url: str = API_URL,
+                                            cache: Optional[ResponseCache] = None) -> List[Dict[str, Any]]:
+    """
+    Concurrent counterpart of ``fetch_friends_of_each_friend``.
+
+    Instead of sleeping a fixed delay after every request, requests are issued
+    from a thread pool as fast as the token bucket allows.
+
+    Args:
+        user_id (str): VK user ID.
+        access_token (str): VK API access token.
+        requests_per_second (float): API quota enforced by the token bucket.
+        max_workers (int): Maximum number of requests in flight.
+        batch_size (int): Users per ``execute`` request, up to 25; 1 disables batching.
+        api_url (str): Base URL of the API.
+        cache (Optional[ResponseCache]): Store making the crawl resumable, see ``ResponseCache``.
+
+    Returns:
+        List[Dict[str, Any]]: A list of friends with their friends' IDs added.
+
+    Raises:
+        VKAPIError: If the access token is rejected (error 5); what was fetched so far
+            stays in ``cache``, so the crawl can be resumed with a new token.
+    """
+    crawler = ConcurrentCrawler(access_token, requests_per_second=requests_per_second,
+                                max_workers=max_workers, batch_size=batch_size, api_url=api_url,
+                                cache=cache)
+    try:
+        return crawler.fetch_friends_of_each_friend(user_id)
+    finally:
+        crawler.session.close()
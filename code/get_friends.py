@@ -3,10 +3,24 @@ import json
 import requests
 import webbrowser
 import networkx as nx
+import numpy as np
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # node attributes are then stored as JSON lines
+    pa = None
+
+try:
+    from .instrumentation import CACHE_HITS, CACHE_MISSES, REQUESTS, instrumentation
+    from .response_cache import FRIENDS_IDS, ResponseCache
+except ImportError:  # executed as a script: python code/get_friends.py
+    from instrumentation import CACHE_HITS, CACHE_MISSES, REQUESTS, instrumentation
+    from response_cache import FRIENDS_IDS, ResponseCache
+
 # Load environment variables
 dotenv_path = '../.env'
 load_dotenv()
@@ -18,6 +32,37 @@ OAUTH_URL = (
     f'redirect_uri={REDIRECT_URI}&scope=friends,status,offline&response_type=token&'
     f'revoke=1&v=5.199'
 )
+API_URL = 'https://api.vk.com/method'
+API_VERSION = '5.199'
+RATE_LIMIT_ERROR_CODE = 6
+AUTH_ERROR_CODE = 5
+# errors about the profile itself (access denied, deleted or banned, private), the same on every attempt
+PROFILE_ERROR_CODES = (15, 18, 30)
+BINARY_FORMAT_VERSION = 1
+FRIEND_FIELDS = [
+    "first_name",
+    "last_name",
+    "id",
+    "sex",
+    "bdate",
+    "country",
+    "city",
+    "photo_id",
+    "status",
+    "can_post",
+    "can_see_all_posts",
+    "can_write_private_message",
+    "contacts",
+    "domain",
+    "education",
+    "has_mobile",
+    "timezone",
+    "last_seen",
+    "nickname",
+    "online",
+    "relation",
+    "universities",
+]
 
 
 def get_access_token() -> str:
@@ -32,144 +77,309 @@ def get_access_token() -> str:
     return input("Enter your access_token copied from the URL after authorization: ")
 
 
-def fetch_friends(user_id: str, access_token: str) -> List[Dict[str, Any]]:
+class VKAPIError(Exception):
     """
-    Fetches a list of friends for the given VK user ID using the provided access token.
+    Error returned by the VK API in the ``error`` field of a response.
+
+    Attributes:
+        code (int): VK error code (6 means the per-second quota was exceeded).
+        message (str): Human readable error message.
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _api_answer(method: str, params: Dict[str, Any], access_token: str,
+                session: Optional[requests.Session], api_url: str) -> Dict[str, Any]:
+    http = session if session is not None else requests
+    params = dict(params, access_token=access_token, v=API_VERSION)
+    instrumentation.count(REQUESTS)
+    with instrumentation.span(f"api.{method}"):
+        response = http.get(f"{api_url}/{method}", params=params)
+        data = response.json()
+
+    if 'error' in data:
+        error = data['error']
+        raise VKAPIError(error.get('error_code', 0), error.get('error_msg', 'Unknown error'))
+    return data
+
+
+def call_api(method: str, params: Dict[str, Any], access_token: str,
+             session: Optional[requests.Session] = None, api_url: str = API_URL) -> Any:
+    """
+    Calls a VK API method and returns the content of its ``response`` field.
+
+    Every call is counted under ``REQUESTS`` and timed as the span ``api.<method>``
+    of the shared ``instrumentation``.
+
+    Args:
+        method (str): VK API method name, e.g. ``friends.get``.
+        params (Dict[str, Any]): Method parameters.
+        access_token (str): VK API access token.
+        session (Optional[requests.Session]): Session to reuse pooled connections.
+        api_url (str): Base URL of the API, overridable for a local stub server.
+
+    Returns:
+        Any: The ``response`` part of the API answer.
+
+    Raises:
+        VKAPIError: If the API answered with an error.
+        requests.exceptions.JSONDecodeError: If the answer is not valid JSON.
+    """
+    return _api_answer(method, params, access_token, session, api_url).get("response", {})
+
+
+def call_execute(code: str, access_token: str, session: Optional[requests.Session] = None,
+                 api_url: str = API_URL) -> List[Any]:
+    """
+    Runs a VKScript with the ``execute`` method.
+
+    VK answers failed calls inside the script with ``false`` and describes them, in
+    the same order, in ``execute_errors``; here every ``false`` is replaced by its error.
+
+    Args:
+        code (str): VKScript returning an array of API call results.
+        access_token (str): VK API access token.
+        session (Optional[requests.Session]): Session to reuse pooled connections.
+        api_url (str): Base URL of the API.
+
+    Returns:
+        List[Any]: Result of every call, a ``VKAPIError`` for the failed ones.
+
+    Raises:
+        VKAPIError: If the whole request was rejected.
+    """
+    data = _api_answer("execute", {"code": code}, access_token, session, api_url)
+    errors = iter(data.get("execute_errors", []))
+    results = []
+    for result in data.get("response", []):
+        if result is False:
+            error = next(errors, {})
+            result = VKAPIError(error.get("error_code", 0), error.get("error_msg", "Unknown error"))
+        results.append(result)
+    return results
+
+
+def parse_friend(friend: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keeps only the fields of a raw ``friends.get`` item that the project uses.
+
+    Args:
+        friend (Dict[str, Any]): Raw friend item returned by the API.
+
+    Returns:
+        Dict[str, Any]: Friend's data.
+    """
+    return {field: friend.get(field) for field in FRIEND_FIELDS}
+
+
+def request_friends(user_id: str, access_token: str,
+                    session: Optional[requests.Session] = None,
+                    api_url: str = API_URL) -> List[Dict[str, Any]]:
+    """
+    Fetches a list of friends for the given VK user ID, raising on API errors.
 
     Args:
         user_id (str): VK user ID.
         access_token (str): VK API access token.
+        session (Optional[requests.Session]): Session to reuse pooled connections.
+        api_url (str): Base URL of the API.
 
     Returns:
         List[Dict[str, Any]]: A list of friends' data.
+
+    Raises:
+        VKAPIError: If the API answered with an error.
     """
-    url = "https://api.vk.com/method/friends.get"
     params = {
         "user_id": user_id,
         "order": "name",
         "count": 5000,
         "offset": 0,
-        # "fields": "first_name,last_name,id,sex,bdate,country,city,photo_id,\
-        #     status,can_post,can_see_all_posts,can_write_private_message,contacts,\
-        #     domain,education,has_mobile,timezone,last_seen, nickname,online,relation, universities, education",
-        "fields": [
-                "first_name",
-                "last_name",
-                "id",
-                "sex",
-                "bdate",
-                "country",
-                "city",
-                "photo_id",
-                "status",
-                "can_post",
-                "can_see_all_posts",
-                "can_write_private_message",
-                "contacts",
-                "domain",
-                "education",
-                "has_mobile",
-                "timezone",
-                "last_seen",
-                "nickname",
-                "online",
-                "relation",
-                "universities",
-                "education",
-            ],
-        "access_token": access_token,
-        "v": "5.199"
+        "fields": FRIEND_FIELDS,
     }
-    response = requests.get(url, params=params)
+    data = call_api("friends.get", params, access_token, session=session, api_url=api_url)
+    return [parse_friend(friend) for friend in data.get("items", [])]
+
+
+def fetch_friends(user_id: str, access_token: str,
+                  session: Optional[requests.Session] = None,
+                  api_url: str = API_URL) -> List[Dict[str, Any]]:
+    """
+    Fetches a list of friends for the given VK user ID using the provided access token.
+
+    Args:
+        user_id (str): VK user ID.
+        access_token (str): VK API access token.
+        session (Optional[requests.Session]): Session to reuse pooled connections.
+        api_url (str): Base URL of the API.
+
+    Returns:
+        List[Dict[str, Any]]: A list of friends' data.
+    """
     try:
-        data = response.json()
+        return request_friends(user_id, access_token, session=session, api_url=api_url)
     except requests.exceptions.JSONDecodeError:
-        print("Error decoding JSON. Check the request.")
+        instrumentation.event("friends_failed", user_id=str(user_id), error="invalid JSON")
         return []
-
-    if 'error' in data:
-        error = data['error']
-        print(f"API Error: {error.get('error_msg', 'Unknown error')}")
+    except VKAPIError as error:
+        instrumentation.event("friends_failed", user_id=str(user_id), error=error.message, code=error.code)
         return []
 
-    # print(data)
-    friends = data.get("response", {}).get("items", [])
-    # print(friends)
-    return [
-        {
-            "first_name": friend.get("first_name"),
-            "last_name": friend.get("last_name"),
-            "id": friend.get("id"),
-            "sex": friend.get("sex"),
-            "bdate": friend.get("bdate"),
-            "country": friend.get("country"),
-            "city": friend.get("city"),
-            "photo_id": friend.get("photo_id"),
-            "status": friend.get("status"),
-            "can_post": friend.get("can_post"),
-            "can_see_all_posts": friend.get("can_see_all_posts"),
-            "can_write_private_message": friend.get("can_write_private_message"),
-            "contacts": friend.get("contacts"),
-            "domain": friend.get("domain"),
-            "education": friend.get("education"),
-            "has_mobile": friend.get("has_mobile"),
-            "timezone": friend.get("timezone"),
-            "last_seen": friend.get("last_seen"),
-            "nickname": friend.get("nickname"),
-            "online": friend.get("online"),
-            "relation": friend.get("relation"),
-            "universities": friend.get("universities"),
-            "education": friend.get("education"),
 
-        }
-        for friend in friends
-    ]
+def attach_friends_ids(friend: Dict[str, Any], friends_ids: List[str]) -> Dict[str, Any]:
+    """
+    Returns a copy of a friend's data with the IDs of their own friends added.
 
+    Args:
+        friend (Dict[str, Any]): Friend's data.
+        friends_ids (List[str]): IDs of that friend's friends.
 
-def fetch_friends_of_each_friend(user_id: str, access_token: str, delay: float = 0.5) -> List[Dict[str, Any]]:
+    Returns:
+        Dict[str, Any]: Friend's data with ``friends_ids`` and ``friends_count``.
+    """
+    processed_friend = friend.copy()
+    processed_friend['friends_ids'] = friends_ids
+    processed_friend['friends_count'] = len(processed_friend['friends_ids'])
+    return processed_friend
+
+
+def fetch_friends_of_each_friend(user_id: str, access_token: str, delay: float = 0.5,
+                                 cache: Optional[ResponseCache] = None) -> List[Dict[str, Any]]:
     """
     Fetches the friends of each friend of the user.
 
+    Progress, cache hits and failed friends are reported through the shared
+    ``instrumentation`` rather than printed; add a sink to it to follow the crawl.
+
     Args:
         user_id (str): VK user ID.
         access_token (str): VK API access token.
         delay (float): Delay in seconds between API requests to avoid hitting rate limits.
+        cache (Optional[ResponseCache]): Store every response is written to as soon as it
+            arrives; friends with a fresh cached response are not requested again. Hidden
+            or deleted profiles are cached as empty lists, other errors are not cached.
 
     Returns:
         List[Dict[str, Any]]: A list of friends with their friends' IDs added.
+
+    Raises:
+        VKAPIError: If the access token is rejected (error 5); what was fetched so far
+            stays in ``cache``, so the crawl can be resumed with a new token.
     """
-    print("Fetching your friends...")
     friends = fetch_friends(user_id, access_token)
     if not friends:
-        print("You have no friends or an error occurred.")
+        instrumentation.event("no_friends", user_id=str(user_id))
         return []
 
     processed_friends = []
 
+    with instrumentation.progress("friends lists", total=len(friends)) as advance:
+        for friend in friends:
+            advance()
+            friend_id = str(friend.get("id"))
+
+            friends_ids = cache.get(FRIENDS_IDS, friend_id) if cache is not None else None
+            if friends_ids is not None:
+                instrumentation.count(CACHE_HITS)
+                processed_friends.append(attach_friends_ids(friend, friends_ids))
+                continue
+            if cache is not None:
+                instrumentation.count(CACHE_MISSES)
+
+            try:
+                friends_ids = [str(f.get('id')) for f in request_friends(friend_id, access_token)]
+                if cache is not None:
+                    cache.put(FRIENDS_IDS, friend_id, friends_ids)
+            except requests.exceptions.JSONDecodeError:
+                instrumentation.event("friends_failed", user_id=friend_id, error="invalid JSON")
+                friends_ids = []
+            except VKAPIError as error:
+                instrumentation.event("friends_failed", user_id=friend_id, error=error.message, code=error.code)
+                if error.code == AUTH_ERROR_CODE:
+                    raise
+                friends_ids = []
+                # a hidden or deleted profile is a valid answer, a quota or server error is not
+                if cache is not None and error.code in PROFILE_ERROR_CODES:
+                    cache.put(FRIENDS_IDS, friend_id, friends_ids)
+            except Exception as e:
+                instrumentation.event("friends_failed", user_id=friend_id, error=repr(e))
+                continue
+
+            processed_friends.append(attach_friends_ids(friend, friends_ids))
+            time.sleep(delay)
+
+    return processed_friends
+
+
+def _friend_pairs(friends: Iterable[Dict[str, Any]], index: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Turns every listed friendship between indexed friends into a directed pair of indices."""
+    sources, targets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
     for friend in friends:
-        friend_id = str(friend.get("id"))
-        friend_name = f"{friend.get('first_name', 'Unknown')} {friend.get('last_name', 'Unknown')}"
-        print(f"Fetching friends of {friend_name} (ID: {friend_id})...")
+        targets_of_friend = [index[other_id] for other_id in friend.get('friends_ids', []) if other_id in index]
+        sources.append(np.full(len(targets_of_friend), index[str(friend.get('id'))], dtype=np.int64))
+        targets.append(np.array(targets_of_friend, dtype=np.int64))
+    return np.concatenate(sources), np.concatenate(targets)
 
-        try:
-            friends_of_friend = fetch_friends(friend_id, access_token)
-            processed_friend = friend.copy()
-            processed_friend['friends_ids'] = [str(f.get('id')) for f in friends_of_friend]
-            processed_friend['friends_count'] = len(processed_friend['friends_ids'])
-            processed_friends.append(processed_friend)
-        except Exception as e:
-            print(f"Error fetching friends of {friend_name} (ID: {friend_id}): {e}")
-            continue
 
-        time.sleep(delay)
+def _pairs_to_edges(sources: np.ndarray, targets: np.ndarray, n: int, reciprocal: bool) -> np.ndarray:
+    """Deduplicates directed index pairs into undirected edges ``(i, j)`` with ``i <= j``."""
+    if n == 0 or len(sources) == 0:
+        return np.empty((0, 2), dtype=np.int64)
 
-    return processed_friends
+    if reciprocal:
+        codes = np.unique(sources * n + targets)
+        is_mutual = np.isin(codes % n * n + codes // n, codes, assume_unique=True)
+        codes = codes[is_mutual]
+        sources, targets = codes // n, codes % n
+        keep = sources < targets
+        sources, targets = sources[keep], targets[keep]
+
+    low, high = np.minimum(sources, targets), np.maximum(sources, targets)
+    codes = np.unique(low * n + high)
+    return np.column_stack([codes // n, codes % n])
+
+
+def build_friend_edges(processed_friends: List[Dict[str, Any]],
+                       reciprocal: bool = False) -> Tuple[List[str], np.ndarray]:
+    """
+    Builds the edges between friends from their ``friends_ids`` lists in near-linear time.
+
+    IDs are mapped to dense integers once, every listed friendship becomes a directed
+    pair of integers, and pairs are matched through sorted NumPy arrays instead of
+    scanning ``friends_ids`` lists for every pair of friends.
+
+    Args:
+        processed_friends (List[Dict[str, Any]]): List of friends with their friends' IDs.
+        reciprocal (bool): Keep only friendships listed on both sides; otherwise a
+            friendship listed by either friend is enough.
+
+    Records that share an ID are one node, and their ``friends_ids`` lists are merged:
+    a friendship listed in any of them counts. In reciprocal mode a friend is never
+    linked to itself. The old pairwise scan added a self-loop when two records with
+    the same ID both listed it.
+
+    Returns:
+        Tuple[List[str], np.ndarray]: Node IDs in order of first appearance, and an
+        array of shape (number of edges, 2) of indices into them with ``i <= j``.
+    """
+    index = {}
+    for friend in processed_friends:
+        index.setdefault(str(friend.get('id')), len(index))
+    sources, targets = _friend_pairs(processed_friends, index)
+    return list(index), _pairs_to_edges(sources, targets, len(index), reciprocal)
 
 
 def create_friends_network_graph(processed_friends: List[Dict[str, Any]]) -> nx.Graph:
     """
     Create a NetworkX graph from processed friends data with comprehensive node attributes.
 
+    A friend listed more than once becomes one node: attributes of later records
+    override earlier ones, and edges follow the merged lists (see ``build_friend_edges``).
+
     Args:
         processed_friends (List[Dict[str, Any]]): List of friends with their friends' IDs.
 
@@ -216,14 +426,8 @@ def create_friends_network_graph(processed_friends: List[Dict[str, Any]]) -> nx.
         
         G.add_node(friend_id, **node_attributes)
 
-    for i, friend1 in enumerate(processed_friends):
-        for friend2 in processed_friends[i + 1:]:
-            friend1_id = str(friend1.get('id'))
-            friend2_id = str(friend2.get('id'))
-
-            if (friend2_id in friend1.get('friends_ids', []) and 
-                friend1_id in friend2.get('friends_ids', [])):
-                G.add_edge(friend1_id, friend2_id)
+    node_ids, edges = build_friend_edges(processed_friends, reciprocal=True)
+    G.add_edges_from((node_ids[i], node_ids[j]) for i, j in edges.tolist())
 
     return G
 
@@ -240,72 +444,328 @@ def save_to_json(data: Any, filename: str) -> None:
         json.dump(data, file, ensure_ascii=False, indent=4)
 
 
+def save_to_jsonl(data: Iterable[Any], filename: str) -> None:
+    """
+    Saves records to a JSON lines file, one record per line.
+
+    Unlike ``save_to_json`` the records can come from a generator and are never
+    all held in memory; ``create_graph_from_json`` reads the file back one line at a time.
+
+    Args:
+        data (Iterable[Any]): Records to save.
+        filename (str): Name of the file.
+    """
+    with open(filename, "w", encoding="utf-8") as file:
+        for record in data:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def iter_json_records(filename: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Iterates over the records of a JSON array file or a JSON lines file without loading it whole.
+
+    Files ending in ``.jsonl`` are read line by line; other files must hold a single
+    JSON array, which is decoded element by element from a bounded read buffer.
+
+    Args:
+        filename (str): Path to the file.
+        chunk_size (int): Number of characters read at a time.
+
+    Yields:
+        Any: The records, in file order.
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        if filename.endswith(".jsonl"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = ""
+        started = eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if not started and buffer:
+                if not buffer.startswith("["):
+                    raise ValueError(f"{filename} does not contain a JSON array")
+                buffer, started = buffer[1:], True
+                continue
+            if started and buffer.startswith(","):
+                buffer = buffer[1:]
+                continue
+            if started and buffer.startswith("]"):
+                return
+            try:
+                if not buffer:
+                    raise json.JSONDecodeError("Empty buffer", buffer, 0)
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            # a value not followed by a delimiter, e.g. a number cut by the chunk, may go on
+            if not eof and buffer[end:end + 1] not in (" ", "\t", "\n", "\r", ",", "]"):
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield record
+            buffer = buffer[end:]
+
+
 def save_graph(graph: nx.Graph, filename: str) -> None:
     """
-    Saves a graph to a GraphML file.
+    Saves a graph to a GraphML file and reports it as a ``graph_saved`` event.
 
     Args:
         graph (nx.Graph): The graph to save.
         filename (str): File path to save the graph.
     """
     nx.write_gml(graph, filename)
-    print(f"Graph saved to {filename}")
+    instrumentation.event("graph_saved", path=filename, nodes=graph.number_of_nodes(),
+                          edges=graph.number_of_edges())
+
+
+def _node_ids_array(nodes: List[Any]) -> Tuple[np.ndarray, str]:
+    """Packs node IDs into a fixed-width array; VK IDs given as strings are stored as int64."""
+    if all(isinstance(node, int) for node in nodes):
+        return np.array(nodes, dtype=np.int64), 'int'
+    if all(isinstance(node, str) and node.isdigit() and node == str(int(node)) for node in nodes):
+        return np.array([int(node) for node in nodes], dtype=np.int64), 'str'
+    return np.array([str(node) for node in nodes]), 'str'
+
+
+def _is_plain_column(values: List[Any]) -> bool:
+    """Tells whether a column can be stored natively: one scalar type besides missing values."""
+    types = {type(value) for value in values if value is not None}
+    return types <= {str} or types <= {int, float} or types <= {bool}
+
+
+def save_graph_binary(graph: nx.Graph, directory: str) -> None:
+    """
+    Saves a graph to a directory of memory-mappable binary files.
+
+    Adjacency is written as CSR arrays (``indptr.npy``, ``indices.npy``) over the node
+    order of ``node_ids.npy``; self-loops, which ``CSRGraph`` does not represent, are
+    kept apart as the indices of their nodes in ``self_loops.npy``. Node attributes go to an uncompressed Arrow file
+    (``nodes.arrow``) when pyarrow is installed, otherwise to JSON lines
+    (``nodes.jsonl``). Nested or mixed-type attributes such as ``city`` or
+    ``universities`` are stored as JSON strings. Saving is reported as a ``graph_saved`` event.
+
+    Args:
+        graph (nx.Graph): The graph to save.
+        directory (str): Directory to write the files into, created if missing.
+    """
+    os.makedirs(directory, exist_ok=True)
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+
+    edges = np.fromiter((index[node] for edge in graph.edges() for node in edge), dtype=np.int64,
+                        count=2 * graph.number_of_edges()).reshape(-1, 2)
+    is_loop = edges[:, 0] == edges[:, 1]
+    self_loops, edges = edges[is_loop, 0], edges[~is_loop]
+    rows = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols = np.concatenate([edges[:, 1], edges[:, 0]])
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    node_ids, node_id_type = _node_ids_array(nodes)
+
+    np.save(os.path.join(directory, 'indptr.npy'), indptr)
+    np.save(os.path.join(directory, 'indices.npy'), cols[order].astype(np.int32))
+    np.save(os.path.join(directory, 'node_ids.npy'), node_ids)
+    np.save(os.path.join(directory, 'self_loops.npy'), self_loops)
+
+    keys = list(dict.fromkeys(key for _, data in graph.nodes(data=True) for key in data))
+    columns = {key: [graph.nodes[node].get(key) for node in nodes] for key in keys}
+    json_columns = [key for key, values in columns.items() if not _is_plain_column(values)]
+    for key in json_columns:
+        columns[key] = [None if v is None else json.dumps(v, ensure_ascii=False) for v in columns[key]]
+
+    if pa is not None:
+        table = pa.table({key: pa.array(values, from_pandas=True) for key, values in columns.items()})
+        feather.write_feather(table, os.path.join(directory, 'nodes.arrow'), compression='uncompressed')
+        attributes_file = 'nodes.arrow'
+    else:
+        with open(os.path.join(directory, 'nodes.jsonl'), 'w', encoding='utf-8') as file:
+            for i in range(n):
+                row = {key: values[i] for key, values in columns.items() if values[i] is not None}
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        attributes_file = 'nodes.jsonl'
+
+    meta = {
+        'format_version': BINARY_FORMAT_VERSION,
+        'node_id_type': node_id_type,
+        'attributes_file': attributes_file,
+        'json_columns': json_columns,
+        'number_of_nodes': n,
+        'number_of_edges': len(edges) + len(self_loops),
+        'number_of_self_loops': len(self_loops),
+    }
+    with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file, indent=4)
+    instrumentation.event("graph_saved", path=directory, nodes=n, edges=len(edges) + len(self_loops))
+
+
+def load_graph_arrays(directory: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Loads the adjacency of a graph saved by ``save_graph_binary`` without copying it.
+
+    Args:
+        directory (str): Directory the graph was saved to.
+        mmap (bool): Memory-map the arrays instead of reading them into memory.
+
+    Returns:
+        Dict[str, np.ndarray]: ``indptr``, ``indices`` and ``node_ids`` arrays, the
+        arguments of ``CSRGraph`` from ``scripts/graph_csr.py``. Self-loops are not
+        among them, see ``load_graph_binary``.
+    """
+    mmap_mode = 'r' if mmap else None
+    return {
+        name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+        for name in ('indptr', 'indices', 'node_ids')
+    }
+
+
+def load_node_attributes(directory: str) -> Dict[str, List[Any]]:
+    """
+    Loads the node attributes of a graph saved by ``save_graph_binary``.
+
+    Args:
+        directory (str): Directory the graph was saved to.
+
+    Returns:
+        Dict[str, List[Any]]: Values of every attribute in node order, None where missing.
+    """
+    with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+
+    if meta['attributes_file'] == 'nodes.arrow':
+        if pa is None:
+            raise ImportError("pyarrow is required to read node attributes saved in nodes.arrow")
+        table = feather.read_table(os.path.join(directory, 'nodes.arrow'), memory_map=True)
+        columns = {name: table.column(name).to_pylist() for name in table.column_names}
+    else:
+        columns = {}
+        with open(os.path.join(directory, 'nodes.jsonl'), 'r', encoding='utf-8') as file:
+            rows = [json.loads(line) for line in file]
+        for i, row in enumerate(rows):
+            for key, value in row.items():
+                columns.setdefault(key, [None] * len(rows))[i] = value
+
+    for key in meta['json_columns']:
+        if key in columns:
+            columns[key] = [None if v is None else json.loads(v) for v in columns[key]]
+    return columns
+
+
+def load_graph_binary(directory: str) -> nx.Graph:
+    """
+    Loads a graph saved by ``save_graph_binary`` as a NetworkX graph.
+
+    Args:
+        directory (str): Directory the graph was saved to.
+
+    Returns:
+        nx.Graph: The graph with its node attributes.
+    """
+    with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    arrays = load_graph_arrays(directory)
+    nodes = arrays['node_ids'].tolist()
+    if meta['node_id_type'] == 'str':
+        nodes = [str(node) for node in nodes]
+    columns = load_node_attributes(directory)
+
+    G = nx.Graph()
+    for i, node in enumerate(nodes):
+        G.add_node(node, **{key: values[i] for key, values in columns.items() if values[i] is not None})
+    sources = np.repeat(np.arange(len(nodes)), np.diff(arrays['indptr']))
+    targets = np.asarray(arrays['indices'])
+    keep = sources < targets
+    G.add_edges_from((nodes[u], nodes[v]) for u, v in zip(sources[keep].tolist(), targets[keep].tolist()))
+    path = os.path.join(directory, 'self_loops.npy')
+    if os.path.exists(path):  # older saves dropped self-loops
+        G.add_edges_from((nodes[i], nodes[i]) for i in np.load(path).tolist())
+    return G
+
+
+def convert_gml_to_binary(gml_path: str, directory: str) -> None:
+    """
+    Converts a graph saved by ``save_graph`` to the binary format of ``save_graph_binary``.
+
+    Args:
+        gml_path (str): Path to the GML file.
+        directory (str): Directory to write the binary graph into.
+    """
+    save_graph_binary(nx.read_gml(gml_path), directory)
+
+
+def friend_node_attributes(friend: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Node ID and attributes of a friend record, as stored by ``create_graph_from_json``.
+
+    Args:
+        friend (Dict[str, Any]): Friend record with its friends' IDs.
+
+    Returns:
+        Tuple[str, Dict[str, Any]]: The ID as a string and the node attributes.
+    """
+    # Convert ID to string to ensure consistency
+    friend_id = str(friend.get('id'))
+    friend_name = f"{friend.get('first_name', 'Unknown')} {friend.get('last_name', 'Unknown')}"
+
+    # Prepare node attributes
+    node_attributes = {
+        'vk_id': friend_id,
+        'name': friend_name,
+        'first_name': friend.get('first_name'),
+        'last_name': friend.get('last_name'),
+    }
+
+    # Add all non-None attributes
+    for key, value in friend.items():
+        if key != 'friends_ids' and value is not None:
+            if key == 'sex':
+                value = 'female' if value == 1 else 'male' if value == 2 else 'unknown'
+            node_attributes[key] = value
+    return friend_id, node_attributes
 
 
 def create_graph_from_json(json_file_path: str) -> nx.Graph:
     """
     Create a NetworkX graph from a JSON file with friends data.
 
+    The file (a JSON array, or JSON lines if it ends in ``.jsonl``) is streamed twice:
+    the first pass adds the nodes and interns their IDs as integers, the second turns
+    the ``friends_ids`` lists into integer pairs. Only one friend record is held in
+    memory at a time.
+
     Args:
         json_file_path (str): Path to the JSON file containing friends data.
 
     Returns:
         nx.Graph: A graph representing the social network.
     """
-    # Read the JSON file
-    with open(json_file_path, 'r', encoding='utf-8') as file:
-        friends_data = json.load(file)
-
     # Create a new graph
     G = nx.Graph()
+    index = {}
 
     # Add nodes with attributes
-    for friend in friends_data:
-        # Convert ID to string to ensure consistency
-        friend_id = str(friend.get('id'))
-        friend_name = f"{friend.get('first_name', 'Unknown')} {friend.get('last_name', 'Unknown')}"
-
-        
-        # Prepare node attributes
-        node_attributes = {
-            'vk_id': friend_id,
-            'name': friend_name,
-            'first_name': friend.get('first_name'),
-            'last_name': friend.get('last_name'),
-        }
-
-        # Add all non-None attributes
-        for key, value in friend.items():
-            if key != 'friends_ids' and value is not None:
-                if key == 'sex':
-                    value = 'female' if value == 1 else 'male' if value == 2 else 'unknown'
-                node_attributes[key] = value
-
-        # Add node to the graph
+    for friend in iter_json_records(json_file_path):
+        friend_id, node_attributes = friend_node_attributes(friend)
         G.add_node(friend_id, **node_attributes)
-        # G.add_node(friend_name, **node_attributes)
-
+        index.setdefault(friend_id, len(index))
 
     # Add edges based on mutual friends
-    for friend in friends_data:
-        friend_id = str(friend.get('id'))
-        friends_ids = friend.get('friends_ids', [])
-
-
-        for other_friend_id in friends_ids:
-            # Ensure both nodes exist in the graph before adding an edge
-            if G.has_node(friend_id) and G.has_node(other_friend_id):
-                G.add_edge(friend_id, other_friend_id)
+    sources, targets = _friend_pairs(iter_json_records(json_file_path), index)
+    node_ids = list(index)
+    edges = _pairs_to_edges(sources, targets, len(node_ids), reciprocal=False)
+    G.add_edges_from((node_ids[i], node_ids[j]) for i, j in edges.tolist())
 
     return G
 
@@ -327,6 +787,7 @@ def main() -> None:
 
     graph = create_graph_from_json('./data/friends_of_friends_new_updated.json')
     save_graph(graph, './data/friends_network_new_updated.gml')
+    save_graph_binary(graph, './data/friends_network_new_updated')
 
     # try:
     #     friends_network = create_friends_network_graph(processed_friends)
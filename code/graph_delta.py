@@ -0,0 +1,351 @@
+import hashlib
+import os
+from collections import deque
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+import networkx as nx
+import numpy as np
+
+try:
+    from .get_friends import (_friend_pairs, _pairs_to_edges, friend_node_attributes, iter_json_records,
+                              load_graph_arrays, load_graph_binary, save_graph_binary)
+    from .instrumentation import instrumentation
+except ImportError:  # executed from inside the code/ directory
+    from get_friends import (_friend_pairs, _pairs_to_edges, friend_node_attributes, iter_json_records,
+                             load_graph_arrays, load_graph_binary, save_graph_binary)
+    from instrumentation import instrumentation
+
+METRICS_FILE = 'metrics.npz'
+
+
+def _adjacency_digest(directory: str) -> str:
+    """Hash of the node IDs and adjacency saved by ``save_graph_binary``, self-loops included."""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in load_graph_arrays(directory).values():
+        digest.update(np.ascontiguousarray(array).tobytes())
+    path = os.path.join(directory, 'self_loops.npy')
+    if os.path.exists(path):
+        digest.update(np.load(path).tobytes())
+    return digest.hexdigest()
+
+
+class GraphDelta(NamedTuple):
+    """
+    Difference between the stored graph and a new crawl snapshot.
+
+    Attributes:
+        added_nodes (Dict[str, Dict[str, Any]]): New nodes and their attributes.
+        removed_nodes (List[str]): Nodes missing from the snapshot.
+        changed_nodes (Dict[str, Dict[str, Any]]): Nodes whose attributes changed, with the new attributes.
+        added_edges (List[Tuple[str, str]]): New edges.
+        removed_edges (List[Tuple[str, str]]): Edges missing from the snapshot, including those of removed nodes.
+    """
+    added_nodes: Dict[str, Dict[str, Any]]
+    removed_nodes: List[str]
+    changed_nodes: Dict[str, Dict[str, Any]]
+    added_edges: List[Tuple[str, str]]
+    removed_edges: List[Tuple[str, str]]
+
+    def is_empty(self) -> bool:
+        return not any(self)
+
+
+def diff_snapshot(graph: nx.Graph, json_file_path: str) -> GraphDelta:
+    """
+    Compares a graph with a friends-of-friends snapshot without building a second graph.
+
+    The snapshot is streamed twice like in ``create_graph_from_json``: once for the
+    nodes, compared one by one with the stored attributes, and once for the
+    ``friends_ids`` lists. Edges of both sides are encoded as integer pairs over
+    one shared index and compared with sorted array set operations.
+
+    Args:
+        graph (nx.Graph): The stored graph, as built by ``create_graph_from_json``.
+        json_file_path (str): Path to the new snapshot (JSON array or JSON lines).
+
+    Returns:
+        GraphDelta: What has to change for ``graph`` to match the snapshot.
+    """
+    index = {node: i for i, node in enumerate(graph.nodes)}
+    added_nodes, changed_nodes, snapshot_index = {}, {}, {}
+    for friend in iter_json_records(json_file_path):
+        friend_id, attributes = friend_node_attributes(friend)
+        if friend_id not in graph:
+            added_nodes[friend_id] = attributes
+        elif graph.nodes[friend_id] != attributes:
+            changed_nodes[friend_id] = attributes
+        snapshot_index[friend_id] = index.setdefault(friend_id, len(index))
+    removed_nodes = [node for node in graph.nodes if node not in snapshot_index]
+
+    sources, targets = _friend_pairs(iter_json_records(json_file_path), snapshot_index)
+    new_edges = _pairs_to_edges(sources, targets, len(index), reciprocal=False)
+    added_edges, removed_edges = _diff_edges(index, _graph_edges(graph, index), new_edges)
+    return GraphDelta(added_nodes, removed_nodes, changed_nodes, added_edges, removed_edges)
+
+
+def diff_graphs(old: nx.Graph, new: nx.Graph) -> GraphDelta:
+    """
+    Compares two graphs, e.g. two crawls loaded from GML.
+
+    Args:
+        old (nx.Graph): The earlier graph.
+        new (nx.Graph): The later graph.
+
+    Returns:
+        GraphDelta: What has to change for ``old`` to match ``new``.
+    """
+    added_nodes = {node: dict(data) for node, data in new.nodes(data=True) if node not in old}
+    changed_nodes = {node: dict(data) for node, data in new.nodes(data=True)
+                     if node in old and old.nodes[node] != data}
+    removed_nodes = [node for node in old.nodes if node not in new]
+    index = {node: i for i, node in enumerate(old.nodes)}
+    for node in added_nodes:
+        index[node] = len(index)
+    added_edges, removed_edges = _diff_edges(index, _graph_edges(old, index), _graph_edges(new, index))
+    return GraphDelta(added_nodes, removed_nodes, changed_nodes, added_edges, removed_edges)
+
+
+def _graph_edges(graph: nx.Graph, index: Dict[Hashable, int]) -> np.ndarray:
+    """Edges of ``graph`` as an array of index pairs of shape (number of edges, 2)."""
+    return np.fromiter((index[node] for edge in graph.edges() for node in edge), dtype=np.int64,
+                       count=2 * graph.number_of_edges()).reshape(-1, 2)
+
+
+def _diff_edges(index: Dict[Hashable, int], old_edges: np.ndarray,
+                new_edges: np.ndarray) -> Tuple[List[Tuple[Hashable, Hashable]], List[Tuple[Hashable, Hashable]]]:
+    """Added and removed edges between two arrays of index pairs, as pairs of node IDs."""
+    n = len(index)
+    nodes = list(index)
+
+    def codes(edges: np.ndarray) -> np.ndarray:
+        return np.unique(edges.min(axis=1) * n + edges.max(axis=1))
+
+    def decode(edge_codes: np.ndarray) -> List[Tuple[Hashable, Hashable]]:
+        return [(nodes[code // n], nodes[code % n]) for code in edge_codes.tolist()]
+
+    old_codes, new_codes = codes(old_edges), codes(new_edges)
+    return (decode(np.setdiff1d(new_codes, old_codes, assume_unique=True)),
+            decode(np.setdiff1d(old_codes, new_codes, assume_unique=True)))
+
+
+def apply_delta(graph: nx.Graph, delta: GraphDelta) -> None:
+    """
+    Applies a delta to a graph in place, without maintaining any metrics.
+
+    Args:
+        graph (nx.Graph): The graph.
+        delta (GraphDelta): Output of ``diff_snapshot`` or ``diff_graphs``.
+    """
+    graph.remove_edges_from(delta.removed_edges)
+    graph.remove_nodes_from(delta.removed_nodes)
+    for node, attributes in delta.added_nodes.items():
+        graph.add_node(node, **attributes)
+    for node, attributes in delta.changed_nodes.items():
+        data = graph.nodes[node]
+        data.clear()
+        data.update(attributes)
+    graph.add_edges_from(delta.added_edges)
+
+
+class IncrementalGraph:
+    """
+    Graph whose degrees, connected components and triangle counts follow every edit.
+
+    Adding or removing an edge ``(u, v)`` updates the triangle counts of ``u``, ``v``
+    and their common neighbours only. Components are merged by relabelling the
+    smaller one; after a removal two breadth-first searches run in lockstep from
+    ``u`` and ``v`` and stop as soon as they meet, or relabel the side that runs out
+    first, so the cost is bounded by the smaller side.
+
+    Args:
+        graph (nx.Graph): The graph, edited in place.
+        degrees (Optional[Dict[Hashable, int]]): Known degrees, computed if missing.
+        components (Optional[Dict[Hashable, int]]): Known component labels, computed if missing.
+        triangles (Optional[Dict[Hashable, int]]): Known triangle counts, computed if missing.
+    """
+
+    def __init__(self, graph: nx.Graph, degrees: Optional[Dict[Hashable, int]] = None,
+                 components: Optional[Dict[Hashable, int]] = None,
+                 triangles: Optional[Dict[Hashable, int]] = None):
+        self.graph = graph
+        self.degrees = dict(graph.degree()) if degrees is None else degrees
+        self.triangles = nx.triangles(graph) if triangles is None else triangles
+        if components is None:
+            components = {node: label for label, members in enumerate(nx.connected_components(graph))
+                          for node in members}
+        self.components = components
+        self._members = {}
+        for node, label in components.items():
+            self._members.setdefault(label, set()).add(node)
+        self._next_label = max(self._members, default=-1) + 1
+
+    def _new_component(self, members: Set[Hashable]) -> None:
+        for node in members:
+            self.components[node] = self._next_label
+        self._members[self._next_label] = members
+        self._next_label += 1
+
+    def add_node(self, node: Hashable, **attributes: Any) -> None:
+        if node in self.graph:
+            self.graph.nodes[node].update(attributes)
+            return
+        self.graph.add_node(node, **attributes)
+        self.degrees[node] = 0
+        self.triangles[node] = 0
+        self._new_component({node})
+
+    def set_node_attributes(self, node: Hashable, attributes: Dict[str, Any]) -> None:
+        """Replaces all attributes of an existing node."""
+        data = self.graph.nodes[node]
+        data.clear()
+        data.update(attributes)
+
+    def remove_node(self, node: Hashable) -> None:
+        if node not in self.graph:
+            return
+        for neighbour in list(self.graph[node]):
+            self.remove_edge(node, neighbour)
+        self.graph.remove_node(node)
+        del self.degrees[node], self.triangles[node]
+        label = self.components.pop(node)
+        del self._members[label]
+
+    def _update_triangles(self, u: Hashable, v: Hashable, sign: int) -> None:
+        if u == v:
+            return
+        common = (set(self.graph[u]) & set(self.graph[v])) - {u, v}
+        self.triangles[u] += sign * len(common)
+        self.triangles[v] += sign * len(common)
+        for w in common:
+            self.triangles[w] += sign
+
+    def add_edge(self, u: Hashable, v: Hashable) -> None:
+        for node in (u, v):
+            self.add_node(node)
+        if self.graph.has_edge(u, v):
+            return
+        self._update_triangles(u, v, 1)
+        self.graph.add_edge(u, v)
+        self.degrees[u] = self.graph.degree(u)
+        self.degrees[v] = self.graph.degree(v)
+
+        label_u, label_v = self.components[u], self.components[v]
+        if label_u != label_v:
+            if len(self._members[label_u]) < len(self._members[label_v]):
+                label_u, label_v = label_v, label_u
+            for node in self._members[label_v]:
+                self.components[node] = label_u
+            self._members[label_u] |= self._members.pop(label_v)
+
+    def remove_edge(self, u: Hashable, v: Hashable) -> None:
+        if not self.graph.has_edge(u, v):
+            return
+        self.graph.remove_edge(u, v)
+        self._update_triangles(u, v, -1)
+        self.degrees[u] = self.graph.degree(u)
+        self.degrees[v] = self.graph.degree(v)
+        if u == v:
+            return
+
+        split = self._split_off(u, v)
+        if split is not None:
+            self._members[self.components[u]] -= split
+            self._new_component(split)
+
+    def _split_off(self, u: Hashable, v: Hashable) -> Optional[Set[Hashable]]:
+        """Nodes still connected to ``u`` or ``v``, whichever side is smaller, or None if ``u`` reaches ``v``."""
+        seen = ({u}, {v})
+        queues = (deque([u]), deque([v]))
+        while queues[0] and queues[1]:
+            for side in (0, 1):
+                node = queues[side].popleft()
+                for neighbour in self.graph[node]:
+                    if neighbour in seen[1 - side]:
+                        return None
+                    if neighbour not in seen[side]:
+                        seen[side].add(neighbour)
+                        queues[side].append(neighbour)
+        return seen[0] if not queues[0] else seen[1]
+
+    def apply(self, delta: GraphDelta) -> None:
+        """
+        Applies a delta: edges are removed first, then nodes, so counts stay consistent.
+
+        Args:
+            delta (GraphDelta): Output of ``diff_snapshot``.
+        """
+        for u, v in delta.removed_edges:
+            self.remove_edge(u, v)
+        for node in delta.removed_nodes:
+            self.remove_node(node)
+        for node, attributes in delta.added_nodes.items():
+            self.add_node(node, **attributes)
+        for node, attributes in delta.changed_nodes.items():
+            self.set_node_attributes(node, attributes)
+        for u, v in delta.added_edges:
+            self.add_edge(u, v)
+
+    def save(self, directory: str) -> None:
+        """
+        Saves the graph with ``save_graph_binary`` and the metrics next to it in ``metrics.npz``,
+        together with a digest of the saved adjacency that ``load`` checks them against.
+
+        Args:
+            directory (str): Directory to write the files into.
+        """
+        save_graph_binary(self.graph, directory)
+        nodes = list(self.graph.nodes)
+        np.savez(os.path.join(directory, METRICS_FILE),
+                 degrees=np.array([self.degrees[node] for node in nodes], dtype=np.int64),
+                 components=np.array([self.components[node] for node in nodes], dtype=np.int64),
+                 triangles=np.array([self.triangles[node] for node in nodes], dtype=np.int64),
+                 adjacency=np.array(_adjacency_digest(directory)))
+
+    @classmethod
+    def load(cls, directory: str) -> "IncrementalGraph":
+        """
+        Loads a graph saved by ``save``; metrics are recomputed if ``metrics.npz`` is missing
+        or was saved for another graph, e.g. one written later by ``save_graph_binary``.
+
+        Args:
+            directory (str): Directory the graph was saved to.
+
+        Returns:
+            IncrementalGraph: The graph with its metrics.
+        """
+        graph = load_graph_binary(directory)
+        path = os.path.join(directory, METRICS_FILE)
+        if not os.path.exists(path):
+            return cls(graph)
+        nodes = list(graph.nodes)
+        with np.load(path) as metrics:
+            if 'adjacency' not in metrics.files or str(metrics['adjacency']) != _adjacency_digest(directory):
+                return cls(graph)
+            return cls(graph, *(dict(zip(nodes, metrics[name].tolist()))
+                                for name in ('degrees', 'components', 'triangles')))
+
+
+def refresh_graph(directory: str, json_file_path: str) -> Tuple[IncrementalGraph, GraphDelta]:
+    """
+    Brings a graph stored with ``save_graph_binary`` up to date with a new crawl snapshot.
+
+    Only the delta is applied to the graph and its metrics; the binary files are then
+    rewritten from arrays, which is much cheaper than rebuilding the graph. The size
+    of the delta is reported as a ``graph_refreshed`` event of the shared ``instrumentation``.
+
+    Args:
+        directory (str): Directory of the stored graph.
+        json_file_path (str): Path to the new friends-of-friends snapshot.
+
+    Returns:
+        Tuple[IncrementalGraph, GraphDelta]: The updated graph and the applied delta.
+    """
+    incremental = IncrementalGraph.load(directory)
+    delta = diff_snapshot(incremental.graph, json_file_path)
+    incremental.apply(delta)
+    instrumentation.event("graph_refreshed", directory=directory, added_nodes=len(delta.added_nodes),
+                          removed_nodes=len(delta.removed_nodes), changed_nodes=len(delta.changed_nodes),
+                          added_edges=len(delta.added_edges), removed_edges=len(delta.removed_edges))
+    if not delta.is_empty():
+        incremental.save(directory)
+    return incremental, delta
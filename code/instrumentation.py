@@ -0,0 +1,301 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+try:
+    from tqdm.auto import tqdm
+except ImportError:  # TqdmSink is then unavailable
+    tqdm = None
+
+REQUESTS = "requests"
+RETRIES = "retries"
+RATE_LIMIT_WAITS = "rate_limit_waits"
+CACHE_HITS = "cache_hits"
+CACHE_MISSES = "cache_misses"
+ERRORS = "errors"
+
+
+class Sink:
+    """
+    Receives what an ``Instrumentation`` records. Every method is a no-op here,
+    so a sink only overrides what it is interested in.
+    """
+
+    def span(self, name: str, seconds: float, fields: Dict[str, Any]) -> None:
+        pass
+
+    def count(self, name: str, value: float, total: float) -> None:
+        pass
+
+    def event(self, name: str, fields: Dict[str, Any]) -> None:
+        pass
+
+    def start_progress(self, name: str, total: Optional[int]) -> None:
+        pass
+
+    def advance(self, name: str, steps: int) -> None:
+        pass
+
+    def finish_progress(self, name: str) -> None:
+        pass
+
+    def close(self, metrics: Dict[str, Any]) -> None:
+        pass
+
+
+class LogSink(Sink):
+    """
+    Writes spans and events as one JSON object per log record, and the
+    collected metrics when the instrumentation is closed.
+
+    Args:
+        logger (Optional[logging.Logger]): Logger to write to, ``NetworkAnalysis`` by default.
+        level (int): Level of spans and of the final metrics; events of errors are logged as warnings.
+        spans (bool): Log every span, not only events. Spans of API calls are as many as the requests.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO, spans: bool = True):
+        self.logger = logger if logger is not None else logging.getLogger("NetworkAnalysis")
+        self.level = level
+        self.spans = spans
+
+    def _log(self, level: int, record: Dict[str, Any]) -> None:
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
+
+    def span(self, name: str, seconds: float, fields: Dict[str, Any]) -> None:
+        if self.spans:
+            self._log(self.level, {"type": "span", "name": name, "seconds": seconds, **fields})
+
+    def event(self, name: str, fields: Dict[str, Any]) -> None:
+        level = logging.WARNING if "error" in fields else self.level
+        self._log(level, {"type": "event", "name": name, **fields})
+
+    def close(self, metrics: Dict[str, Any]) -> None:
+        self._log(self.level, {"type": "metrics", **metrics})
+
+
+class JSONMetricsSink(Sink):
+    """
+    Writes the collected metrics, and the events if asked to, to a JSON file
+    when the instrumentation is closed.
+
+    Args:
+        path (str): Output file.
+        events (bool): Also keep every event and write them under ``events``.
+    """
+
+    def __init__(self, path: str, events: bool = True):
+        self.path = path
+        self.keep_events = events
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def event(self, name: str, fields: Dict[str, Any]) -> None:
+        if self.keep_events:
+            with self._lock:
+                self.events.append({"name": name, "time": time.time(), **fields})
+
+    def close(self, metrics: Dict[str, Any]) -> None:
+        output = dict(metrics, events=self.events) if self.keep_events else metrics
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(output, file, ensure_ascii=False, indent=4, default=str)
+
+
+class TqdmSink(Sink):
+    """
+    Shows a tqdm progress bar for every running progress, with the request,
+    retry and cache counters as its postfix.
+
+    Args:
+        postfix (Sequence[str]): Counters shown next to the bars.
+        **kwargs: Passed to ``tqdm``, e.g. ``leave`` or ``file``.
+    """
+
+    def __init__(self, postfix: Sequence[str] = (REQUESTS, RETRIES, RATE_LIMIT_WAITS, CACHE_HITS), **kwargs):
+        if tqdm is None:
+            raise ImportError("TqdmSink requires tqdm")
+        self.postfix = list(postfix)
+        self.kwargs = kwargs
+        self.counters: Dict[str, float] = {}
+        self.bars: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float, total: float) -> None:
+        if name in self.postfix:
+            self.counters[name] = total
+
+    def start_progress(self, name: str, total: Optional[int]) -> None:
+        with self._lock:
+            self.bars[name] = tqdm(total=total, desc=name, **self.kwargs)
+
+    def advance(self, name: str, steps: int) -> None:
+        with self._lock:
+            bar = self.bars.get(name)
+            if bar is not None:
+                bar.set_postfix(self.counters, refresh=False)
+                bar.update(steps)
+
+    def finish_progress(self, name: str) -> None:
+        with self._lock:
+            bar = self.bars.pop(name, None)
+            if bar is not None:
+                bar.set_postfix(self.counters, refresh=False)
+                bar.close()
+
+    def close(self, metrics: Dict[str, Any]) -> None:
+        for name in list(self.bars):
+            self.finish_progress(name)
+
+
+class Instrumentation:
+    """
+    Thread-safe collector of timing spans, counters and events, forwarded to pluggable sinks.
+
+    Nothing is printed: the crawler and the analysis steps record into it, and
+    ``metrics()`` returns what was collected as a dictionary. Sinks decide how
+    it is shown or stored (``LogSink``, ``JSONMetricsSink``, ``TqdmSink``);
+    without sinks, recording only updates the in-memory totals.
+
+    Args:
+        sinks (Sequence[Sink]): Initial sinks.
+    """
+
+    def __init__(self, sinks: Sequence[Sink] = ()):
+        self.sinks = list(sinks)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._spans: Dict[str, List[float]] = {}
+
+    def add_sink(self, sink: Sink) -> Sink:
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink: Sink) -> None:
+        self.sinks.remove(sink)
+
+    def _notify(self, method: str, *args) -> None:
+        for sink in self.sinks:
+            getattr(sink, method)(*args)
+
+    def record(self, name: str, seconds: float, **fields) -> None:
+        """
+        Adds an already measured duration to the span statistics of ``name``.
+
+        Args:
+            name (str): Span name, e.g. ``api.friends.get``.
+            seconds (float): Duration.
+            **fields: Context passed to the sinks, e.g. the user ID.
+        """
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                self._spans[name] = [1, seconds, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = min(stats[2], seconds)
+                stats[3] = max(stats[3], seconds)
+        self._notify("span", name, seconds, fields)
+
+    @contextmanager
+    def span(self, name: str, **fields) -> Iterator[Dict[str, Any]]:
+        """
+        Times the enclosed block. The yielded dictionary holds ``fields`` and may
+        be extended inside the block; an exception is recorded under ``error``.
+
+        Args:
+            name (str): Span name.
+            **fields: Context passed to the sinks.
+        """
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as error:
+            fields["error"] = repr(error)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, **fields)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """
+        Increments a counter, e.g. ``REQUESTS`` or ``CACHE_HITS``.
+
+        Args:
+            name (str): Counter name.
+            value (float): Increment.
+        """
+        with self._lock:
+            total = self._counters.get(name, 0) + value
+            self._counters[name] = total
+        self._notify("count", name, value, total)
+
+    def event(self, name: str, **fields) -> None:
+        """
+        Reports something that happened once, e.g. a failed request. Events
+        carrying an ``error`` field are also counted under ``ERRORS``.
+
+        Args:
+            name (str): Event name.
+            **fields: Details passed to the sinks.
+        """
+        if "error" in fields:
+            self.count(ERRORS)
+        self._notify("event", name, fields)
+
+    @contextmanager
+    def progress(self, name: str, total: Optional[int] = None) -> Iterator[Callable[[int], None]]:
+        """
+        Tracks the progress of a loop; yields a function advancing it by some steps.
+
+        Args:
+            name (str): Progress name, shown by ``TqdmSink``.
+            total (Optional[int]): Number of steps, if known.
+        """
+        self._notify("start_progress", name, total)
+        try:
+            yield lambda steps=1: self._notify("advance", name, steps)
+        finally:
+            self._notify("finish_progress", name)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: ``counters`` by name and ``spans`` by name, each span
+            with its ``count``, ``total``, ``mean``, ``min`` and ``max`` seconds.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "spans": {
+                    name: {"count": count, "total": total, "mean": total / count, "min": low, "max": high}
+                    for name, (count, total, low, high) in self._spans.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._spans.clear()
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Hands the collected metrics to every sink, e.g. for ``JSONMetricsSink`` to write them.
+
+        Returns:
+            Dict[str, Any]: The metrics, as returned by ``metrics()``.
+        """
+        metrics = self.metrics()
+        self._notify("close", metrics)
+        return metrics
+
+
+# shared by the crawlers and the API helpers; add sinks to it to see what they do
+instrumentation = Instrumentation()
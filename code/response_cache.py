@@ -0,0 +1,110 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Any, Optional
+
+FRIENDS_IDS = "friends_ids"
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+
+class ResponseCache:
+    """
+    SQLite store of API responses keyed by kind and user ID, with a time to live.
+
+    Every ``put`` is committed immediately, so a crawl that crashes or loses its
+    token keeps everything fetched so far and a rerun only requests users that
+    are missing or whose entries are older than ``ttl``.
+
+    Args:
+        path (str): Path to the SQLite database file.
+        ttl (float): Seconds after which a cached response is considered stale.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "kind TEXT NOT NULL, user_id TEXT NOT NULL, fetched_at REAL NOT NULL, payload TEXT NOT NULL, "
+            "PRIMARY KEY (kind, user_id))"
+        )
+        self._connection.commit()
+
+    def get(self, kind: str, user_id: str) -> Optional[Any]:
+        """
+        Returns a cached response if it is present and fresh.
+
+        Args:
+            kind (str): Type of the response, e.g. ``FRIENDS_IDS``.
+            user_id (str): VK user ID.
+
+        Returns:
+            Optional[Any]: The cached payload, or None if it is missing or stale.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM responses WHERE kind = ? AND user_id = ? AND fetched_at >= ?",
+                (kind, str(user_id), time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, kind: str, user_id: str, payload: Any) -> None:
+        """
+        Stores a response, replacing any previous one for the same key.
+
+        Args:
+            kind (str): Type of the response.
+            user_id (str): VK user ID.
+            payload (Any): JSON serialisable response.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (kind, user_id, fetched_at, payload) VALUES (?, ?, ?, ?)",
+                (kind, str(user_id), time.time(), json.dumps(payload, ensure_ascii=False)),
+            )
+            self._connection.commit()
+
+    def missing(self, kind: str, user_ids: List[str]) -> List[str]:
+        """
+        Filters user IDs down to those without a fresh cached response.
+
+        Args:
+            kind (str): Type of the response.
+            user_ids (List[str]): VK user IDs.
+
+        Returns:
+            List[str]: IDs that still have to be fetched, in their original order.
+        """
+        with self._lock:
+            fresh = {
+                row[0] for row in self._connection.execute(
+                    "SELECT user_id FROM responses WHERE kind = ? AND fetched_at >= ?",
+                    (kind, time.time() - self.ttl),
+                )
+            }
+        return [user_id for user_id in user_ids if str(user_id) not in fresh]
+
+    def purge_expired(self) -> int:
+        """
+        Deletes stale responses.
+
+        Returns:
+            int: Number of deleted entries.
+        """
+        with self._lock:
+            cursor = self._connection.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self._connection.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
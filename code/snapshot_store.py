@@ -0,0 +1,256 @@
+import gzip
+import json
+import os
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import networkx as nx
+import numpy as np
+
+try:
+    from .get_friends import _node_ids_array, create_graph_from_json, load_graph_arrays, load_graph_binary, save_graph_binary
+    from .graph_delta import GraphDelta, apply_delta, diff_graphs, diff_snapshot
+except ImportError:  # executed from inside the code/ directory
+    from get_friends import _node_ids_array, create_graph_from_json, load_graph_arrays, load_graph_binary, save_graph_binary
+    from graph_delta import GraphDelta, apply_delta, diff_graphs, diff_snapshot
+
+INDEX_FILE = 'index.json'
+BASE_DIRECTORY = 'base'
+DELTAS_DIRECTORY = 'deltas'
+
+
+def _encode_ids(nodes: List[Hashable]) -> np.ndarray:
+    return _node_ids_array(nodes)[0]
+
+
+def _decode_ids(array: np.ndarray, node_id_type: str) -> List[Hashable]:
+    return [str(node) for node in array.tolist()] if node_id_type == 'str' else array.tolist()
+
+
+def _key_of(node: Hashable, array: np.ndarray):
+    """The value ``node`` is stored as in an array built by ``_encode_ids``, None if it cannot occur."""
+    if array.dtype.kind in 'iu':
+        text = str(node)
+        return int(text) if text.isdigit() else None
+    return str(node)
+
+
+def _count(array: np.ndarray, nodes: List[Hashable]) -> np.ndarray:
+    """How many times every node occurs in an array of encoded IDs."""
+    values, counts = np.unique(array, return_counts=True)
+    result = np.zeros(len(nodes), dtype=np.int64)
+    for i, node in enumerate(nodes):
+        key = _key_of(node, values)
+        if key is None or not len(values):
+            continue
+        position = np.searchsorted(values, key)
+        if position < len(values) and values[position] == key:
+            result[i] = counts[position]
+    return result
+
+
+class SnapshotStore:
+    """
+    Repeated crawls of one network: a base graph plus one compressed delta per later crawl.
+
+    The first snapshot is saved with ``save_graph_binary`` into ``base/``. Every
+    later one only stores what changed since the previous one: added and removed
+    edges and the added, removed and changed nodes as compressed ID arrays
+    (``deltas/NNNNNN.npz``), and the attributes of added and changed nodes, in the
+    order of their ID arrays, as gzipped JSON (``deltas/NNNNNN.json.gz``).
+    ``index.json`` lists the timestamps and sizes of all snapshots.
+
+    Args:
+        directory (str): Directory of the store, created on the first snapshot.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self._index = json.load(file)
+        else:
+            self._index = {'snapshots': []}
+        self._head = None
+
+    @property
+    def timestamps(self) -> List[float]:
+        return [snapshot['timestamp'] for snapshot in self._index['snapshots']]
+
+    def _delta_path(self, number: int, suffix: str) -> str:
+        return os.path.join(self.directory, DELTAS_DIRECTORY, f'{number:06d}{suffix}')
+
+    def _save_index(self) -> None:
+        with open(os.path.join(self.directory, INDEX_FILE), 'w', encoding='utf-8') as file:
+            json.dump(self._index, file, indent=4)
+
+    def _check_timestamp(self, timestamp: Optional[float]) -> float:
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.timestamps and timestamp <= self.timestamps[-1]:
+            raise ValueError(f"Snapshots must be added in time order, got {timestamp} after {self.timestamps[-1]}")
+        return timestamp
+
+    def add_graph(self, graph: nx.Graph, timestamp: Optional[float] = None) -> Optional[GraphDelta]:
+        """
+        Adds a crawl given as a graph, e.g. one loaded from GML.
+
+        Args:
+            graph (nx.Graph): The graph of this crawl.
+            timestamp (Optional[float]): Unix time of the crawl, now by default.
+
+        Returns:
+            Optional[GraphDelta]: The stored delta, None for the base snapshot.
+        """
+        timestamp = self._check_timestamp(timestamp)
+        if not self._index['snapshots']:
+            save_graph_binary(graph, os.path.join(self.directory, BASE_DIRECTORY))
+            self._head = graph.copy()
+            self._index['snapshots'].append({'timestamp': timestamp, 'delta': None})
+            self._save_index()
+            return None
+        return self._add_delta(diff_graphs(self.graph_at(self.timestamps[-1]), graph), timestamp)
+
+    def add_snapshot(self, json_file_path: str, timestamp: Optional[float] = None) -> Optional[GraphDelta]:
+        """
+        Adds a crawl given as a friends-of-friends JSON file, streamed like in ``create_graph_from_json``.
+
+        Args:
+            json_file_path (str): Path to the snapshot.
+            timestamp (Optional[float]): Unix time of the crawl, now by default.
+
+        Returns:
+            Optional[GraphDelta]: The stored delta, None for the base snapshot.
+        """
+        if not self._index['snapshots']:
+            return self.add_graph(create_graph_from_json(json_file_path), timestamp)
+        timestamp = self._check_timestamp(timestamp)
+        return self._add_delta(diff_snapshot(self.graph_at(self.timestamps[-1]), json_file_path), timestamp)
+
+    def _add_delta(self, delta: GraphDelta, timestamp: float) -> GraphDelta:
+        number = len(self._index['snapshots'])
+        os.makedirs(os.path.join(self.directory, DELTAS_DIRECTORY), exist_ok=True)
+        endpoints = [node for edge in delta.added_edges + delta.removed_edges for node in edge]
+        added_nodes, changed_nodes = list(delta.added_nodes), list(delta.changed_nodes)
+        node_id_type = _node_ids_array(endpoints + delta.removed_nodes + added_nodes + changed_nodes)[1]
+        # node IDs are kept out of the JSON, whose object keys would turn them into strings
+        np.savez_compressed(
+            self._delta_path(number, '.npz'),
+            added_edges=_encode_ids([node for edge in delta.added_edges for node in edge]).reshape(-1, 2),
+            removed_edges=_encode_ids([node for edge in delta.removed_edges for node in edge]).reshape(-1, 2),
+            removed_nodes=_encode_ids(delta.removed_nodes),
+            added_nodes=_encode_ids(added_nodes),
+            changed_nodes=_encode_ids(changed_nodes),
+        )
+        with gzip.open(self._delta_path(number, '.json.gz'), 'wt', encoding='utf-8') as file:
+            json.dump({'added_nodes': [delta.added_nodes[node] for node in added_nodes],
+                       'changed_nodes': [delta.changed_nodes[node] for node in changed_nodes]}, file,
+                      ensure_ascii=False)
+
+        self._index['snapshots'].append({
+            'timestamp': timestamp,
+            'delta': f'{number:06d}',
+            'node_id_type': node_id_type,
+            'added_nodes': len(delta.added_nodes),
+            'removed_nodes': len(delta.removed_nodes),
+            'changed_nodes': len(delta.changed_nodes),
+            'added_edges': len(delta.added_edges),
+            'removed_edges': len(delta.removed_edges),
+        })
+        self._save_index()
+        apply_delta(self._head, delta)
+        return delta
+
+    def _load_arrays(self, number: int) -> Dict[str, np.ndarray]:
+        with np.load(self._delta_path(number, '.npz')) as arrays:
+            return {name: arrays[name] for name in arrays.files}
+
+    def load_delta(self, number: int) -> GraphDelta:
+        """
+        Args:
+            number (int): Position of the snapshot, from 1 (0 is the base).
+
+        Returns:
+            GraphDelta: The changes from the previous snapshot to this one.
+        """
+        node_id_type = self._index['snapshots'][number]['node_id_type']
+        arrays = self._load_arrays(number)
+        with gzip.open(self._delta_path(number, '.json.gz'), 'rt', encoding='utf-8') as file:
+            attributes = json.load(file)
+
+        def edges(array: np.ndarray) -> List[tuple]:
+            ends = _decode_ids(array.ravel(), node_id_type)
+            return list(zip(ends[0::2], ends[1::2]))
+
+        def nodes(name: str) -> Dict[Hashable, Dict[str, Any]]:
+            return dict(zip(_decode_ids(arrays[name], node_id_type), attributes[name]))
+
+        return GraphDelta(
+            added_nodes=nodes('added_nodes'),
+            removed_nodes=_decode_ids(arrays['removed_nodes'], node_id_type),
+            changed_nodes=nodes('changed_nodes'),
+            added_edges=edges(arrays['added_edges']),
+            removed_edges=edges(arrays['removed_edges']),
+        )
+
+    def graph_at(self, timestamp: float) -> nx.Graph:
+        """
+        Reconstructs the graph as of the latest snapshot taken at or before ``timestamp``.
+
+        Args:
+            timestamp (float): Unix time.
+
+        Returns:
+            nx.Graph: The graph; a copy, so it can be modified freely.
+        """
+        timestamps = self.timestamps
+        if not timestamps or timestamp < timestamps[0]:
+            raise ValueError(f"No snapshot at or before {timestamp}")
+        last = int(np.searchsorted(timestamps, timestamp, side='right')) - 1
+        if last == len(timestamps) - 1 and self._head is not None:
+            return self._head.copy()
+
+        graph = load_graph_binary(os.path.join(self.directory, BASE_DIRECTORY))
+        for number in range(1, last + 1):
+            apply_delta(graph, self.load_delta(number))
+        if last == len(timestamps) - 1:
+            self._head = graph.copy()
+        return graph
+
+    def degree_history(self, nodes: Iterable[Hashable]) -> Dict[Hashable, np.ndarray]:
+        """
+        Degree of some nodes at every snapshot, read from the edge deltas alone.
+
+        Args:
+            nodes (Iterable[Hashable]): Node IDs.
+
+        Returns:
+            Dict[Hashable, np.ndarray]: Degree of every node at every timestamp of ``timestamps``.
+        """
+        nodes = list(nodes)
+        arrays = load_graph_arrays(os.path.join(self.directory, BASE_DIRECTORY))
+        node_ids = np.asarray(arrays['node_ids'])
+        base_degrees = np.diff(np.asarray(arrays['indptr']))
+        degrees = np.zeros(len(nodes), dtype=np.int64)
+        for i, node in enumerate(nodes):
+            key = _key_of(node, node_ids)
+            positions = np.flatnonzero(node_ids == key) if key is not None else []
+            if len(positions):
+                degrees[i] = base_degrees[positions[0]]
+
+        history = [degrees.copy()]
+        for number in range(1, len(self._index['snapshots'])):
+            arrays = self._load_arrays(number)
+            degrees += _count(arrays['added_edges'].ravel(), nodes) - _count(arrays['removed_edges'].ravel(), nodes)
+            history.append(degrees.copy())
+        history = np.array(history).reshape(-1, len(nodes))
+        return {node: history[:, i] for i, node in enumerate(nodes)}
+
+    def churn(self) -> List[Dict[str, Any]]:
+        """
+        Returns:
+            List[Dict[str, Any]]: For every snapshot after the base, its timestamp and the
+            numbers of added, removed and changed nodes and of added and removed edges.
+        """
+        return [{key: value for key, value in snapshot.items() if key not in ('delta', 'node_id_type')}
+                for snapshot in self._index['snapshots'][1:]]
@@ -0,0 +1,191 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+def generate_friendships(num_users: int, avg_friends: int = 20, seed: int = 0) -> Dict[int, List[int]]:
+    """
+    Generates a random symmetric friendship relation for the stub server.
+
+    Args:
+        num_users (int): Number of users, IDs run from 1 to ``num_users``.
+        avg_friends (int): Average number of friends per user.
+        seed (int): Random seed.
+
+    Returns:
+        Dict[int, List[int]]: Friends IDs of every user.
+    """
+    rng = random.Random(seed)
+    friendships = {user_id: set() for user_id in range(1, num_users + 1)}
+    for _ in range(num_users * avg_friends // 2):
+        a, b = rng.randint(1, num_users), rng.randint(1, num_users)
+        if a != b:
+            friendships[a].add(b)
+            friendships[b].add(a)
+    return {user_id: sorted(friends) for user_id, friends in friendships.items()}
+
+
+EXECUTE_CALL_PATTERN = re.compile(r'API\.friends\.get\((\{.*?\})\)')
+MAX_EXECUTE_CALLS = 25
+
+
+class StubVKServer:
+    """
+    Local imitation of the VK API ``friends.get`` and ``execute`` methods that enforces a per-second quota.
+
+    Requests above the quota are answered with VK error 6, exactly like the real API,
+    so crawlers can be exercised offline. Use as a context manager and pass ``url``
+    as the crawler's ``api_url``.
+
+    Args:
+        friendships (Dict[int, List[int]]): Friends IDs of every user.
+        requests_per_second (int): Quota, requests beyond it within one second fail.
+        latency (float): Artificial response delay in seconds.
+        private_users (Optional[List[int]]): Users whose friends list is hidden (error 30).
+        access_tokens (Optional[List[str]]): Tokens accepted by the server, any by default.
+            Requests with other tokens fail with error 5; clear the set to expire them all.
+        flaky_users (Optional[Dict[int, int]]): Number of times the friends list of each of
+            these users fails with a transient error (10) before it is returned.
+    """
+
+    def __init__(self, friendships: Dict[int, List[int]], requests_per_second: int = 3,
+                 latency: float = 0.0, private_users: Optional[List[int]] = None,
+                 access_tokens: Optional[List[str]] = None, flaky_users: Optional[Dict[int, int]] = None):
+        self.friendships = friendships
+        self.requests_per_second = requests_per_second
+        self.latency = latency
+        self.private_users = set(private_users or [])
+        self.access_tokens = set(access_tokens) if access_tokens is not None else None
+        self.flaky_users = dict(flaky_users or {})
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/method"
+
+    def start(self) -> "StubVKServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubVKServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _within_quota(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.request_count += 1
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.requests_per_second:
+                self.rate_limited_count += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def _friend_item(self, user_id: int) -> Dict:
+        return {
+            "id": user_id,
+            "first_name": f"User{user_id}",
+            "last_name": "Stub",
+            "sex": user_id % 3,
+            "city": {"id": user_id % 10, "title": f"City{user_id % 10}"},
+        }
+
+    def friends_get(self, params: Dict[str, str]) -> Dict:
+        user_id = int(params.get("user_id", 0))
+        if user_id in self.private_users:
+            return {"error": {"error_code": 30, "error_msg": "This profile is private"}}
+        if user_id not in self.friendships:
+            return {"error": {"error_code": 18, "error_msg": "User was deleted or banned"}}
+        with self._lock:
+            if self.flaky_users.get(user_id, 0) > 0:
+                self.flaky_users[user_id] -= 1
+                return {"error": {"error_code": 10, "error_msg": "Internal server error"}}
+        friends = self.friendships[user_id]
+        offset = int(params.get("offset", 0))
+        count = int(params.get("count", 5000))
+        items = friends[offset:offset + count]
+        if "fields" in params:
+            items = [self._friend_item(friend_id) for friend_id in items]
+        return {"response": {"count": len(friends), "items": items}}
+
+    def execute(self, params: Dict[str, str]) -> Dict:
+        """
+        Runs ``return [API.friends.get({...}), ...];`` scripts the way VK does:
+        failed sub-calls become ``false`` and are described in ``execute_errors``.
+        """
+        calls = [json.loads(call) for call in EXECUTE_CALL_PATTERN.findall(params.get("code", ""))]
+        if len(calls) > MAX_EXECUTE_CALLS:
+            return {"error": {"error_code": 13, "error_msg": "Too many API calls in execute"}}
+        results, errors = [], []
+        for call in calls:
+            answer = self.friends_get({key: str(value) for key, value in call.items()})
+            if "error" in answer:
+                results.append(False)
+                errors.append(dict(answer["error"], method="friends.get"))
+            else:
+                results.append(answer["response"])
+        data = {"response": results}
+        if errors:
+            data["execute_errors"] = errors
+        return data
+
+    def handle(self, method: str, params: Dict[str, str]) -> Dict:
+        if not self._within_quota():
+            return {"error": {"error_code": 6, "error_msg": "Too many requests per second"}}
+        if self.access_tokens is not None and params.get("access_token") not in self.access_tokens:
+            return {"error": {"error_code": 5, "error_msg": "User authorization failed: invalid access_token"}}
+        if method == "friends.get":
+            return self.friends_get(params)
+        if method == "execute":
+            return self.execute(params)
+        return {"error": {"error_code": 3, "error_msg": "Unknown method passed"}}
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, query: str) -> None:
+                if stub.latency:
+                    time.sleep(stub.latency)
+                method = urlparse(self.path).path.rsplit("/", 1)[-1]
+                params = {key: values[-1] for key, values in parse_qs(query).items()}
+                body = json.dumps(stub.handle(method, params)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._reply(urlparse(self.path).query)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self._reply(self.rfile.read(length).decode("utf-8"))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
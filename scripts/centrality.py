@@ -0,0 +1,338 @@
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from distances import parallel_bfs_sweep
+from graph_csr import CSRGraph, as_csr
+from metrics_cache import memoize_metric
+
+
+class BetweennessEstimate(NamedTuple):
+    """
+    Betweenness estimated from a sample of source nodes.
+
+    Attributes:
+        values (np.ndarray): Estimated betweenness of every node.
+        standard_error (np.ndarray): Standard error of every estimate, from the spread
+            of the per-source contributions.
+        epsilon (float): With probability ``1 - delta``, every estimate is within
+            ``epsilon`` of the exact normalised betweenness (Hoeffding and union bounds).
+        samples (int): Number of sources used.
+    """
+    values: np.ndarray
+    standard_error: np.ndarray
+    epsilon: float
+    samples: int
+
+
+@memoize_metric()
+def degree_centrality(G: Union[nx.Graph, CSRGraph]) -> np.ndarray:
+    """
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+
+    Returns:
+        np.ndarray: Degree of every node divided by ``n - 1``, as ``nx.degree_centrality``.
+    """
+    n = G.number_of_nodes()
+    return G.degrees() / (n - 1) if n > 1 else np.ones(n)
+
+
+@memoize_metric(ignore=("workers", "batch_size"))
+def closeness_centrality(G: Union[nx.Graph, CSRGraph], workers: int = 1, batch_size: int = 64) -> np.ndarray:
+    """
+    Closeness from one BFS sweep, with the Wasserman–Faust scaling of ``nx.closeness_centrality``
+    for disconnected graphs.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        workers (int): Number of processes for the sweep, see ``distances.parallel_bfs_sweep``.
+        batch_size (int): Number of BFS run together.
+
+    Returns:
+        np.ndarray: Closeness of every node.
+    """
+    n = G.number_of_nodes()
+    sweep = parallel_bfs_sweep(G, workers=workers, batch_size=batch_size)
+    reached = sweep.reached.astype(float)
+    closeness = np.zeros(n)
+    positive = sweep.distance_sum > 0
+    closeness[positive] = reached[positive] ** 2 / sweep.distance_sum[positive] / (n - 1)
+    return closeness
+
+
+@memoize_metric()
+def pagerank(G: Union[nx.Graph, CSRGraph], alpha: float = 0.85, max_iter: int = 100,
+             tol: float = 1.0e-6) -> np.ndarray:
+    """
+    PageRank by power iteration over the sparse adjacency matrix.
+
+    Edges are unweighted. Dangling nodes spread their rank uniformly and convergence
+    is tested as in ``nx.pagerank``: the L1 change of the vector is below ``n * tol``.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        alpha (float): Damping factor.
+        max_iter (int): Maximum number of iterations.
+        tol (float): Tolerance per node.
+
+    Returns:
+        np.ndarray: PageRank of every node, summing to 1.
+    """
+    n = G.number_of_nodes()
+    if n == 0:
+        return np.zeros(0)
+    degrees = G.degrees().astype(float)
+    dangling = degrees == 0
+    # column-stochastic transition matrix of the undirected graph is A D^-1
+    inverse_degrees = np.divide(1.0, degrees, out=np.zeros(n), where=~dangling)
+    adjacency = G.to_scipy().astype(float)
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        last = x
+        x = alpha * (adjacency @ (last * inverse_degrees) + last[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(x - last).sum() < n * tol:
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+@memoize_metric()
+def eigenvector_centrality(G: Union[nx.Graph, CSRGraph], max_iter: int = 100, tol: float = 1.0e-6) -> np.ndarray:
+    """
+    Eigenvector centrality by power iteration on ``A + I``, as ``nx.eigenvector_centrality``.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        max_iter (int): Maximum number of iterations.
+        tol (float): Tolerance per node.
+
+    Returns:
+        np.ndarray: Centrality of every node, with unit Euclidean norm.
+    """
+    n = G.number_of_nodes()
+    if n == 0:
+        raise nx.NetworkXPointlessConcept("cannot compute centrality for the null graph")
+    adjacency = G.to_scipy().astype(float)
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        last = x
+        x = last + adjacency @ last
+        norm = np.linalg.norm(x)
+        x = x / norm if norm else x
+        if np.abs(x - last).sum() < n * tol:
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def _dependencies(adjacency: sparse.csr_matrix, sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Brandes dependencies of every node on a batch of sources.
+
+    The BFS of all sources advance together: path counts of one level are the
+    sparse product of the adjacency matrix with the counts of the previous one,
+    and dependencies flow back level by level the same way.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: For every node the sum over the sources of its
+        dependency and the sum of its squared dependency.
+    """
+    n = adjacency.shape[0]
+    columns = np.arange(len(sources))
+    level = np.full((n, len(sources)), -1, dtype=np.int32)
+    level[sources, columns] = 0
+    paths = np.zeros((n, len(sources)))
+    paths[sources, columns] = 1.0
+    frontier = paths.copy()
+    depth = 0
+    while True:
+        reach = adjacency @ frontier
+        new = (reach > 0) & (level < 0)
+        if not new.any():
+            break
+        depth += 1
+        level[new] = depth
+        frontier = np.where(new, reach, 0.0)
+        paths += frontier
+
+    dependency = np.zeros((n, len(sources)))
+    for d in range(depth, 0, -1):
+        at_level = level == d
+        share = np.divide(1.0 + dependency, paths, out=np.zeros_like(paths), where=at_level)
+        dependency += np.where(level == d - 1, paths * (adjacency @ share), 0.0)
+    dependency[sources, columns] = 0.0
+    return dependency.sum(axis=1), (dependency ** 2).sum(axis=1)
+
+
+def _dependencies_in_batches(adjacency: sparse.csr_matrix, sources: np.ndarray,
+                             batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    total = np.zeros(adjacency.shape[0])
+    squares = np.zeros(adjacency.shape[0])
+    for start in range(0, len(sources), batch_size):
+        batch_total, batch_squares = _dependencies(adjacency, sources[start:start + batch_size])
+        total += batch_total
+        squares += batch_squares
+    return total, squares
+
+
+_worker_adjacency = None
+
+
+def _init_worker(directory: str) -> None:
+    """Builds the adjacency matrix once per worker from the memory-mapped CSR arrays."""
+    global _worker_adjacency
+    indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode='r')
+    indices = np.load(os.path.join(directory, 'indices.npy'), mmap_mode='r')
+    _worker_adjacency = CSRGraph(indptr, indices).to_scipy().astype(float)
+
+
+def _dependencies_in_worker(sources: np.ndarray, batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    return _dependencies_in_batches(_worker_adjacency, sources, batch_size)
+
+
+def _parallel_dependencies(G: CSRGraph, sources: np.ndarray, workers: Optional[int],
+                           batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """``_dependencies`` over all sources, split across processes like ``distances.parallel_bfs_sweep``."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sources) <= batch_size:
+        return _dependencies_in_batches(G.to_scipy().astype(float), sources, batch_size)
+
+    chunks = [chunk for chunk in np.array_split(sources, workers * 4) if len(chunk)]
+    with tempfile.TemporaryDirectory() as directory:
+        np.save(os.path.join(directory, 'indptr.npy'), G.indptr)
+        np.save(os.path.join(directory, 'indices.npy'), G.indices)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory,)) as executor:
+            parts = list(executor.map(_dependencies_in_worker, chunks, [batch_size] * len(chunks)))
+    # summed in chunk order, so the result does not depend on which worker finishes first
+    return sum(part[0] for part in parts), sum(part[1] for part in parts)
+
+
+def _betweenness_scale(n: int, normalized: bool) -> float:
+    """Factor applied to summed dependencies, as in networkx for undirected graphs."""
+    if normalized:
+        return 1.0 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+    return 0.5
+
+
+@memoize_metric(ignore=("workers", "batch_size"))
+def betweenness_centrality(G: Union[nx.Graph, CSRGraph], normalized: bool = True, workers: int = 1,
+                           batch_size: int = 64) -> np.ndarray:
+    """
+    Exact betweenness by Brandes' algorithm, run from all sources in batches.
+
+    Sources are processed ``batch_size`` at a time with sparse matrix products (see
+    ``_dependencies``) and split across ``workers`` processes, which share the
+    graph through memory-mapped files.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        normalized (bool): Divide by the number of node pairs, as ``nx.betweenness_centrality``.
+        workers (int): Number of processes, ``os.cpu_count()`` if None.
+        batch_size (int): Number of sources processed together.
+
+    Returns:
+        np.ndarray: Betweenness of every node.
+    """
+    n = G.number_of_nodes()
+    total, _ = _parallel_dependencies(G, np.arange(n), workers, batch_size)
+    return total * _betweenness_scale(n, normalized)
+
+
+def betweenness_error(n: int, samples: int, delta: float = 0.1) -> float:
+    """
+    Uniform error bound of sampled normalised betweenness.
+
+    Every sampled source contributes a value in ``[0, n / (n - 1)]`` to a node's
+    estimate, so by Hoeffding's inequality and a union bound over the ``n`` nodes all
+    estimates are within the returned epsilon with probability ``1 - delta``.
+
+    Args:
+        n (int): Number of nodes.
+        samples (int): Number of sampled sources.
+        delta (float): Allowed failure probability.
+
+    Returns:
+        float: Epsilon, 0 when every node is a source.
+    """
+    if samples >= n:
+        return 0.0
+    return n / (n - 1) * math.sqrt(math.log(2 * n / delta) / (2 * samples))
+
+
+def sampled_betweenness(G: Union[nx.Graph, CSRGraph], samples: Optional[int] = None, epsilon: float = 0.05,
+                        delta: float = 0.1, normalized: bool = True, seed: Optional[int] = None,
+                        workers: int = 1, batch_size: int = 64) -> BetweennessEstimate:
+    """
+    Betweenness estimated from uniformly sampled pivot sources (Brandes & Pich).
+
+    The dependencies of the pivots are scaled by ``n / samples``, which is what
+    ``nx.betweenness_centrality(G, k=samples)`` does. Without ``samples``, enough
+    pivots are drawn for the ``epsilon``/``delta`` guarantee of ``betweenness_error``.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        samples (Optional[int]): Number of pivots.
+        epsilon (float): Target uniform error when ``samples`` is not given.
+        delta (float): Failure probability of the bound.
+        normalized (bool): Divide by the number of node pairs.
+        seed (Optional[int]): Seed of the pivot sampling.
+        workers (int): Number of processes.
+        batch_size (int): Number of sources processed together.
+
+    Returns:
+        BetweennessEstimate: Estimates, their standard errors and the error bound.
+    """
+    G = as_csr(G)
+    n = G.number_of_nodes()
+    if samples is None:
+        samples = math.ceil((n / (n - 1)) ** 2 * math.log(2 * n / delta) / (2 * epsilon ** 2)) if n > 1 else n
+    samples = min(samples, n)
+    sources = np.sort(np.random.default_rng(seed).choice(n, size=samples, replace=False))
+    total, squares = _parallel_dependencies(G, sources, workers, batch_size)
+
+    scale = _betweenness_scale(n, normalized) * n
+    mean = total / samples
+    variance = np.maximum(squares / samples - mean ** 2, 0.0) * samples / max(samples - 1, 1)
+    # sampling without replacement: finite population correction
+    correction = (n - samples) / (n - 1) if n > 1 else 0.0
+    standard_error = scale * np.sqrt(variance / samples * correction)
+    return BetweennessEstimate(mean * scale, standard_error, betweenness_error(n, samples, delta), samples)
+
+
+CENTRALITIES: Dict[str, Callable[..., np.ndarray]] = {
+    'degree': degree_centrality,
+    'closeness': closeness_centrality,
+    'pagerank': pagerank,
+    'eigenvector': eigenvector_centrality,
+    'betweenness': betweenness_centrality,
+    'sampled_betweenness': lambda G, **kwargs: sampled_betweenness(G, **kwargs).values,
+}
+
+
+def as_parameter(G: Union[nx.Graph, CSRGraph], values: np.ndarray) -> List[Tuple[Hashable, float]]:
+    """
+    Pairs every node ID with its value, the ``parameter`` format of ``plot_utils.show_graph``.
+    """
+    return list(zip(as_csr(G).node_ids.tolist(), np.asarray(values, dtype=float).tolist()))
+
+
+def centrality(G: Union[nx.Graph, CSRGraph], name: str = 'degree', **kwargs) -> List[Tuple[Hashable, float]]:
+    """
+    Computes a centrality and returns it ready for ``show_graph(g, parameter=...)``.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        name (str): One of ``CENTRALITIES``.
+        **kwargs: Passed to the centrality function, e.g. ``workers`` or ``samples``.
+
+    Returns:
+        List[Tuple[Hashable, float]]: ``(vk_id, value)`` pairs in node order.
+    """
+    if name not in CENTRALITIES:
+        raise ValueError(f"Unknown centrality {name!r}, expected one of {sorted(CENTRALITIES)}")
+    return as_parameter(G, CENTRALITIES[name](G, **kwargs))
@@ -0,0 +1,285 @@
+from typing import Callable, Dict, Tuple, Union
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from graph_csr import CSRGraph, as_csr
+from metrics_cache import memoize_metric
+from node_table import node_table
+from triangles import triangle_counts
+
+_MIN_GAIN = 1e-12
+
+
+def _compact(labels: np.ndarray) -> np.ndarray:
+    """Relabels communities as 0..c-1, largest first (ties by smallest old label)."""
+    sizes = np.bincount(labels)
+    order = np.lexsort((np.arange(len(sizes)), -sizes))
+    order = order[sizes[order] > 0]
+    new = np.empty(len(sizes), dtype=np.int64)
+    new[order] = np.arange(len(order))
+    return new[labels]
+
+
+def _group_sums(codes: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct codes and the summed weights of each."""
+    if not len(codes):
+        return codes, weights
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    starts = np.flatnonzero(np.concatenate([[True], codes[1:] != codes[:-1]]))
+    return codes[starts], np.add.reduceat(weights[order], starts)
+
+
+def _best_per_node(nodes: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """Position of the highest score of every node (``nodes`` need not be sorted)."""
+    order = np.lexsort((scores, nodes))
+    nodes = nodes[order]
+    return order[np.append(nodes[1:] != nodes[:-1], True)] if len(order) else order
+
+
+def _modularity(rows: np.ndarray, cols: np.ndarray, data: np.ndarray, strength: np.ndarray,
+                labels: np.ndarray, resolution: float) -> float:
+    two_m = strength.sum()
+    if two_m == 0:
+        return 0.0
+    internal = data[labels[rows] == labels[cols]].sum()
+    totals = np.bincount(labels, weights=strength)
+    return float(internal / two_m - resolution * (totals ** 2).sum() / two_m ** 2)
+
+
+def modularity(G: Union[nx.Graph, CSRGraph], labels: np.ndarray, resolution: float = 1.0) -> float:
+    """
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        labels (np.ndarray): Community of every node.
+        resolution (float): Resolution parameter, as in ``nx.community.modularity``.
+
+    Returns:
+        float: Modularity of the partition.
+    """
+    G = as_csr(G)
+    rows = np.repeat(np.arange(G.number_of_nodes()), G.degrees())
+    data = np.ones(len(rows))
+    return _modularity(rows, G.indices, data, G.degrees().astype(float), np.asarray(labels), resolution)
+
+
+def _move_nodes(rows: np.ndarray, cols: np.ndarray, data: np.ndarray, strength: np.ndarray,
+                resolution: float, rng: np.random.Generator, max_rounds: int) -> np.ndarray:
+    """
+    Louvain local moving, all nodes at once.
+
+    Every round computes for every node the modularity gain of moving to each
+    neighbouring community and moves a random share of the nodes with a positive
+    best gain. Simultaneous moves can interfere, so a round that does not raise
+    modularity is undone and the share halved.
+
+    Returns:
+        np.ndarray: Community of every node.
+    """
+    n = len(strength)
+    two_m = strength.sum()
+    labels = np.arange(n)
+    off_diagonal = rows != cols
+    rows, cols, data = rows[off_diagonal], cols[off_diagonal], data[off_diagonal]
+    quality = _modularity(rows, cols, data, strength, labels, resolution)
+    share = 0.5
+    for _ in range(max_rounds):
+        codes, weights = _group_sums(rows * n + labels[cols], data)
+        nodes, communities = codes // n, codes % n
+        own = communities == labels[nodes]
+        own_weight = np.zeros(n)
+        own_weight[nodes[own]] = weights[own]
+
+        nodes, communities, weights = nodes[~own], communities[~own], weights[~own]
+        totals = np.bincount(labels, weights=strength, minlength=n)
+        gain = (weights - own_weight[nodes]
+                - resolution * strength[nodes] * (totals[communities] - totals[labels[nodes]] + strength[nodes]) / two_m)
+        best = _best_per_node(nodes, gain)
+        best = best[gain[best] > _MIN_GAIN]
+        if not len(best):
+            break
+        moving = best[rng.random(len(best)) < share]
+        candidate = labels.copy()
+        candidate[nodes[moving]] = communities[moving]
+        new_quality = _modularity(rows, cols, data, strength, candidate, resolution)
+        if new_quality > quality + _MIN_GAIN:
+            labels, quality = candidate, new_quality
+        else:
+            share /= 2
+            if share < 1 / 64:
+                break
+    return labels
+
+
+def _split_disconnected(rows: np.ndarray, cols: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Splits every community into its connected components, which never lowers modularity (as in Leiden)."""
+    n = len(labels)
+    inside = labels[rows] == labels[cols]
+    matrix = sparse.csr_matrix((np.ones(inside.sum()), (rows[inside], cols[inside])), shape=(n, n))
+    return csgraph.connected_components(matrix, directed=False)[1]
+
+
+@memoize_metric()
+def louvain_communities(G: Union[nx.Graph, CSRGraph], resolution: float = 1.0, seed: int = 0,
+                        max_levels: int = 20, max_rounds: int = 50) -> np.ndarray:
+    """
+    Louvain modularity optimisation over sparse weighted adjacency arrays.
+
+    Each level moves nodes between communities (see ``_move_nodes``), splits the
+    communities that fell apart into connected pieces, which is the connectivity
+    guarantee of Leiden, and contracts every community into one node of the next,
+    weighted level. It stops when a level moves no node. Partitions are cached per
+    graph fingerprint and parameters in ``metrics_cache``.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        resolution (float): Resolution parameter; larger values give smaller communities.
+        seed (int): Seed of the move order.
+        max_levels (int): Maximum number of contractions.
+        max_rounds (int): Maximum number of moving rounds per level.
+
+    Returns:
+        np.ndarray: Community of every node, 0 being the largest.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = G.to_scipy().astype(float).tocoo()
+    rows, cols, data = matrix.row.astype(np.int64), matrix.col.astype(np.int64), matrix.data
+    labels = np.arange(G.number_of_nodes())
+    for _ in range(max_levels):
+        n = int(labels.max()) + 1 if len(labels) else 0
+        strength = np.bincount(rows, weights=data, minlength=n)
+        level = _compact(_split_disconnected(rows, cols, _move_nodes(rows, cols, data, strength, resolution,
+                                                                     rng, max_rounds)))
+        if level.max(initial=-1) + 1 == n:
+            break
+        labels = level[labels]
+        codes, data = _group_sums(level[rows] * (level.max() + 1) + level[cols], data)
+        rows, cols = codes // (level.max() + 1), codes % (level.max() + 1)
+    return _compact(labels)
+
+
+@memoize_metric()
+def label_propagation_communities(G: Union[nx.Graph, CSRGraph], seed: int = 0, max_iter: int = 100) -> np.ndarray:
+    """
+    Semi-synchronous label propagation.
+
+    In every round each node finds the most frequent label among its neighbours
+    (ties broken at random) and a random half of the nodes adopt it; updating only
+    half avoids the oscillations of fully synchronous updates on bipartite parts.
+    It stops once every node already carries one of its most frequent labels.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        seed (int): Random seed.
+        max_iter (int): Maximum number of rounds.
+
+    Returns:
+        np.ndarray: Community of every node, 0 being the largest.
+    """
+    rng = np.random.default_rng(seed)
+    n = G.number_of_nodes()
+    rows = np.repeat(np.arange(n, dtype=np.int64), G.degrees())
+    cols = G.indices.astype(np.int64)
+    labels = np.arange(n)
+    for _ in range(max_iter):
+        codes, counts = _group_sums(rows * n + labels[cols], np.ones(len(rows)))
+        nodes, candidates = codes // n, codes % n
+        best_count = np.zeros(n)
+        np.maximum.at(best_count, nodes, counts)
+        satisfied = np.zeros(n, dtype=bool)
+        satisfied[nodes[(candidates == labels[nodes]) & (counts == best_count[nodes])]] = True
+        satisfied |= np.diff(G.indptr) == 0
+        if satisfied.all():
+            break
+        best = _best_per_node(nodes, counts + rng.random(len(counts)))
+        update = ~satisfied[nodes[best]] & (rng.random(len(best)) < 0.5)
+        labels[nodes[best[update]]] = candidates[best[update]]
+    return _compact(labels)
+
+
+COMMUNITY_METHODS: Dict[str, Callable[..., np.ndarray]] = {
+    'louvain': louvain_communities,
+    'label_propagation': label_propagation_communities,
+}
+
+
+def detect_communities(G: Union[nx.Graph, CSRGraph], method: str = 'louvain', **kwargs) -> np.ndarray:
+    """
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        method (str): One of ``COMMUNITY_METHODS``.
+        **kwargs: Passed to the method, e.g. ``resolution`` or ``seed``.
+
+    Returns:
+        np.ndarray: Community of every node, 0 being the largest.
+    """
+    if method not in COMMUNITY_METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {sorted(COMMUNITY_METHODS)}")
+    return COMMUNITY_METHODS[method](G, **kwargs)
+
+
+def attach_communities(g: Union[nx.Graph, CSRGraph], labels: np.ndarray, name: str = 'community') -> None:
+    """
+    Stores community IDs as a node attribute and as a column of the graph's ``NodeTable``,
+    where ``show_graph(g, node_colors=name)`` picks them up.
+
+    Args:
+        g (Union[nx.Graph, CSRGraph]): The graph.
+        labels (np.ndarray): Community of every node, in node order.
+        name (str): Attribute name.
+    """
+    labels = np.asarray(labels)
+    if isinstance(g, CSRGraph):
+        g.node_attrs[name] = labels
+    else:
+        nx.set_node_attributes(g, dict(zip(g.nodes, labels.tolist())), name)
+    node_table(g).add_metric(name, labels)
+
+
+def community_summary(G: Union[nx.Graph, CSRGraph], labels: np.ndarray) -> pd.DataFrame:
+    """
+    Size, edges, density and clustering of every community, in one pass over the edges.
+
+    Clustering is the mean local clustering coefficient of the members within the
+    subgraph induced by their community, from one triangle count over the
+    intra-community edges of the whole graph.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        labels (np.ndarray): Community of every node.
+
+    Returns:
+        pd.DataFrame: One row per community with ``size``, ``internal_edges``,
+        ``cut_edges``, ``density`` and ``clustering``.
+    """
+    G = as_csr(G)
+    labels = np.asarray(labels, dtype=np.int64)
+    count = int(labels.max()) + 1 if len(labels) else 0
+    sources, targets = G.edges()
+    inside = labels[sources] == labels[targets]
+
+    size = np.bincount(labels, minlength=count)
+    internal = np.bincount(labels[sources[inside]], minlength=count)
+    cut = (np.bincount(labels[sources[~inside]], minlength=count)
+           + np.bincount(labels[targets[~inside]], minlength=count))
+    pairs = size * (size - 1) / 2
+    density = np.divide(internal, pairs, out=np.zeros(count), where=pairs > 0)
+
+    induced = CSRGraph.from_edges(sources[inside], targets[inside], num_nodes=G.number_of_nodes())
+    degrees = induced.degrees().astype(float)
+    node_pairs = degrees * (degrees - 1) / 2
+    local = np.divide(triangle_counts(induced), node_pairs, out=np.zeros(len(degrees)), where=node_pairs > 0)
+    clustering = np.divide(np.bincount(labels, weights=local, minlength=count), size,
+                           out=np.zeros(count), where=size > 0)
+
+    return pd.DataFrame({
+        'size': size,
+        'internal_edges': internal,
+        'cut_edges': cut,
+        'density': density,
+        'clustering': clustering,
+    }, index=pd.Index(np.arange(count), name='community'))
@@ -0,0 +1,294 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import optimize, special
+
+DEFAULT_CHUNK_SIZE = 1 << 22
+MAX_ALPHA = 10.0
+# exact inverse-CDF table of the tail sampler; beyond it the continuous approximation is used
+_SAMPLER_TABLE_SIZE = 100_000
+
+
+def _unique_counts(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted distinct values and their counts, by sorting (faster than ``np.unique`` on integers here)."""
+    values = np.sort(values, kind='stable')
+    if not len(values):
+        return values.astype(np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], values[1:] != values[:-1]]))
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+
+def degree_histogram(degrees: Iterable[int]) -> np.ndarray:
+    """
+    Args:
+        degrees (Iterable[int]): Degree of every node.
+
+    Returns:
+        np.ndarray: ``histogram[k]`` is the number of nodes of degree ``k``.
+    """
+    return np.bincount(np.asarray(degrees, dtype=np.int64))
+
+
+class DegreeCounter:
+    """
+    Degrees of the nodes of an edge list fed chunk by chunk.
+
+    Node IDs may be any integers, e.g. raw VK IDs: the counter keeps a sorted
+    array of the IDs seen so far with their degrees, and merges every chunk into
+    it, so memory is O(nodes + chunk) whatever the number of edges. Every edge
+    must be given once; a self-loop adds 2 to the degree, as in networkx.
+    """
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.number_of_edges = 0
+
+    def update(self, sources: np.ndarray, targets: np.ndarray) -> None:
+        """
+        Args:
+            sources (np.ndarray): First endpoints of a chunk of edges.
+            targets (np.ndarray): Second endpoints.
+        """
+        ids, counts = _unique_counts(np.concatenate([np.asarray(sources, dtype=np.int64),
+                                                     np.asarray(targets, dtype=np.int64)]))
+        self.number_of_edges += len(sources)
+        positions = np.searchsorted(self.ids, ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == ids[found]
+        self.counts[positions[found]] += counts[found]
+        self.ids = np.insert(self.ids, positions[~found], ids[~found])
+        self.counts = np.insert(self.counts, positions[~found], counts[~found])
+
+    def histogram(self, number_of_nodes: Optional[int] = None) -> np.ndarray:
+        """
+        Args:
+            number_of_nodes (Optional[int]): Total number of nodes, if some have no edges
+                (they are counted at degree 0).
+
+        Returns:
+            np.ndarray: Degree histogram, see ``degree_histogram``.
+        """
+        histogram = degree_histogram(self.counts)
+        if number_of_nodes is not None:
+            if not len(histogram):
+                histogram = np.zeros(1, dtype=np.int64)
+            histogram[0] += number_of_nodes - len(self.ids)
+        return histogram
+
+
+def iter_edge_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Reads an edge list in chunks without loading the whole file.
+
+    ``.npy`` files hold an ``(m, 2)`` integer array and are memory-mapped; any other
+    file is read as text with two integer node IDs per line (``nx.write_edgelist``
+    output; further columns and ``#`` comments are ignored).
+
+    Args:
+        path (str): The file.
+        chunk_size (int): Edges per chunk.
+
+    Yields:
+        Tuple[np.ndarray, np.ndarray]: Sources and targets of a chunk.
+    """
+    if path.endswith('.npy'):
+        edges = np.load(path, mmap_mode='r')
+        for start in range(0, len(edges), chunk_size):
+            chunk = np.asarray(edges[start:start + chunk_size])
+            yield chunk[:, 0], chunk[:, 1]
+        return
+    reader = pd.read_csv(path, sep=r'\s+', header=None, usecols=[0, 1], comment='#', dtype=np.int64,
+                         chunksize=chunk_size)
+    for chunk in reader:
+        yield chunk[0].to_numpy(), chunk[1].to_numpy()
+
+
+def streaming_degree_histogram(source: Union[str, Iterable[Tuple[np.ndarray, np.ndarray]]],
+                               chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Degree histogram of a graph that need not fit in memory.
+
+    Args:
+        source (Union[str, Iterable[Tuple[np.ndarray, np.ndarray]]]): A directory written by
+            ``save_graph_binary`` (degrees are read from its memory-mapped ``indptr.npy``),
+            an edge list file (see ``iter_edge_chunks``) or an iterable of ``(sources, targets)`` chunks.
+        chunk_size (int): Edges (or nodes, for a binary graph) per chunk.
+
+    Returns:
+        np.ndarray: Degree histogram, see ``degree_histogram``.
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        indptr = np.load(os.path.join(source, 'indptr.npy'), mmap_mode='r')
+        histogram = np.zeros(1, dtype=np.int64)
+        for start in range(0, len(indptr) - 1, chunk_size):
+            part = degree_histogram(np.diff(np.asarray(indptr[start:start + chunk_size + 1])))
+            if len(part) > len(histogram):
+                histogram = np.append(histogram, np.zeros(len(part) - len(histogram), dtype=np.int64))
+            histogram[:len(part)] += part
+        return histogram
+
+    chunks = iter_edge_chunks(source, chunk_size) if isinstance(source, str) else source
+    counter = DegreeCounter()
+    for sources, targets in chunks:
+        counter.update(sources, targets)
+    return counter.histogram()
+
+
+class PowerLawFit(NamedTuple):
+    """
+    Discrete power law ``p(k) ~ k^-alpha`` for ``k >= xmin``.
+
+    Attributes:
+        alpha (float): Exponent.
+        xmin (int): Start of the power-law tail.
+        ks (float): Kolmogorov–Smirnov distance between the tail and the fit.
+        n_tail (int): Number of nodes with degree ``>= xmin``.
+        sigma (float): Standard error of ``alpha``, ``(alpha - 1) / sqrt(n_tail)``.
+    """
+    alpha: float
+    xmin: int
+    ks: float
+    n_tail: int
+    sigma: float
+
+
+def _fit_alpha(log_sum: float, n: int, xmin: int) -> float:
+    """Maximum likelihood exponent of a discrete power law with a known ``xmin``."""
+    def negative_log_likelihood(alpha: float) -> float:
+        return alpha * log_sum + n * np.log(special.zeta(alpha, xmin))
+
+    result = optimize.minimize_scalar(negative_log_likelihood, bounds=(1.0 + 1e-6, MAX_ALPHA), method='bounded',
+                                      options={'xatol': 1e-6})
+    return float(result.x)
+
+
+def _ks_distance(degrees: np.ndarray, counts: np.ndarray, alpha: float, xmin: int) -> float:
+    """KS distance of the tail ``degrees >= xmin`` (distinct, ascending, with counts) from the fitted law."""
+    empirical = np.cumsum(counts) / counts.sum()
+    fitted = 1.0 - special.zeta(alpha, degrees + 1) / special.zeta(alpha, xmin)
+    return float(np.max(np.abs(empirical - fitted)))
+
+
+def fit_power_law(histogram: np.ndarray, xmin: Optional[int] = None, min_tail: int = 10) -> PowerLawFit:
+    """
+    Fits a discrete power law to a degree histogram as in Clauset, Shalizi & Newman (2009).
+
+    For every candidate ``xmin`` (every observed degree, unless one is given) the
+    exponent is the discrete maximum likelihood estimate over the tail, and the
+    ``xmin`` whose fit has the smallest KS distance to the tail is chosen. Only the
+    distinct degrees are visited, so the cost does not depend on the number of nodes.
+
+    Args:
+        histogram (np.ndarray): Degree histogram, see ``degree_histogram``.
+        xmin (Optional[int]): Fixed start of the tail, scanned by default.
+        min_tail (int): Candidates with fewer tail nodes are skipped.
+
+    Returns:
+        PowerLawFit: The fit.
+    """
+    histogram = np.asarray(histogram, dtype=np.int64)
+    degrees = np.flatnonzero(histogram)
+    degrees = degrees[degrees >= 1]
+    counts = histogram[degrees]
+    # tail sums for every candidate at once
+    tail_n = np.cumsum(counts[::-1])[::-1]
+    tail_log_sum = np.cumsum((counts * np.log(degrees))[::-1])[::-1]
+
+    def fit_tail(i: int, start: int) -> PowerLawFit:
+        alpha = _fit_alpha(tail_log_sum[i], tail_n[i], start)
+        ks = _ks_distance(degrees[i:], counts[i:], alpha, start)
+        return PowerLawFit(alpha, int(start), ks, int(tail_n[i]), float((alpha - 1) / np.sqrt(tail_n[i])))
+
+    if xmin is not None:
+        i = int(np.searchsorted(degrees, xmin))
+        if i == len(degrees):
+            raise ValueError(f"No degrees >= xmin = {xmin}")
+        return fit_tail(i, xmin)
+    if not len(degrees):
+        raise ValueError("No degrees >= 1 to fit")
+    candidates = np.flatnonzero(tail_n >= min(min_tail, tail_n[0]))
+    return min((fit_tail(i, degrees[i]) for i in candidates), key=lambda fit: fit.ks)
+
+
+def sample_power_law(alpha: float, xmin: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws from the discrete power law by inverting its CDF.
+
+    Values below ``xmin + _SAMPLER_TABLE_SIZE`` are exact (searched in a table of the
+    CDF); larger ones use the continuous approximation of Clauset et al., eq. D.6.
+
+    Args:
+        alpha (float): Exponent.
+        xmin (int): Smallest value.
+        size (int): Number of draws.
+        rng (np.random.Generator): Random generator.
+
+    Returns:
+        np.ndarray: The draws.
+    """
+    u = rng.random(size)
+    support = np.arange(xmin, xmin + _SAMPLER_TABLE_SIZE)
+    cdf = 1.0 - special.zeta(alpha, support + 1) / special.zeta(alpha, xmin)
+    draws = support[np.minimum(np.searchsorted(cdf, u, side='right'), len(support) - 1)]
+    beyond = u >= cdf[-1]
+    approximate = np.floor((xmin - 0.5) * (1.0 - u[beyond]) ** (-1.0 / (alpha - 1.0)) + 0.5)
+    draws[beyond] = np.maximum(approximate, support[-1] + 1).astype(np.int64)
+    return draws
+
+
+def _synthetic_ks(histogram: np.ndarray, fit: PowerLawFit, scan: bool, min_tail: int, seed: int) -> float:
+    """KS distance of a power-law fit to one semi-parametric bootstrap sample of ``histogram``."""
+    rng = np.random.default_rng(seed)
+    n = int(histogram.sum())
+    body = histogram[:fit.xmin]
+    n_tail = rng.binomial(n, fit.n_tail / n) if body.sum() else n
+    sample = np.zeros(len(histogram), dtype=np.int64)
+    if n - n_tail:
+        sample[:fit.xmin] = rng.multinomial(n - n_tail, body / body.sum())
+    tail = degree_histogram(sample_power_law(fit.alpha, fit.xmin, n_tail, rng))
+    if len(tail) > len(sample):
+        sample = np.append(sample, np.zeros(len(tail) - len(sample), dtype=np.int64))
+    sample[:len(tail)] += tail
+    return fit_power_law(sample, xmin=None if scan else fit.xmin, min_tail=min_tail).ks
+
+
+def power_law_gof(histogram: np.ndarray, fit: Optional[PowerLawFit] = None, n_bootstrap: int = 100,
+                  seed: int = 0, workers: Optional[int] = None, scan_xmin: bool = True,
+                  min_tail: int = 10) -> float:
+    """
+    Bootstrap goodness-of-fit p-value of a power-law fit (Clauset et al., section 4.1).
+
+    Every synthetic data set keeps the size of the real one: its tail is drawn
+    from the fitted power law and its body resampled from the degrees below
+    ``xmin``. It is then fitted the same way as the real data, and the p-value is
+    the share of synthetic KS distances at least as large as the real one.
+    Samples are fitted in a process pool from seeds spawned off ``seed``, so the
+    result does not depend on ``workers``.
+
+    Args:
+        histogram (np.ndarray): Degree histogram, see ``degree_histogram``.
+        fit (Optional[PowerLawFit]): Fit of ``histogram``, computed by default.
+        n_bootstrap (int): Number of synthetic data sets; 2500 give a p-value accurate to 0.01.
+        seed (int): Master seed.
+        workers (Optional[int]): Number of processes, ``os.cpu_count()`` by default; 1 runs in-process.
+        scan_xmin (bool): Refit ``xmin`` for every sample, as the method prescribes, instead of fixing it.
+        min_tail (int): See ``fit_power_law``.
+
+    Returns:
+        float: The p-value; the power law is usually rejected below 0.1.
+    """
+    histogram = np.asarray(histogram, dtype=np.int64)
+    fit = fit or fit_power_law(histogram, min_tail=min_tail)
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n_bootstrap)]
+    arguments = ([histogram] * n_bootstrap, [fit] * n_bootstrap, [scan_xmin] * n_bootstrap,
+                 [min_tail] * n_bootstrap, seeds)
+    if workers == 1:
+        distances = list(map(_synthetic_ks, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            distances = list(executor.map(_synthetic_ks, *arguments))
+    return float(np.mean(np.array(distances) >= fit.ks))
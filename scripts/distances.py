@@ -0,0 +1,353 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+from scipy import stats as scipy_stats
+
+from graph_csr import CSRGraph, as_csr
+from metrics_cache import memoize_metric
+
+
+class DistanceStats(NamedTuple):
+    """
+    Result of a BFS sweep.
+
+    Attributes:
+        sources (np.ndarray): Node indices the BFS was run from.
+        eccentricity (np.ndarray): Largest distance reached from every source.
+        distance_sum (np.ndarray): Sum of distances from every source to the nodes it reaches.
+        reached (np.ndarray): Number of nodes reached from every source, the source excluded.
+        histogram (np.ndarray): ``histogram[d]`` is the number of (source, node) pairs at distance ``d``.
+    """
+    sources: np.ndarray
+    eccentricity: np.ndarray
+    distance_sum: np.ndarray
+    reached: np.ndarray
+    histogram: np.ndarray
+
+
+def bfs_sweep(G: Union[nx.Graph, CSRGraph], sources: Optional[np.ndarray] = None,
+              batch_size: int = 64) -> DistanceStats:
+    """
+    Runs one BFS per source and aggregates the distances on the fly.
+
+    Sources are processed ``batch_size`` at a time: the frontiers of a batch form the
+    columns of a dense matrix that is advanced one level by a single sparse matrix
+    product, so every level of every BFS in the batch costs one pass over the edges.
+    Only per-source aggregates and the distance histogram are kept, never the n x n
+    distances.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        sources (Optional[np.ndarray]): Node indices to start from, all nodes by default.
+        batch_size (int): Number of BFS run together.
+
+    Returns:
+        DistanceStats: Eccentricities, distance sums, reach counts and the histogram.
+    """
+    G = as_csr(G)
+    n = G.number_of_nodes()
+    sources = np.arange(n) if sources is None else np.asarray(sources, dtype=np.int64)
+    adjacency = G.to_scipy().astype(np.float32)
+
+    eccentricity = np.zeros(len(sources), dtype=np.int64)
+    distance_sum = np.zeros(len(sources), dtype=np.int64)
+    reached = np.zeros(len(sources), dtype=np.int64)
+    histogram = np.zeros(1, dtype=np.int64)
+    histogram[0] = len(sources)
+
+    for start in range(0, len(sources), batch_size):
+        batch = sources[start:start + batch_size]
+        columns = np.arange(len(batch))
+        visited = np.zeros((n, len(batch)), dtype=bool)
+        visited[batch, columns] = True
+        frontier = visited.astype(np.float32)
+        distance = 0
+        while True:
+            distance += 1
+            new = (adjacency @ frontier) > 0
+            new &= ~visited
+            counts = new.sum(axis=0)
+            if not counts.any():
+                break
+            visited |= new
+            frontier = new.astype(np.float32)
+            eccentricity[start:start + len(batch)][counts > 0] = distance
+            distance_sum[start:start + len(batch)] += distance * counts
+            reached[start:start + len(batch)] += counts
+            if len(histogram) <= distance:
+                histogram = np.append(histogram, 0)
+            histogram[distance] += counts.sum()
+
+    return DistanceStats(sources, eccentricity, distance_sum, reached, histogram)
+
+
+_worker_graph = None
+
+
+def _init_worker(directory: str) -> None:
+    """Opens the memory-mapped CSR arrays once per worker process."""
+    global _worker_graph
+    indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode='r')
+    indices = np.load(os.path.join(directory, 'indices.npy'), mmap_mode='r')
+    _worker_graph = CSRGraph(indptr, indices)
+
+
+def _sweep_in_worker(sources: np.ndarray, batch_size: int) -> DistanceStats:
+    return bfs_sweep(_worker_graph, sources=sources, batch_size=batch_size)
+
+
+def merge_distance_stats(parts: List[DistanceStats]) -> DistanceStats:
+    """
+    Combines sweeps over disjoint source sets into one result, in the order of ``parts``.
+    """
+    histogram = np.zeros(max(len(part.histogram) for part in parts), dtype=np.int64)
+    for part in parts:
+        histogram[:len(part.histogram)] += part.histogram
+    return DistanceStats(
+        np.concatenate([part.sources for part in parts]),
+        np.concatenate([part.eccentricity for part in parts]),
+        np.concatenate([part.distance_sum for part in parts]),
+        np.concatenate([part.reached for part in parts]),
+        histogram,
+    )
+
+
+def parallel_bfs_sweep(G: Union[nx.Graph, CSRGraph], sources: Optional[np.ndarray] = None,
+                       workers: Optional[int] = None, batch_size: int = 64) -> DistanceStats:
+    """
+    ``bfs_sweep`` with the sources split across a pool of processes.
+
+    The CSR arrays are written once to a temporary directory and memory-mapped by
+    every worker, so the graph is shared through the page cache instead of being
+    pickled for each task. Partial results are merged with ``merge_distance_stats``.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        sources (Optional[np.ndarray]): Node indices to start from, all nodes by default.
+        workers (Optional[int]): Number of processes, ``os.cpu_count()`` by default.
+        batch_size (int): Number of BFS run together inside a worker.
+
+    Returns:
+        DistanceStats: The same result as ``bfs_sweep``.
+    """
+    G = as_csr(G)
+    workers = workers or os.cpu_count() or 1
+    sources = np.arange(G.number_of_nodes()) if sources is None else np.asarray(sources, dtype=np.int64)
+    if workers == 1 or len(sources) <= batch_size:
+        return bfs_sweep(G, sources=sources, batch_size=batch_size)
+
+    # several tasks per worker so that uneven components still balance out
+    chunks = [chunk for chunk in np.array_split(sources, workers * 4) if len(chunk)]
+    with tempfile.TemporaryDirectory() as directory:
+        np.save(os.path.join(directory, 'indptr.npy'), G.indptr)
+        np.save(os.path.join(directory, 'indices.npy'), G.indices)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory,)) as executor:
+            parts = list(executor.map(_sweep_in_worker, chunks, [batch_size] * len(chunks)))
+    return merge_distance_stats(parts)
+
+
+@memoize_metric(ignore=("batch_size", "workers"))
+def distance_metrics(G: Union[nx.Graph, CSRGraph], batch_size: int = 64, workers: int = 1) -> dict:
+    """
+    Computes all distance metrics of ``get_network_summary`` with a single BFS sweep.
+
+    Diameter, radius and the average shortest path length are taken over the largest
+    connected component, like ``nx.diameter(get_largest_component(G))``; the histogram
+    covers every reachable pair of the whole graph.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        batch_size (int): Number of BFS run together.
+        workers (int): Number of processes for the sweep, see ``parallel_bfs_sweep``.
+
+    Returns:
+        dict: ``diameter``, ``radius``, ``average_shortest_path_length``, ``eccentricity``
+        (of the largest component nodes, by node index) and ``histogram``.
+    """
+    G = as_csr(G)
+    stats = parallel_bfs_sweep(G, workers=workers, batch_size=batch_size)
+    _, labels = G.connected_components()
+    in_largest = labels == np.argmax(np.bincount(labels))
+    size = int(in_largest.sum())
+
+    eccentricity = stats.eccentricity[in_largest]
+    pairs = size * (size - 1)
+    return {
+        'diameter': int(eccentricity.max()),
+        'radius': int(eccentricity.min()),
+        'average_shortest_path_length': float(stats.distance_sum[in_largest].sum() / pairs) if pairs else 0.0,
+        'eccentricity': eccentricity,
+        'histogram': stats.histogram,
+    }
+
+
+@memoize_metric(ignore=("batch_size", "workers"))
+def component_distance_metrics(G: Union[nx.Graph, CSRGraph], batch_size: int = 64, workers: int = 1) -> List[dict]:
+    """
+    Diameter and average shortest path length of every connected component, from one sweep.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        batch_size (int): Number of BFS run together.
+        workers (int): Number of processes for the sweep.
+
+    Returns:
+        List[dict]: ``size``, ``diameter`` and ``average_shortest_path_length`` per component,
+        in the order ``nx.connected_components`` yields them.
+    """
+    G = as_csr(G)
+    stats = parallel_bfs_sweep(G, workers=workers, batch_size=batch_size)
+    _, labels = G.connected_components()
+    _, first_nodes = np.unique(labels, return_index=True)
+    sizes = np.bincount(labels)
+    diameters = np.zeros(len(sizes), dtype=np.int64)
+    np.maximum.at(diameters, labels, stats.eccentricity)
+    sums = np.bincount(labels, weights=stats.distance_sum, minlength=len(sizes))
+
+    components = []
+    for label in labels[np.sort(first_nodes)]:
+        pairs = sizes[label] * (sizes[label] - 1)
+        components.append({
+            'size': int(sizes[label]),
+            'diameter': int(diameters[label]),
+            'average_shortest_path_length': float(sums[label] / pairs) if pairs else 0.0,
+        })
+    return components
+
+
+def bfs_distances(G: CSRGraph, source: int) -> np.ndarray:
+    """
+    Distances from one source, expanding each BFS level with vectorised CSR gathers.
+
+    Args:
+        G (CSRGraph): The graph.
+        source (int): Node index.
+
+    Returns:
+        np.ndarray: Distance to every node, -1 for unreachable nodes.
+    """
+    distances = np.full(G.number_of_nodes(), -1, dtype=np.int64)
+    distances[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    while len(frontier):
+        level += 1
+        starts = G.indptr[frontier]
+        lengths = G.indptr[frontier + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        neighbours = G.indices[offsets]
+        frontier = np.unique(neighbours[distances[neighbours] < 0])
+        distances[frontier] = level
+    return distances
+
+
+def diameter_bounds(G: CSRGraph, time_budget: Optional[float] = None,
+                    batch_size: int = 64) -> Tuple[int, int]:
+    """
+    Lower and upper bounds of the diameter of a connected graph (double sweep + iFUB).
+
+    A double sweep gives the lower bound. iFUB then runs BFS from the nodes farthest
+    from the highest-degree node, level by level, tightening the upper bound
+    ``2 * (level - 1)`` until it meets the lower bound, which makes the result exact,
+    or until the time budget runs out.
+
+    Args:
+        G (CSRGraph): A connected graph, e.g. ``G.largest_component()``.
+        time_budget (Optional[float]): Seconds to spend, unlimited by default.
+        batch_size (int): Number of BFS run together for the fringe nodes.
+
+    Returns:
+        Tuple[int, int]: ``(lower, upper)``; both equal when the diameter is exact.
+    """
+    deadline = time.perf_counter() + time_budget if time_budget is not None else np.inf
+    root = int(np.argmax(G.degrees()))
+    from_root = bfs_distances(G, root)
+    far = int(np.argmax(from_root))
+    lower = max(int(from_root.max()), int(bfs_distances(G, far).max()))
+    upper = 2 * int(from_root.max())
+
+    level = int(from_root.max())
+    while lower < upper and level > 0:
+        fringe = np.flatnonzero(from_root == level)
+        for start in range(0, len(fringe), batch_size):
+            if time.perf_counter() > deadline:
+                return lower, upper
+            eccentricity = bfs_sweep(G, sources=fringe[start:start + batch_size], batch_size=batch_size).eccentricity
+            lower = max(lower, int(eccentricity.max()))
+        # only once the whole fringe is swept may a pair farther apart than 2 * (level - 1)
+        # be ruled out among the unswept, closer nodes
+        if lower > 2 * (level - 1):
+            return lower, lower
+        upper = max(lower, 2 * (level - 1))
+        level -= 1
+    return lower, upper
+
+
+def approximate_distance_metrics(G: Union[nx.Graph, CSRGraph], relative_error: float = 0.01,
+                                 time_budget: Optional[float] = None, max_samples: Optional[int] = None,
+                                 confidence: float = 0.95, seed: Optional[int] = None,
+                                 batch_size: int = 64) -> dict:
+    """
+    Estimates the distance metrics of the largest component from sampled BFS sources.
+
+    The average shortest path length is the mean over uniformly sampled sources of
+    their mean distance, with a normal confidence interval (finite population
+    corrected). Sampling stops once the interval half-width falls below
+    ``relative_error`` of the estimate, the time budget is spent or ``max_samples``
+    sources are used. Diameter bounds come from ``diameter_bounds``, which gets a
+    quarter of the time budget.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        relative_error (float): Target half-width of the interval relative to the estimate.
+        time_budget (Optional[float]): Seconds to spend overall, unlimited by default.
+        max_samples (Optional[int]): Maximum number of BFS sources.
+        confidence (float): Confidence level of the interval.
+        seed (Optional[int]): Seed of the source sampling.
+        batch_size (int): Number of BFS run together.
+
+    Returns:
+        dict: ``average_shortest_path_length`` and its ``average_shortest_path_length_ci``,
+        ``diameter_bounds``, ``diameter`` (the lower bound), ``radius_upper_bound``,
+        ``histogram`` (sampled counts scaled to all sources of the component) and ``samples``.
+    """
+    start_time = time.perf_counter()
+    largest = as_csr(G).largest_component()
+    n = largest.number_of_nodes()
+    lower, upper = diameter_bounds(largest, time_budget / 4 if time_budget is not None else None, batch_size)
+    deadline = start_time + time_budget if time_budget is not None else np.inf
+
+    order = np.random.default_rng(seed).permutation(n)
+    limit = min(n, max_samples) if max_samples is not None else n
+    z = scipy_stats.norm.ppf(0.5 + confidence / 2)
+    parts = []
+    mean, half_width = 0.0, np.inf
+    sampled = 0
+    while sampled < limit:
+        parts.append(bfs_sweep(largest, sources=order[sampled:min(limit, sampled + batch_size)], batch_size=batch_size))
+        sampled = min(limit, sampled + batch_size)
+        per_source = np.concatenate([part.distance_sum for part in parts]) / max(n - 1, 1)
+        mean = float(per_source.mean())
+        if sampled == n:
+            half_width = 0.0
+        elif sampled > 1:
+            correction = np.sqrt((n - sampled) / (n - 1))
+            half_width = float(z * per_source.std(ddof=1) / np.sqrt(sampled) * correction)
+        if half_width <= relative_error * mean or time.perf_counter() > deadline:
+            break
+
+    sweep = merge_distance_stats(parts)
+    return {
+        'average_shortest_path_length': mean,
+        'average_shortest_path_length_ci': (mean - half_width, mean + half_width),
+        'diameter_bounds': (lower, upper),
+        'diameter': lower,
+        'radius_upper_bound': int(sweep.eccentricity.min()),
+        'histogram': sweep.histogram * (n / sampled),
+        'samples': sampled,
+    }
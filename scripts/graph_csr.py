@@ -0,0 +1,239 @@
+from numbers import Number
+from typing import Dict, Hashable, Iterable, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+
+def _to_column(values: list):
+    """
+    Packs the values of one node attribute into a column.
+
+    Strings become a ``pd.Categorical``, integers a nullable ``Int64`` array,
+    other numbers a float array with NaN for missing values, anything else
+    (dicts, lists) an object array.
+    """
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, str) for v in present):
+        return pd.Categorical(values)
+    if present and all(isinstance(v, Number) and not isinstance(v, bool) for v in present):
+        if all(isinstance(v, int) for v in present):
+            return pd.array(values, dtype="Int64")
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _is_missing(value) -> bool:
+    if isinstance(value, (list, dict)):
+        return False
+    return bool(pd.isna(value))
+
+
+class CSRGraph:
+    """
+    Undirected graph stored as compressed sparse rows over dense integer node indices.
+
+    Neighbours of node ``i`` are ``indices[indptr[i]:indptr[i + 1]]``, so adjacency
+    costs 4 bytes per edge end instead of a dict entry per edge in ``nx.Graph``.
+    The original node IDs (VK IDs) are kept in ``node_ids`` and node attributes are
+    stored column by column in ``node_attrs``. Self-loops are not represented.
+
+    Args:
+        indptr (np.ndarray): Row pointers, ``len(indptr) == number_of_nodes + 1``.
+        indices (np.ndarray): Concatenated sorted neighbour lists.
+        node_ids (Optional[np.ndarray]): Original ID of every node, defaults to ``0..n-1``.
+        node_attrs (Optional[Dict[str, np.ndarray]]): Columnar node attributes.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, node_ids: Optional[np.ndarray] = None,
+                 node_attrs: Optional[Dict[str, np.ndarray]] = None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        n = len(self.indptr) - 1
+        self.node_ids = np.asarray(node_ids) if node_ids is not None else np.arange(n)
+        self.node_attrs = node_attrs if node_attrs is not None else {}
+        self._node_index = None
+
+    @classmethod
+    def from_edges(cls, sources: np.ndarray, targets: np.ndarray, num_nodes: Optional[int] = None,
+                   node_ids: Optional[np.ndarray] = None,
+                   node_attrs: Optional[Dict[str, np.ndarray]] = None) -> "CSRGraph":
+        """
+        Builds the graph from an edge list of node indices; duplicates and self-loops are dropped.
+
+        Args:
+            sources (np.ndarray): First endpoint of every edge.
+            targets (np.ndarray): Second endpoint of every edge.
+            num_nodes (Optional[int]): Number of nodes, defaults to ``len(node_ids)``
+                or the largest index plus one.
+            node_ids (Optional[np.ndarray]): Original ID of every node.
+            node_attrs (Optional[Dict[str, np.ndarray]]): Columnar node attributes.
+
+        Returns:
+            CSRGraph: The graph.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if num_nodes is None:
+            if node_ids is not None:
+                num_nodes = len(node_ids)
+            else:
+                num_nodes = int(max(sources.max(initial=-1), targets.max(initial=-1))) + 1
+        keep = sources != targets
+        rows = np.concatenate([sources[keep], targets[keep]])
+        cols = np.concatenate([targets[keep], sources[keep]])
+        codes = np.sort(rows * num_nodes + cols)
+        if len(codes):
+            codes = codes[np.concatenate([[True], codes[1:] != codes[:-1]])]
+        rows, cols = codes // num_nodes, codes % num_nodes
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+        index_dtype = np.int32 if num_nodes < np.iinfo(np.int32).max else np.int64
+        return cls(indptr, cols.astype(index_dtype), node_ids=node_ids, node_attrs=node_attrs)
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph, attributes: Optional[Iterable[str]] = None) -> "CSRGraph":
+        """
+        Converts a networkx graph.
+
+        Args:
+            G (nx.Graph): The graph.
+            attributes (Optional[Iterable[str]]): Node attributes to keep, all by default.
+
+        Returns:
+            CSRGraph: The graph, nodes in the order of ``G.nodes``.
+        """
+        nodes = list(G.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+        if attributes is None:
+            attributes = sorted({key for _, data in G.nodes(data=True) for key in data})
+        node_attrs = {key: _to_column([G.nodes[node].get(key) for node in nodes]) for key in attributes}
+        node_ids = np.empty(len(nodes), dtype=object)
+        node_ids[:] = nodes
+        return cls.from_edges(edges[:, 0], edges[:, 1], num_nodes=len(nodes), node_ids=node_ids,
+                              node_attrs=node_attrs)
+
+    def to_networkx(self) -> nx.Graph:
+        """
+        Converts the graph back to networkx, keyed by the original node IDs.
+
+        Returns:
+            nx.Graph: The graph with its node attributes.
+        """
+        G = nx.Graph()
+        node_ids = self.node_ids.tolist()
+        columns = {key: np.asarray(column, dtype=object) for key, column in self.node_attrs.items()}
+        for i, node in enumerate(node_ids):
+            G.add_node(node, **{key: column[i] for key, column in columns.items() if not _is_missing(column[i])})
+        sources, targets = self.edges()
+        G.add_edges_from(zip(self.node_ids[sources].tolist(), self.node_ids[targets].tolist()))
+        return G
+
+    def number_of_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    def number_of_edges(self) -> int:
+        return len(self.indices) // 2
+
+    def degrees(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Degree of every node.
+        """
+        return np.diff(self.indptr)
+
+    def neighbors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def index_of(self, node_id: Hashable) -> int:
+        """
+        Maps an original node ID to its integer index.
+        """
+        if self._node_index is None:
+            self._node_index = {node: i for i, node in enumerate(self.node_ids.tolist())}
+        return self._node_index[node_id]
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Endpoints of every edge, each edge once with ``source < target``.
+        """
+        sources = np.repeat(np.arange(self.number_of_nodes()), self.degrees())
+        keep = sources < self.indices
+        return sources[keep], self.indices[keep].astype(np.int64)
+
+    def to_scipy(self) -> sparse.csr_matrix:
+        """
+        Returns:
+            sparse.csr_matrix: Adjacency matrix sharing the index arrays with the graph.
+        """
+        n = self.number_of_nodes()
+        data = np.ones(len(self.indices), dtype=np.int8)
+        return sparse.csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+
+    def connected_components(self) -> Tuple[int, np.ndarray]:
+        """
+        Returns:
+            Tuple[int, np.ndarray]: Number of components and the component label of every node.
+        """
+        return csgraph.connected_components(self.to_scipy(), directed=False)
+
+    def subgraph(self, nodes: np.ndarray) -> "CSRGraph":
+        """
+        Induced subgraph on the given node indices (or boolean mask), re-indexed densely.
+
+        Args:
+            nodes (np.ndarray): Node indices or a boolean mask over all nodes.
+
+        Returns:
+            CSRGraph: The subgraph with the matching node IDs and attributes.
+        """
+        nodes = np.asarray(nodes)
+        if nodes.dtype != bool:
+            mask = np.zeros(self.number_of_nodes(), dtype=bool)
+            mask[nodes] = True
+        else:
+            mask = nodes
+        new_index = np.full(self.number_of_nodes(), -1, dtype=np.int64)
+        new_index[mask] = np.arange(mask.sum())
+        sources, targets = self.edges()
+        keep = mask[sources] & mask[targets]
+        node_attrs = {key: column[mask] for key, column in self.node_attrs.items()}
+        return CSRGraph.from_edges(new_index[sources[keep]], new_index[targets[keep]], num_nodes=int(mask.sum()),
+                                   node_ids=self.node_ids[mask], node_attrs=node_attrs)
+
+    def largest_component(self) -> "CSRGraph":
+        """
+        Returns:
+            CSRGraph: Subgraph induced by the largest connected component, itself if there are no nodes.
+        """
+        if self.number_of_nodes() == 0:
+            return self
+        _, labels = self.connected_components()
+        return self.subgraph(labels == np.argmax(np.bincount(labels)))
+
+    def nbytes(self) -> int:
+        """
+        Returns:
+            int: Approximate memory taken by the adjacency arrays and numeric attribute columns.
+        """
+        total = self.indptr.nbytes + self.indices.nbytes
+        for column in self.node_attrs.values():
+            if isinstance(column, pd.Categorical):
+                total += column.codes.nbytes
+            elif column.dtype != object:
+                total += column.nbytes
+        return total
+
+
+def as_csr(G: Union[nx.Graph, CSRGraph]) -> CSRGraph:
+    """
+    Returns ``G`` as a ``CSRGraph``, converting a networkx graph without its attributes.
+    """
+    return G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G, attributes=[])
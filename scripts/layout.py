@@ -0,0 +1,410 @@
+import glob
+import hashlib
+import os
+import pickle
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from graph_csr import CSRGraph, as_csr
+from metrics_cache import graph_fingerprint
+
+_EPS = 1e-9
+# share of the nodes that must have a previous position for a warm start
+WARM_START_OVERLAP = 0.5
+# offsets of the 6 x 6 children of a cell's parent and of the parent's neighbours
+_BLOCK = np.array([(ox, oy) for ox in range(6) for oy in range(6)])
+
+
+def _interaction_list(cell: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs (row of ``cell``, flat index of a cell) of the well-separated cells at one quadtree level.
+
+    These are the children of the neighbours of a cell's parent that are not
+    neighbours of the cell itself, at most 27 per cell.
+    """
+    x = (cell[:, 0] // 2 * 2 - 2)[:, None] + _BLOCK[:, 0]
+    y = (cell[:, 1] // 2 * 2 - 2)[:, None] + _BLOCK[:, 1]
+    near = (np.abs(x - cell[:, 0, None]) <= 1) & (np.abs(y - cell[:, 1, None]) <= 1)
+    valid = (x >= 0) & (x < size) & (y >= 0) & (y < size) & ~near
+    rows, columns = np.nonzero(valid)
+    return rows, x[rows, columns] * size + y[rows, columns]
+
+
+def _far_repulsion(x: np.ndarray, y: np.ndarray, masses: np.ndarray, k: float, flat: np.ndarray,
+                   depth: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Repulsion from all nodes outside the neighbouring cells of the finest grid, by cell centroids.
+
+    At every level of a quadtree, a cell interacts with the children of its parent's
+    neighbours that are not its own neighbours. Each other node falls in exactly one
+    of those cells over all levels, so this is Barnes–Hut with a fixed opening rule,
+    computed level by level on dense grids. The force on a cell's centroid is shared
+    by its nodes, which keeps an iteration at O(n) work. Cell sums of a level are
+    summed from the level below and forces are pushed down the same way, so only
+    the finest level touches the nodes.
+    """
+    size = 1 << depth
+    mass = np.bincount(flat, masses, minlength=size * size)
+    moment_x = np.bincount(flat, masses * x, minlength=size * size)
+    moment_y = np.bincount(flat, masses * y, minlength=size * size)
+
+    # (size, mass, force_x, force_y) of every level, finest first
+    levels = []
+    for level in range(depth, 1, -1):
+        size = 1 << level
+        filled = np.flatnonzero(mass)
+        centroid_x, centroid_y = moment_x[filled] / mass[filled], moment_y[filled] / mass[filled]
+        # position of every cell in ``filled``, to look up the centroid of the cells interacted with
+        position = np.zeros(size * size, dtype=np.int64)
+        position[filled] = np.arange(len(filled))
+        rows, cells = _interaction_list(np.column_stack([filled // size, filled % size]), size)
+        cells_mass = mass[cells]
+        rows, cells, cells_mass = rows[cells_mass > 0], position[cells[cells_mass > 0]], cells_mass[cells_mass > 0]
+        diff_x, diff_y = centroid_x[rows] - centroid_x[cells], centroid_y[rows] - centroid_y[cells]
+        scale = cells_mass * k * k / (diff_x * diff_x + diff_y * diff_y + _EPS)
+        force_x, force_y = np.zeros(size * size), np.zeros(size * size)
+        force_x[filled] = np.bincount(rows, scale * diff_x, minlength=len(filled))
+        force_y[filled] = np.bincount(rows, scale * diff_y, minlength=len(filled))
+        levels.append((size, force_x, force_y))
+
+        half = size // 2
+        mass = mass.reshape(half, 2, half, 2).sum(axis=(1, 3)).ravel()
+        moment_x = moment_x.reshape(half, 2, half, 2).sum(axis=(1, 3)).ravel()
+        moment_y = moment_y.reshape(half, 2, half, 2).sum(axis=(1, 3)).ravel()
+
+    force_x, force_y = levels[-1][1], levels[-1][2]
+    for size, level_x, level_y in reversed(levels[:-1]):
+        half = size // 2
+        force_x = level_x + np.repeat(np.repeat(force_x.reshape(half, half), 2, axis=0), 2, axis=1).ravel()
+        force_y = level_y + np.repeat(np.repeat(force_y.reshape(half, half), 2, axis=0), 2, axis=1).ravel()
+    return force_x[flat], force_y[flat]
+
+
+# neighbouring cells on one side; pairs within a cell are counted once as well
+_HALF_NEIGHBOURS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def _near_repulsion(x: np.ndarray, y: np.ndarray, masses: np.ndarray, k: float, cell: np.ndarray,
+                    depth: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact repulsion between nodes in neighbouring cells of the finest grid.
+
+    Each pair of nodes is visited once and both get their (opposite) force.
+    """
+    n = len(x)
+    size = 1 << depth
+    flat = cell[:, 0] * size + cell[:, 1]
+    order = np.argsort(flat, kind="stable")
+    occupancy = np.bincount(flat, minlength=size * size)
+    starts = np.concatenate([[0], np.cumsum(occupancy)[:-1]])
+
+    force_x, force_y = np.zeros(n), np.zeros(n)
+    for dx, dy in _HALF_NEIGHBOURS:
+        other_x, other_y = cell[:, 0] + dx, cell[:, 1] + dy
+        inside = np.flatnonzero((other_x >= 0) & (other_x < size) & (other_y >= 0) & (other_y < size))
+        other = other_x[inside] * size + other_y[inside]
+        counts = occupancy[other]
+        rows = np.repeat(inside, counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        columns = order[np.repeat(starts[other], counts) + within]
+        keep = rows < columns if (dx, dy) == (0, 0) else rows != columns
+        rows, columns = rows[keep], columns[keep]
+        diff_x, diff_y = x[rows] - x[columns], y[rows] - y[columns]
+        scale = k * k / (diff_x * diff_x + diff_y * diff_y + _EPS)
+        force_x += np.bincount(rows, masses[columns] * scale * diff_x, minlength=n)
+        force_x -= np.bincount(columns, masses[rows] * scale * diff_x, minlength=n)
+        force_y += np.bincount(rows, masses[columns] * scale * diff_y, minlength=n)
+        force_y -= np.bincount(columns, masses[rows] * scale * diff_y, minlength=n)
+    return force_x, force_y
+
+
+def _refine(pos: np.ndarray, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray,
+            masses: np.ndarray, k: float, iterations: int, temperature: float) -> np.ndarray:
+    """Fruchterman–Reingold iterations with quadtree repulsion and a cooling step limit."""
+    n = len(pos)
+    # about two nodes per cell of the finest grid
+    depth = max(2, int(np.ceil(np.log(max(n, 2) / 2) / np.log(4))))
+    size = 1 << depth
+    x, y = pos[:, 0].copy(), pos[:, 1].copy()
+    for _ in range(iterations):
+        low_x, low_y = x.min(), y.min()
+        span = max(x.max() - low_x, y.max() - low_y) + _EPS
+        cell = np.column_stack([np.minimum(((x - low_x) / span * size).astype(np.int64), size - 1),
+                                np.minimum(((y - low_y) / span * size).astype(np.int64), size - 1)])
+        far_x, far_y = _far_repulsion(x, y, masses, k, cell[:, 0] * size + cell[:, 1], depth)
+        near_x, near_y = _near_repulsion(x, y, masses, k, cell, depth)
+
+        diff_x, diff_y = x[targets] - x[sources], y[targets] - y[sources]
+        pull = weights * np.sqrt(diff_x * diff_x + diff_y * diff_y) / k
+        displacement_x = far_x + near_x + (np.bincount(sources, pull * diff_x, minlength=n)
+                                           - np.bincount(targets, pull * diff_x, minlength=n)) / masses
+        displacement_y = far_y + near_y + (np.bincount(sources, pull * diff_y, minlength=n)
+                                           - np.bincount(targets, pull * diff_y, minlength=n)) / masses
+
+        length = np.sqrt(displacement_x * displacement_x + displacement_y * displacement_y) + _EPS
+        step = np.minimum(length, temperature) / length
+        x += displacement_x * step
+        y += displacement_y * step
+        temperature *= 0.92
+    return np.column_stack([x, y])
+
+
+def _coarsen(n: int, sources: np.ndarray, targets: np.ndarray,
+             rng: np.random.Generator) -> Tuple[np.ndarray, int]:
+    """
+    Merges nodes in pairs along a random matching of the edges.
+
+    Every unmatched node proposes to a random unmatched neighbour and mutual
+    proposals are matched, for a few rounds. Nodes left unmatched, typically the
+    leaves of hubs, then join the pair of a random matched neighbour.
+
+    Returns:
+        Tuple[np.ndarray, int]: Coarse node of every node, and the number of coarse nodes.
+    """
+    partner = np.full(n, -1, dtype=np.int64)
+    for _ in range(8):
+        free = (partner[sources] < 0) & (partner[targets] < 0)
+        heads = np.concatenate([sources[free], targets[free]])
+        tails = np.concatenate([targets[free], sources[free]])
+        if not len(heads):
+            break
+        order = np.lexsort((rng.random(len(heads)), heads))
+        heads, tails = heads[order], tails[order]
+        first = np.concatenate([[True], heads[1:] != heads[:-1]])
+        proposal = np.full(n, -1, dtype=np.int64)
+        proposal[heads[first]] = tails[first]
+        candidates = np.flatnonzero(proposal >= 0)
+        mutual = candidates[proposal[proposal[candidates]] == candidates]
+        partner[mutual] = proposal[mutual]
+
+    leader = np.where((partner >= 0) & (partner < np.arange(n)), partner, np.arange(n))
+    # leaves of a hub are matched one at a time, so the rest join a matched neighbour's pair
+    alone = (partner[sources] < 0) != (partner[targets] < 0)
+    joining = np.where(partner[sources[alone]] < 0, sources[alone], targets[alone])
+    matched = np.where(partner[sources[alone]] < 0, targets[alone], sources[alone])
+    if len(joining):
+        order = np.lexsort((rng.random(len(joining)), joining))
+        joining, matched = joining[order], matched[order]
+        first = np.concatenate([[True], joining[1:] != joining[:-1]])
+        leader[joining[first]] = leader[matched[first]]
+    roots, coarse = np.unique(leader, return_inverse=True)
+    return coarse, len(roots)
+
+
+def _contract(coarse: np.ndarray, count: int, sources: np.ndarray, targets: np.ndarray,
+              weights: np.ndarray, masses: np.ndarray):
+    low = np.minimum(coarse[sources], coarse[targets])
+    high = np.maximum(coarse[sources], coarse[targets])
+    keep = low != high
+    codes, inverse = np.unique(low[keep] * count + high[keep], return_inverse=True)
+    return (codes // count, codes % count, np.bincount(inverse, weights[keep]),
+            np.bincount(coarse, masses, minlength=count))
+
+
+def _place_new_nodes(pos: np.ndarray, known: np.ndarray, sources: np.ndarray, targets: np.ndarray,
+                     rng: np.random.Generator, k: float) -> np.ndarray:
+    """Puts nodes without a position at the mean of their placed neighbours, or anywhere if they have none."""
+    n = len(pos)
+    for _ in range(3):
+        heads = np.concatenate([sources, targets])
+        tails = np.concatenate([targets, sources])
+        useful = known[tails] & ~known[heads]
+        if not useful.any():
+            break
+        count = np.bincount(heads[useful], minlength=n)
+        placed = count > 0
+        for axis in (0, 1):
+            total = np.bincount(heads[useful], pos[tails[useful], axis], minlength=n)
+            pos[placed, axis] = total[placed] / count[placed]
+        pos[placed] += rng.normal(scale=k, size=(int(placed.sum()), 2))
+        known = known | placed
+    if not known.all():
+        low, high = pos[known].min(axis=0), pos[known].max(axis=0)
+        pos[~known] = rng.uniform(low, high, size=(int((~known).sum()), 2))
+    return pos
+
+
+def multilevel_layout(G: Union[nx.Graph, CSRGraph], iterations: int = 50, seed: Optional[int] = None,
+                      initial: Optional[Dict[Hashable, Any]] = None) -> Dict[Hashable, np.ndarray]:
+    """
+    Force-directed layout for large graphs: multilevel Fruchterman–Reingold with Barnes–Hut repulsion.
+
+    The graph is coarsened by matching until a few dozen nodes remain; the coarsest
+    graph is laid out from scratch and every finer level starts from the positions
+    of its coarse nodes, so only a few cheap iterations are needed on the full
+    graph. Repulsion is approximated with a quadtree, which makes an iteration
+    O(n log n) instead of the O(n^2) of ``nx.spring_layout``, with no n x n matrix
+    as in ``nx.kamada_kawai_layout``.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+        iterations (int): Iterations on the coarsest graph are four times as many, finer
+            levels get half as many.
+        seed (Optional[int]): Random seed.
+        initial (Optional[Dict[Hashable, Any]]): Previous positions by node, e.g. before the
+            graph changed. If at least ``WARM_START_OVERLAP`` of the nodes have one, the layout
+            starts from them instead of from scratch and nodes without one start next to
+            their neighbours; otherwise they are ignored.
+
+    Returns:
+        Dict[Hashable, np.ndarray]: Position of every node, centred at 0 within [-1, 1].
+    """
+    csr = as_csr(G)
+    n = csr.number_of_nodes()
+    nodes = csr.node_ids.tolist()
+    if n == 0:
+        return {}
+    rng = np.random.default_rng(seed)
+    sources, targets = csr.edges()
+    weights = np.ones(len(sources))
+    masses = np.ones(n)
+    k = 1 / np.sqrt(n)
+
+    if initial:
+        known = np.array([node in initial for node in nodes])
+        # with mostly new nodes, a few refining iterations cannot untangle the layout
+        if known.mean() >= WARM_START_OVERLAP:
+            pos = np.zeros((n, 2))
+            pos[known] = np.array([initial[node] for node in np.asarray(nodes, dtype=object)[known]], dtype=float)
+            # bring the old positions to the scale of the force model
+            lengths = np.sqrt(((pos[sources] - pos[targets]) ** 2).sum(axis=1))[known[sources] & known[targets]]
+            scale = k / np.median(lengths) if len(lengths) and np.median(lengths) > 0 else 1.0
+            pos *= scale
+            pos = _place_new_nodes(pos, known, sources, targets, rng, k)
+            pos = _refine(pos, sources, targets, weights, masses, k, max(10, iterations // 2), temperature=k)
+            return _normalise(nodes, pos)
+
+    # (size, sources, targets, weights, masses) of every level, finest first, and the
+    # coarse node of every node between consecutive levels
+    hierarchy = [(n, sources, targets, weights, masses)]
+    mappings = []
+    while hierarchy[-1][0] > 50:
+        size, level_sources, level_targets, level_weights, level_masses = hierarchy[-1]
+        coarse, count = _coarsen(size, level_sources, level_targets, rng)
+        if count > 0.9 * size:
+            break
+        hierarchy.append((count, *_contract(coarse, count, level_sources, level_targets, level_weights, level_masses)))
+        mappings.append(coarse)
+
+    size, level_sources, level_targets, level_weights, level_masses = hierarchy[-1]
+    pos = rng.uniform(-0.5, 0.5, size=(size, 2))
+    pos = _refine(pos, level_sources, level_targets, level_weights, level_masses, k,
+                  4 * iterations, temperature=0.1)
+    for (size, level_sources, level_targets, level_weights, level_masses), coarse in zip(
+            reversed(hierarchy[:-1]), reversed(mappings)):
+        pos = pos[coarse] + rng.normal(scale=0.1 * k, size=(size, 2))
+        # finer levels start close to equilibrium and need fewer iterations
+        pos = _refine(pos, level_sources, level_targets, level_weights, level_masses, k,
+                      max(10, iterations // 2), temperature=3 * k)
+    return _normalise(nodes, pos)
+
+
+def _normalise(nodes: List[Hashable], pos: np.ndarray) -> Dict[Hashable, np.ndarray]:
+    pos = pos - pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    if extent > 0:
+        pos = pos / extent
+    return dict(zip(nodes, pos))
+
+
+def _kamada_kawai_layout(G: nx.Graph, seed: Optional[int] = None, **kwargs: Any) -> Dict[Hashable, np.ndarray]:
+    # deterministic, takes no seed
+    return nx.kamada_kawai_layout(G, **kwargs)
+
+
+LAYOUTS = {
+    'multilevel': multilevel_layout,
+    'spring': nx.spring_layout,
+    'kamada_kawai': _kamada_kawai_layout,
+}
+
+
+class LayoutCache:
+    """
+    Node positions on disk, one pickle file per graph fingerprint and layout settings.
+
+    When a graph is not in the cache, ``closest`` finds a recent layout sharing most
+    of its nodes, e.g. of the graph before a refresh, whose positions are a good
+    starting point.
+
+    Args:
+        directory (str): Directory of the cache, created when the first layout is stored.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, G: Union[nx.Graph, CSRGraph], key: str) -> str:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+        return os.path.join(self.directory, f"{graph_fingerprint(G)}-{digest}.pkl")
+
+    def get(self, G: Union[nx.Graph, CSRGraph], key: str = "") -> Optional[Dict[Hashable, np.ndarray]]:
+        path = self._path(G, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+    def put(self, G: Union[nx.Graph, CSRGraph], positions: Dict[Hashable, np.ndarray], key: str = "") -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(G, key), "wb") as file:
+            pickle.dump(positions, file)
+
+    def closest(self, G: Union[nx.Graph, CSRGraph], min_overlap: float = WARM_START_OVERLAP,
+                candidates: int = 5) -> Optional[Dict[Hashable, np.ndarray]]:
+        """
+        The cached layout sharing the most nodes with ``G``, among the most recently stored ones.
+
+        Args:
+            G (Union[nx.Graph, CSRGraph]): The graph.
+            min_overlap (float): Share of the nodes of ``G`` a layout must position to be returned.
+            candidates (int): Number of most recent layouts looked at.
+
+        Returns:
+            Optional[Dict[Hashable, np.ndarray]]: The layout, None if no cached layout overlaps enough.
+        """
+        paths = sorted(glob.glob(os.path.join(self.directory, "*.pkl")), key=os.path.getmtime, reverse=True)
+        nodes = set(G.node_ids.tolist()) if isinstance(G, CSRGraph) else set(G)
+        best, best_overlap = None, min_overlap * len(nodes)
+        for path in paths[:candidates]:
+            with open(path, "rb") as file:
+                positions = pickle.load(file)
+            overlap = len(nodes.intersection(positions))
+            if overlap >= best_overlap and overlap > 0:
+                best, best_overlap = positions, overlap
+        return best
+
+
+def compute_layout(G: Union[nx.Graph, CSRGraph], layout: Union[str, Callable] = 'multilevel',
+                   cache_dir: Optional[str] = None, seed: Optional[int] = 0,
+                   **kwargs: Any) -> Dict[Hashable, np.ndarray]:
+    """
+    Positions of the nodes of a graph, reusing cached layouts where possible.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph; ``kamada_kawai`` and ``spring`` need an ``nx.Graph``.
+        layout (Union[str, Callable]): Name in ``LAYOUTS`` or a function ``layout(G, seed=..., **kwargs)``
+            returning positions by node.
+        cache_dir (Optional[str]): Directory of a ``LayoutCache``; no caching by default.
+        seed (Optional[int]): Random seed.
+        **kwargs: Passed on to the layout function.
+
+    Returns:
+        Dict[Hashable, np.ndarray]: Position of every node.
+    """
+    function = LAYOUTS[layout] if isinstance(layout, str) else layout
+    if cache_dir is None:
+        return function(G, seed=seed, **kwargs)
+
+    cache = LayoutCache(cache_dir)
+    key = repr((getattr(function, '__qualname__', repr(function)), seed, sorted(kwargs.items())))
+    positions = cache.get(G, key)
+    if positions is None:
+        previous = cache.closest(G) if function is multilevel_layout and 'initial' not in kwargs else None
+        if previous is not None:
+            kwargs['initial'] = previous
+        positions = function(G, seed=seed, **kwargs)
+        cache.put(G, positions, key)
+    return positions
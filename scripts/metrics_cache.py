@@ -0,0 +1,200 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from graph_csr import CSRGraph, as_csr
+
+# (structure checksum, CSR conversion, fingerprint) of every live networkx graph
+_graphs = weakref.WeakKeyDictionary()
+
+
+def _hash_csr(G: CSRGraph) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(G.indptr, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(G.indices, dtype=np.int64).tobytes())
+    if G.node_ids.dtype == object:
+        digest.update("\0".join(map(repr, G.node_ids.tolist())).encode("utf-8"))
+    else:
+        digest.update(np.ascontiguousarray(G.node_ids).tobytes())
+    return digest.hexdigest()
+
+
+def _structure_checksum(G: nx.Graph) -> int:
+    """
+    In-process checksum of the node order and of every neighbour set.
+
+    It only tells whether a graph was edited since the last call, e.g. an edge
+    replaced by another, and is several times cheaper than converting the graph.
+    Python's hash of strings changes between processes, so it is never stored.
+    """
+    return hash((tuple(G), tuple(map(hash, map(frozenset, G.adj.values())))))
+
+
+def _csr_and_fingerprint(G: Union[nx.Graph, CSRGraph]) -> Tuple[CSRGraph, str]:
+    """
+    ``G`` as ``CSRGraph`` and its fingerprint.
+
+    A ``CSRGraph`` is hashed directly. The conversion and fingerprint of a networkx
+    graph are kept for as long as it is alive and reused while its structure
+    checksum is unchanged.
+    """
+    if isinstance(G, CSRGraph):
+        return G, _hash_csr(G)
+    checksum = _structure_checksum(G)
+    entry = _graphs.get(G)
+    if entry is not None and entry[0] == checksum:
+        return entry[1], entry[2]
+    csr = as_csr(G)
+    fingerprint = _hash_csr(csr)
+    _graphs[G] = (checksum, csr, fingerprint)
+    return csr, fingerprint
+
+
+def graph_fingerprint(G: Union[nx.Graph, CSRGraph]) -> str:
+    """
+    Content hash of a graph's structure: node IDs in order and adjacency.
+
+    Any added or removed node or edge changes the fingerprint, so results cached
+    under it never go stale. Node attributes are not part of it, since the cached
+    metrics do not depend on them.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+
+    Returns:
+        str: Hex digest.
+    """
+    return _csr_and_fingerprint(G)[1]
+
+
+def _nbytes(value: Any) -> int:
+    """Approximate memory taken by a cached value: arrays by their buffers, containers with their items."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(key) + _nbytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(map(_nbytes, value))
+    return sys.getsizeof(value)
+
+
+class MetricsCache:
+    """
+    LRU cache of graph metrics, optionally mirrored to pickle files on disk.
+
+    Keys combine the graph fingerprint, the metric name and its parameters, so
+    the same graph loaded again in a new notebook session hits the disk cache.
+    Memory is bounded by the approximate size of the results, since one per-node
+    array of a large graph can take as much as thousands of scalar results.
+
+    Args:
+        max_bytes (int): Approximate memory the results kept in memory may take; a
+            larger single result is only kept on disk.
+        directory (Optional[str]): Directory for the on-disk copies, none by default.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2 ** 20, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+
+    def _path(self, key: Hashable) -> str:
+        name = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for ``key``, computing and storing it on a miss.
+
+        Args:
+            key (Hashable): Cache key.
+            compute (Callable[[], Any]): Produces the value.
+
+        Returns:
+            Any: The value. It is shared with the cache, so do not modify it in place.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), "rb") as file:
+                value = pickle.load(file)
+            self.hits += 1
+        else:
+            value = compute()
+            self.misses += 1
+            if self.directory is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(key), "wb") as file:
+                    pickle.dump(value, file)
+
+        size = _nbytes(value)
+        if size <= self.max_bytes:
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                oldest, _ = self._entries.popitem(last=False)
+                self.nbytes -= self._sizes.pop(oldest)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._sizes.clear()
+        self.nbytes = 0
+
+
+metrics_cache = MetricsCache()
+
+
+def memoize_metric(ignore: Iterable[str] = ()) -> Callable:
+    """
+    Caches a metric function whose first argument is the graph in ``metrics_cache``.
+
+    The graph is converted to ``CSRGraph`` and passed on in that form; the conversion
+    of a networkx graph is reused until the graph is edited (see ``graph_fingerprint``).
+    Parameters listed in ``ignore`` (e.g. ``workers``) do not change the result and
+    are left out of the key.
+
+    Args:
+        ignore (Iterable[str]): Names of parameters that are not part of the key.
+
+    Returns:
+        Callable: The decorator.
+    """
+    ignore = set(ignore)
+
+    def decorator(function: Callable) -> Callable:
+        signature = inspect.signature(function)
+        graph_parameter = next(iter(signature.parameters))
+
+        @functools.wraps(function)
+        def wrapper(G, *args, **kwargs):
+            G, fingerprint = _csr_and_fingerprint(G)
+            bound = signature.bind(G, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(
+                (name, repr(value)) for name, value in bound.arguments.items()
+                if name != graph_parameter and name not in ignore
+            )
+            key = (fingerprint, function.__module__, function.__qualname__, params)
+            return metrics_cache.get_or_compute(key, lambda: function(G, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
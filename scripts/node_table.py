@@ -0,0 +1,258 @@
+import weakref
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Union
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from graph_csr import CSRGraph, _to_column
+
+ATTRIBUTE_COLUMNS = ("name", "domain", "sex", "first_name", "last_name", "university_name", "city_title", "country_title")
+SEX_LABELS = {0: 'unknown', 1: 'female', 2: 'male'}
+
+_tables = weakref.WeakKeyDictionary()
+
+
+def _normalise(key: str, value: Any) -> Any:
+    """Brings raw VK values to the table's form: sex codes to labels, city and country records to titles."""
+    if key == 'sex' and isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return SEX_LABELS.get(int(value), 'unknown')
+    if isinstance(value, dict):
+        return value.get('title')
+    return value
+
+
+def _node_attribute(data: Dict[str, Any], column: str) -> Any:
+    # city_title / country_title are the flattened form of the API's {'id': ..., 'title': ...} records
+    if column in data:
+        return _normalise(column, data[column])
+    if column.endswith('_title') and column[:-len('_title')] in data:
+        return _normalise(column, data[column[:-len('_title')]])
+    return None
+
+
+def _ids_array(ids: List[Hashable]) -> np.ndarray:
+    """Integer array of VK IDs, or an object array if some are not numeric."""
+    if all(str(node).lstrip('-').isdigit() for node in ids):
+        return np.array([int(node) for node in ids], dtype=np.int64)
+    array = np.empty(len(ids), dtype=object)
+    array[:] = ids
+    return array
+
+
+class NodeTable:
+    """
+    Node attributes of one graph stored column by column, with metrics attached alongside.
+
+    Strings (names, sex, city and country titles) are ``pd.Categorical`` columns
+    and VK IDs an ``int64`` array, so a table of 10^5 friends takes a few
+    megabytes. Metric arrays are stored as given, without a copy, and queries
+    only build a DataFrame of the rows they return. Use ``node_table(g)`` to get
+    the table of a graph; it is built once and reused on later calls, until the
+    nodes change or ``refresh=True`` is passed after editing their attributes.
+
+    Args:
+        vk_ids (np.ndarray): VK ID of every row.
+        columns (Dict[str, Any]): Attribute columns, each as long as ``vk_ids``.
+    """
+
+    def __init__(self, vk_ids: np.ndarray, columns: Dict[str, Any]):
+        self.vk_ids = vk_ids
+        self.columns = dict(columns)
+        self._index = None
+
+    @classmethod
+    def from_graph(cls, g: Union[nx.Graph, CSRGraph], attributes: Optional[Iterable[str]] = None) -> "NodeTable":
+        """
+        Builds the table in one pass over the nodes.
+
+        Args:
+            g (Union[nx.Graph, CSRGraph]): The graph; rows follow its node order.
+            attributes (Optional[Iterable[str]]): Columns to keep, those of ``ATTRIBUTE_COLUMNS`` present by default.
+
+        Returns:
+            NodeTable: The table.
+        """
+        if isinstance(g, CSRGraph):
+            records = [dict() for _ in range(g.number_of_nodes())]
+            for key, column in g.node_attrs.items():
+                for record, value in zip(records, column):
+                    if not (np.isscalar(value) and pd.isna(value)):
+                        record[key] = value
+            nodes = g.node_ids.tolist()
+        else:
+            nodes, records = zip(*g.nodes(data=True)) if len(g) else ((), ())
+
+        ids = [data.get('vk_id', node) if data.get('vk_id') is not None else node for node, data in zip(nodes, records)]
+        if attributes is None:
+            present = {key for data in records for key in data}
+            attributes = [column for column in ATTRIBUTE_COLUMNS
+                          if column in present or (column.endswith('_title') and column[:-len('_title')] in present)]
+        columns = {column: _to_column([_node_attribute(data, column) for data in records]) for column in attributes}
+        return cls(_ids_array(list(ids)), columns)
+
+    def __len__(self) -> int:
+        return len(self.vk_ids)
+
+    def rows(self, nodes: Iterable[Hashable]) -> np.ndarray:
+        """
+        Args:
+            nodes (Iterable[Hashable]): VK IDs, as ints or strings.
+
+        Returns:
+            np.ndarray: Row of every ID, -1 for IDs not in the table.
+        """
+        if self._index is None:
+            self._index = pd.Index(self.vk_ids)
+        keys = np.asarray(list(nodes))
+        if self.vk_ids.dtype.kind == 'i' and keys.dtype.kind not in 'iu':
+            try:
+                keys = keys.astype(np.int64)
+            except (TypeError, ValueError):
+                # some keys are not numbers, so they cannot be in the table
+                numeric = np.array([str(node).lstrip('-').isdigit() for node in keys.tolist()], dtype=bool)
+                rows = np.full(len(keys), -1, dtype=np.int64)
+                rows[numeric] = self._index.get_indexer(keys[numeric].astype(np.int64))
+                return rows
+        elif self.vk_ids.dtype == object:
+            keys = keys.astype(object)
+        return self._index.get_indexer(keys)
+
+    def add_metric(self, name: str, values: Union[np.ndarray, Sequence[tuple]]) -> np.ndarray:
+        """
+        Attaches a metric column.
+
+        Args:
+            name (str): Column name.
+            values (Union[np.ndarray, Sequence[tuple]]): An array in row order, stored by
+                reference, or ``(vk_id, value)`` pairs like the ``parameter`` of ``show_graph``;
+                rows without a pair get NaN.
+
+        Returns:
+            np.ndarray: The stored column.
+        """
+        if isinstance(values, np.ndarray):
+            if len(values) != len(self):
+                raise ValueError(f"Metric {name!r} has {len(values)} values for {len(self)} nodes")
+            column = values
+        else:
+            pairs = list(values)
+            column = np.full(len(self), np.nan)
+            if pairs:
+                rows = self.rows([key for key, _ in pairs])
+                metric = [value for _, value in pairs]
+                found = rows >= 0
+                column[rows[found]] = np.asarray(metric, dtype=float)[found]
+        self.columns[name] = column
+        return column
+
+    def where(self, **conditions: Union[Any, Sequence[Any], Callable[[Any], np.ndarray]]) -> np.ndarray:
+        """
+        Rows matching all conditions, e.g. ``where(sex='female', city_title={'Moscow', 'Kazan'})``.
+
+        Args:
+            **conditions: Per column a value to equal, a set/list/tuple of allowed values,
+                or a function from the column to a boolean mask (``lambda x: x > 0.1``).
+
+        Returns:
+            np.ndarray: Matching rows in table order.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, condition in conditions.items():
+            column = self.columns[name] if name != 'vk_id' else self.vk_ids
+            if callable(condition):
+                matches = condition(column)
+            elif isinstance(condition, (set, frozenset, list, tuple)):
+                matches = pd.Series(column, copy=False).isin(list(condition))
+            else:
+                matches = pd.Series(column, copy=False) == condition
+            mask &= np.asarray(pd.Series(matches, copy=False).fillna(False), dtype=bool)
+        return np.flatnonzero(mask)
+
+    def top(self, name: str, k: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Rows with the ``k`` largest values of a column, largest first; NaN counts as smallest.
+
+        Args:
+            name (str): Column, usually a metric.
+            k (int): Number of rows, all if negative.
+            rows (Optional[np.ndarray]): Only rank these rows, e.g. the result of ``where``.
+
+        Returns:
+            np.ndarray: The rows.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        values = pd.Series(self.columns[name][rows], copy=False).astype(float).fillna(-np.inf).to_numpy()
+        if 0 <= k < len(rows):
+            candidates = np.argpartition(-values, k - 1)[:k] if k else np.array([], dtype=np.int64)
+        else:
+            candidates = np.arange(len(rows))
+        return rows[candidates[np.argsort(-values[candidates], kind='stable')]]
+
+    def frame(self, rows: Optional[np.ndarray] = None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Args:
+            rows (Optional[np.ndarray]): Rows to include, in this order; all by default.
+            columns (Optional[Iterable[str]]): Columns to include, all by default; missing ones are skipped.
+
+        Returns:
+            pd.DataFrame: The rows indexed by ``vk_id``.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        names = [name for name in (columns if columns is not None else self.columns) if name in self.columns]
+        return pd.DataFrame({name: self.columns[name][rows] for name in names}, index=pd.Index(self.vk_ids[rows], name='vk_id'))
+
+
+def _node_list(g: Union[nx.Graph, CSRGraph]) -> Union[list, np.ndarray]:
+    return g.node_ids if isinstance(g, CSRGraph) else list(g)
+
+
+def _same_nodes(old: Union[list, np.ndarray], new: Union[list, np.ndarray]) -> bool:
+    if isinstance(new, np.ndarray):
+        return old is new or (len(old) == len(new) and bool(np.all(old == new)))
+    return old == new
+
+
+def node_table(g: Union[nx.Graph, CSRGraph], refresh: bool = False) -> NodeTable:
+    """
+    The attribute table of ``g``, built on the first call and reused while ``g`` is alive.
+
+    The table is rebuilt whenever the graph's node list differs from the one it was
+    built for, i.e. after nodes were added, removed or replaced. Edits to the
+    attributes of existing nodes are not tracked: checking every node would cost as
+    much as a rebuild. Pass ``refresh=True`` after such edits.
+
+    Args:
+        g (Union[nx.Graph, CSRGraph]): The graph.
+        refresh (bool): Rebuild the table even if the nodes did not change; metrics
+            attached with ``NodeTable.add_metric`` are dropped with the old table.
+
+    Returns:
+        NodeTable: Its table.
+    """
+    nodes = _node_list(g)
+    cached = _tables.get(g)
+    if cached is not None and not refresh and _same_nodes(cached[0], nodes):
+        return cached[1]
+    table = NodeTable.from_graph(g)
+    _tables[g] = (nodes, table)
+    return table
+
+
+def attribute_frame(g: Union[nx.Graph, CSRGraph]) -> pd.DataFrame:
+    """
+    Every node attribute as stored in the graph, unlike the table which keeps
+    ``ATTRIBUTE_COLUMNS`` only.
+
+    Args:
+        g (Union[nx.Graph, CSRGraph]): The graph.
+
+    Returns:
+        pd.DataFrame: One row per node in node order, indexed by ``vk_id`` like ``NodeTable.frame``.
+    """
+    if isinstance(g, CSRGraph):
+        frame = pd.DataFrame(dict(g.node_attrs), index=pd.RangeIndex(g.number_of_nodes()))
+    else:
+        frame = pd.DataFrame([data for _, data in g.nodes(data=True)], index=pd.RangeIndex(len(g)))
+    frame.index = pd.Index(node_table(g).vk_ids, name='vk_id')
+    return frame.drop(columns='vk_id', errors='ignore')
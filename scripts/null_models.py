@@ -0,0 +1,168 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from graph_csr import CSRGraph, as_csr
+from random_graphs import barabasi_albert_graph, configuration_model, erdos_renyi_graph, watts_strogatz_graph
+from utils_for_analysis import get_model_properties
+
+MODELS = ('ER', 'BA', 'WS', 'Configuration Model')
+PROPERTIES = ('diameter', 'clustering', 'avg_path')
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+class RunningStats:
+    """
+    Streaming mean and variance (Welford) of one property over the replicas.
+
+    The values themselves are kept too, one float per replica, for the quantiles.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.values = []
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.values.append(value)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else 0.0
+
+    def summary(self, real_value: float) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: ``mean``, ``std``, the quantiles (``q5``, ``q50``, ``q95``)
+            and the z-score of ``real_value`` (NaN if the replicas do not vary).
+        """
+        result = {'mean': self.mean, 'std': self.std}
+        for q, value in zip(QUANTILES, np.quantile(self.values, QUANTILES)):
+            result[f'q{int(q * 100)}'] = float(value)
+        result['z'] = (real_value - self.mean) / self.std if self.std > 0 else float('nan')
+        return result
+
+
+def model_parameters(G: nx.Graph, p_ws: float = 0.4) -> Dict[str, object]:
+    """
+    Null model parameters fitted to the real graph, as in ``compare_network_models``.
+
+    Args:
+        G (nx.Graph): The real graph.
+        p_ws (float): Rewiring probability of the Watts-Strogatz model.
+
+    Returns:
+        Dict[str, object]: ``n``, ER edge probability ``p``, BA ``m_ba``, WS ``k_ws`` and
+        ``p_ws``, and the ``degrees`` sequence for the configuration model.
+    """
+    degrees = as_csr(G).degrees()
+    n = len(degrees)
+    mean_degree = float(degrees.mean())
+    return {
+        'n': n,
+        'p': mean_degree / (n - 1) if n > 1 else 0.0,
+        'm_ba': max(1, int(round(mean_degree / 2))),
+        'k_ws': int(round(mean_degree)),
+        'p_ws': p_ws,
+        'degrees': degrees.tolist(),
+    }
+
+
+def generate_model(model: str, params: Dict[str, object], seed: int) -> CSRGraph:
+    """
+    Draws one replica of a null model.
+
+    Args:
+        model (str): One of ``MODELS``.
+        params (Dict[str, object]): Output of ``model_parameters``.
+        seed (int): Seed of this replica.
+
+    Returns:
+        CSRGraph: The replica.
+    """
+    if model == 'ER':
+        return erdos_renyi_graph(params['n'], params['p'], seed=seed)
+    if model == 'BA':
+        return barabasi_albert_graph(params['n'], params['m_ba'], seed=seed)
+    if model == 'WS':
+        return watts_strogatz_graph(params['n'], params['k_ws'], params['p_ws'], seed=seed)
+    if model == 'Configuration Model':
+        return configuration_model(params['degrees'], seed=seed)
+    raise ValueError(f"Unknown model: {model}")
+
+
+def _replica_properties(model: str, params: Dict[str, object], seed: int,
+                        approximate: bool) -> Tuple[str, Tuple[float, float, float]]:
+    graph = generate_model(model, params, seed)
+    return model, get_model_properties(graph, approximate=approximate)
+
+
+def replica_seeds(seed: int, models: Iterable[str], n_replicas: int) -> List[Tuple[str, int]]:
+    """
+    Derives an independent seed for every (model, replica) pair from one master seed.
+
+    The seeds only depend on ``seed``, ``models`` and ``n_replicas``, so the ensemble
+    is reproducible whatever the number of workers or the order tasks finish in.
+    """
+    tasks = [(model, replica) for model in models for replica in range(n_replicas)]
+    children = np.random.SeedSequence(seed).spawn(len(tasks))
+    return [(model, int(child.generate_state(1)[0])) for (model, _), child in zip(tasks, children)]
+
+
+def run_null_model_ensemble(G: nx.Graph, n_replicas: int = 20, models: Iterable[str] = MODELS,
+                            seed: int = 0, workers: Optional[int] = None, p_ws: float = 0.4,
+                            approximate: bool = False) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Compares the real graph with ``n_replicas`` seeded samples of every null model.
+
+    Replicas are generated and measured in a process pool; only their three
+    properties travel back, and they are aggregated one replica at a time.
+
+    Args:
+        G (nx.Graph): The real graph.
+        n_replicas (int): Samples per model.
+        models (Iterable[str]): Models to draw, a subset of ``MODELS``.
+        seed (int): Master seed, see ``replica_seeds``.
+        workers (Optional[int]): Number of processes, ``os.cpu_count()`` by default.
+        p_ws (float): Rewiring probability of the Watts-Strogatz model.
+        approximate (bool): Use sampled distance metrics for the replicas and the real graph.
+
+    Returns:
+        Dict[str, Dict[str, Dict[str, float]]]: For every model and property
+        (``diameter``, ``clustering``, ``avg_path``) the ``RunningStats.summary``, with
+        the z-score of the real graph.
+    """
+    models = list(models)
+    params = model_parameters(G, p_ws=p_ws)
+    real = dict(zip(PROPERTIES, get_model_properties(G, approximate=approximate)))
+    accumulators = {model: {name: RunningStats() for name in PROPERTIES} for model in models}
+
+    tasks = replica_seeds(seed, models, n_replicas)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map yields in submission order, which keeps the floating-point sums reproducible
+        results = executor.map(_replica_properties, [model for model, _ in tasks],
+                               [params] * len(tasks), [replica_seed for _, replica_seed in tasks],
+                               [approximate] * len(tasks))
+        for model, properties in results:
+            for name, value in zip(PROPERTIES, properties):
+                accumulators[model][name].add(float(value))
+
+    return {
+        model: {name: stats.summary(real[name]) for name, stats in accumulators[model].items()}
+        for model in models
+    }
+
+
+def print_ensemble_summary(summary: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    names = {'diameter': 'Диаметр', 'clustering': 'Коэффициент кластеризации', 'avg_path': 'Средний кратчайший путь'}
+    for model, properties in summary.items():
+        print(f"\nСвойства {model} модели (среднее ± std, z-оценка реального графа):")
+        for name, stats in properties.items():
+            print(f"  {names[name]}: {round(stats['mean'], 4)} ± {round(stats['std'], 4)}, z = {round(stats['z'], 2)}")
@@ -2,8 +2,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import networkx as nx
+from matplotlib.collections import LineCollection
 from matplotlib.lines import Line2D
 import pandas as pd
+
+from graph_csr import as_csr
+from layout import compute_layout
+from node_table import NodeTable, attribute_frame, node_table
 sns.set(style="darkgrid", palette="deep", font_scale=1.2)
 
 
@@ -23,27 +28,32 @@ def plot_characteristic(
     plt.show()
 
 
+def plot_counts(
+        counts: np.ndarray,
+        title: str = '',
+        xlabel: str = '',
+        ylabel: str = 'frequency',
+        color: str = '',
+):
+    """
+    Plots an already aggregated histogram, e.g. ``shortest_paths`` from ``get_network_summary``.
+    """
+    plt.bar(np.arange(len(counts)), counts, color=color or None)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.show()
+
+
 
 def create_df_with_param(g, parameter: dict={}, parameter_name: str='parameter'):
-    df = pd.DataFrame(g.nodes.values())
-    df = df[df['vk_id'].notna()]
-    df['vk_id'] = df['vk_id'].astype('int')
+    # reads the graph's cached NodeTable (node_table.py) instead of rebuilding a DataFrame from g.nodes
+    table = node_table(g)
     if len(parameter) != 0:
-        print(parameter)
-        df_degree = pd.DataFrame(parameter, columns=['vk_id', parameter_name])
-        print(df_degree)
-        df = pd.merge(df, df_degree,how="left")
-        df = df.sort_values(parameter_name, ascending=False)
-        columns = ["vk_id", "name", "domain", "sex", "first_name", "last_name", "university_name", "city_title", parameter_name]
-        for i, col in enumerate(columns):
-            if col not in df.columns:
-                columns.pop(i)
-                print("Scipping: ", col)
-        df = df[columns]
-        df = df.set_index('vk_id')
-    else:
-        df =df.set_index('vk_id')
-    return df
+        table.add_metric(parameter_name, parameter)
+        columns = ["name", "domain", "sex", "first_name", "last_name", "university_name", "city_title", parameter_name]
+        return table.frame(table.top(parameter_name, -1), columns)
+    return attribute_frame(g)
 
 def get_node_labels(df: pd.DataFrame, number: int=-1):
     node_labels = df[:number].T.to_dict('list')
@@ -99,37 +109,107 @@ def get_node_labels(labels_df, number=None):
     return {k: v for k, v in node_labels.items()}
 
 
-def show_graph(g, parameter: dict={}, size_of_nodes=1000, number=15, figsize=(40,25), parameter_name: str='parameter', save_file: str = '', show: bool=True):
-    lespos = nx.kamada_kawai_layout(g)
-    sorted_df = create_df_with_param(g, parameter, parameter_name=parameter_name)
-    labels_df = sorted_df[['name']]
-    node_labels = {node: g.nodes[node].get('name', str(node)) for node in g.nodes()}
-    plt.figure(1, figsize=figsize)
+def _choose_render(number_of_edges: int) -> str:
+    if number_of_edges <= 10_000:
+        return 'vector'
+    if number_of_edges <= 1_000_000:
+        return 'raster'
+    return 'density'
+
+
+def _edge_density(ax, points: np.ndarray, sources: np.ndarray, targets: np.ndarray, bins: int,
+                  samples: int = 8, chunk_size: int = 1 << 20):
+    """Draws edges as a log-scaled 2D histogram of points sampled along them, chunk by chunk."""
+    low, high = points.min(axis=0), points.max(axis=0)
+    counts = np.zeros((bins, bins))
+    steps = np.linspace(0, 1, samples)[:, None, None]
+    for start in range(0, len(sources), chunk_size):
+        u = points[sources[start:start + chunk_size]]
+        v = points[targets[start:start + chunk_size]]
+        along = (u + steps * (v - u)).reshape(-1, 2)
+        counts += np.histogram2d(along[:, 0], along[:, 1], bins=bins, range=[[low[0], high[0]], [low[1], high[1]]])[0]
+    ax.imshow(np.log1p(counts.T), origin='lower', extent=(low[0], high[0], low[1], high[1]),
+              cmap='Greys', interpolation='nearest', aspect='auto')
+
+
+def draw_graph(g, positions: dict, parameter=(), size_of_nodes=1000, number=15, ax=None, render: str = 'auto',
+               font_size=25, density_bins: int = 1000, parameter_name: str = 'parameter', node_colors: str = ''):
+    """
+    Draws a graph with one artist for all edges, one for all nodes and ``number`` labels.
+
+    Args:
+        g: The graph, ``nx.Graph`` or ``CSRGraph``.
+        positions (dict): Position of every node, e.g. from ``layout.compute_layout``.
+        parameter: ``(node, value)`` pairs used for node size and colour, and to pick the labelled nodes.
+        size_of_nodes: Marker size, multiplied by the parameter if there is one.
+        number: How many nodes to label, those with the largest parameter (or degree).
+        ax: Axes to draw on, the current ones by default.
+        render (str): ``vector`` draws every edge as a vector line, ``raster`` rasterises
+            edges and nodes inside vector output (small SVG/PDF files), ``density``
+            replaces edges by a 2D histogram for graphs too large to draw edge by edge;
+            ``auto`` chooses by the number of edges.
+        font_size: Label font size.
+        density_bins (int): Histogram resolution in ``density`` mode.
+        parameter_name (str): Name of the parameter column in the graph's ``NodeTable``.
+        node_colors (str): Integer ``NodeTable`` column, e.g. communities from
+            ``communities.attach_communities``, to colour nodes by instead of the parameter.
+    """
+    ax = ax if ax is not None else plt.gca()
+    csr = as_csr(g)
+    table = node_table(g)
+    nodes = csr.node_ids.tolist()
+    points = np.array([positions[node] for node in nodes], dtype=float).reshape(-1, 2)
+    sources, targets = csr.edges()
+    render = _choose_render(len(sources)) if render == 'auto' else render
+    rasterized = render != 'vector'
+
+    if render == 'density':
+        _edge_density(ax, points, sources, targets, density_bins)
+    else:
+        segments = np.stack([points[sources], points[targets]], axis=1)
+        edges = LineCollection(segments, colors='k', linewidths=1.0 if render == 'vector' else 0.2,
+                               alpha=1.0 if render == 'vector' else 0.3, rasterized=rasterized, zorder=1)
+        ax.add_collection(edges)
+
     if len(parameter) != 0:
-        nx.draw(
-            g,
-            pos=lespos,
-            node_size=[v * size_of_nodes for k, v in parameter],
-            node_color=[v for k, v in parameter],
-            font_size=25,
-            cmap=plt.cm.get_cmap("RdBu_r"),
-            labels=node_labels,
-        )
+        values = table.add_metric(parameter_name, parameter)
+        labelled = table.top(parameter_name, number)
+        sizes, colors, cmap = np.nan_to_num(values) * size_of_nodes, values, plt.get_cmap("RdBu_r")
     else:
-        nx.draw(
-                g,
-                pos=lespos,
-                node_color='white',
-                edgecolors='black',
-                node_size=size_of_nodes,
-                font_size=25,
-                cmap=plt.cm.get_cmap("RdBu_r"),
-                labels=node_labels,
-            )
+        labelled = np.argsort(-csr.degrees(), kind='stable')[:number]
+        sizes, colors, cmap = size_of_nodes, 'white', None
+    if node_colors:
+        if node_colors not in table.columns:
+            table.columns[node_colors] = NodeTable.from_graph(g, [node_colors]).columns[node_colors]
+        # qualitative colours, repeating after 20 groups
+        colors, cmap = np.asarray(table.columns[node_colors]) % 20, plt.get_cmap("tab20")
+    ax.scatter(points[:, 0], points[:, 1], s=sizes, c=colors, cmap=cmap, vmin=0 if node_colors else None,
+               vmax=19 if node_colors else None, edgecolors='black' if cmap is None else None,
+               rasterized=rasterized, zorder=2)
+
+    names = table.columns.get('name')
+    for i in labelled:
+        label = names[i] if names is not None and not pd.isna(names[i]) else nodes[i]
+        ax.annotate(str(label), points[i], fontsize=font_size, ha='center', va='center', zorder=3)
+
+    ax.update_datalim(points)
+    ax.autoscale_view()
+    ax.set_axis_off()
+
+
+def show_graph(g, parameter: dict={}, size_of_nodes=1000, number=15, figsize=(40,25), parameter_name: str='parameter', save_file: str = '', show: bool=True,
+               layout='multilevel', layout_cache: str = '', render: str = 'auto', dpi=100, node_colors: str = ''):
+    # layout: name from layout.LAYOUTS or a function; positions are cached per graph in layout_cache
+    # render, node_colors: see draw_graph; save_file is written directly (PNG, SVG, ... by extension)
+    lespos = compute_layout(g, layout, cache_dir=layout_cache or None)
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    draw_graph(g, lespos, parameter=parameter, size_of_nodes=size_of_nodes, number=number, ax=ax, render=render,
+               parameter_name=parameter_name, node_colors=node_colors)
     # plt.title("Graph of Friends Connections", fontsize=40)
     if save_file != '':
-        plt.savefig(save_file)
+        fig.savefig(save_file, dpi=dpi)
     if show:
         plt.show()
-    return sorted_df
-
+    else:
+        plt.close(fig)
+    return create_df_with_param(g, parameter, parameter_name=parameter_name)
@@ -0,0 +1,249 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from graph_csr import CSRGraph
+
+_MAX_REWIRING_ROUNDS = 100
+
+
+def _pair_from_index(k: np.ndarray):
+    """
+    Decodes linear indices of the node pairs ``(i, j)``, ``j < i``, enumerated row by row.
+
+    Pair ``(i, j)`` has index ``i * (i - 1) / 2 + j``; ``i`` is recovered from the
+    square root and corrected by one where float rounding misses it.
+    """
+    i = np.floor((1 + np.sqrt(1 + 8 * k.astype(float))) / 2).astype(np.int64)
+    i -= i * (i - 1) // 2 > k
+    i += (i + 1) * i // 2 <= k
+    return i, k - i * (i - 1) // 2
+
+
+def _edge_codes(sources: np.ndarray, targets: np.ndarray, n: int) -> np.ndarray:
+    """Direction-independent integer code of every edge."""
+    return np.minimum(sources, targets) * n + np.maximum(sources, targets)
+
+
+def _repeated(codes: np.ndarray) -> np.ndarray:
+    """Mask of the codes that equal an earlier code."""
+    order = np.argsort(codes, kind="stable")
+    repeated = np.zeros(len(codes), dtype=bool)
+    repeated[order[1:]] = codes[order[1:]] == codes[order[:-1]]
+    return repeated
+
+
+def _resolve(pointers: np.ndarray, flags: Optional[np.ndarray] = None):
+    """
+    Follows every pointer chain to its end by pointer jumping.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: The last slot of every chain and,
+        if ``flags`` is given, whether any slot on the chain is flagged.
+    """
+    pointers = pointers.copy()
+    flags = flags.copy() if flags is not None else None
+    while True:
+        jumped = pointers[pointers]
+        if flags is not None:
+            flags |= flags[pointers]
+        if np.array_equal(jumped, pointers):
+            return pointers, flags
+        pointers = jumped
+
+
+def erdos_renyi_graph(n: int, p: float, seed: Optional[int] = None) -> CSRGraph:
+    """
+    G(n, p) random graph by geometric skipping (Batagelj & Brandes).
+
+    Instead of a coin flip per node pair, the gaps between consecutive chosen
+    pairs are drawn from a geometric distribution, so the cost is O(n + m) rather
+    than O(n^2). Same distribution as ``nx.erdos_renyi_graph``.
+
+    Args:
+        n (int): Number of nodes.
+        p (float): Edge probability.
+        seed (Optional[int]): Random seed.
+
+    Returns:
+        CSRGraph: The graph.
+    """
+    rng = np.random.default_rng(seed)
+    pairs = n * (n - 1) // 2
+    if p <= 0 or pairs == 0:
+        return CSRGraph.from_edges([], [], num_nodes=n)
+    if p >= 1:
+        chosen = np.arange(pairs, dtype=np.int64)
+    else:
+        expected = pairs * p
+        chunks, last = [], -1
+        while last < pairs:
+            size = int(expected + 5 * np.sqrt(expected) + 100)
+            positions = last + np.cumsum(rng.geometric(p, size=size))
+            chunks.append(positions)
+            last = positions[-1]
+        chosen = np.concatenate(chunks)
+        chosen = chosen[chosen < pairs]
+    sources, targets = _pair_from_index(chosen)
+    return CSRGraph.from_edges(sources, targets, num_nodes=n)
+
+
+def barabasi_albert_graph(n: int, m: int, seed: Optional[int] = None) -> CSRGraph:
+    """
+    Barabási–Albert preferential attachment graph over an array of edge endpoints.
+
+    As in ``nx.barabasi_albert_graph``, the graph starts as a star on ``m + 1``
+    nodes and every new node attaches to ``m`` distinct nodes drawn from the
+    endpoints of the existing edges, i.e. proportionally to degree. The endpoint
+    array is filled all at once: the target of every new edge is a pointer to a
+    uniformly chosen earlier slot, and the pointers are resolved by pointer
+    jumping in O(log n) vectorised rounds.
+
+    A node that drew the same target twice redraws the newer draw, which is the
+    rejection sampling ``networkx`` does. That decision is only taken once none of
+    the node's pointer chains passes through a slot that is being redrawn, so it
+    always sees final values; nodes without repeats are then frozen and their
+    chains compressed.
+
+    Args:
+        n (int): Number of nodes.
+        m (int): Edges added with every new node.
+        seed (Optional[int]): Random seed.
+
+    Returns:
+        CSRGraph: The graph.
+    """
+    if m < 1 or m >= n:
+        raise ValueError(f"Barabási–Albert network must have m >= 1 and m < n, m = {m}, n = {n}")
+    rng = np.random.default_rng(seed)
+    new_nodes = np.arange(m + 1, n, dtype=np.int64)
+    # slot 2e holds the source of edge e and slot 2e + 1 its target; the star comes first
+    slots_before = 2 * m * (new_nodes - m)
+    size = 2 * m * (n - m)
+    known = np.zeros(size, dtype=np.int64)
+    known[0:2 * m:2] = np.arange(1, m + 1)
+    known[2 * m::2] = np.repeat(new_nodes, m)
+    target_slots = np.arange(2 * m + 1, size, 2).reshape(-1, m)
+    pointers = np.arange(size, dtype=np.int64)
+    pointers[target_slots] = (rng.random(target_slots.shape) * slots_before[:, None]).astype(np.int64)
+
+    unsettled = np.arange(len(new_nodes))
+    fresh = np.ones(target_slots.shape, dtype=bool)
+    while len(unsettled):
+        # only the slots of unsettled nodes can still change: chains are followed on a
+        # compact copy of them, plus one stub per slot standing for wherever it leaves the set
+        slots = target_slots[unsettled].ravel()
+        count = len(slots)
+        jumps = pointers[slots]
+        position = np.minimum(np.searchsorted(slots, jumps), count - 1)
+        inside = slots[position] == jumps
+        local = np.where(inside, position, count + np.arange(count))
+        local = np.concatenate([local, count + np.arange(count)])
+        exits = pointers[jumps]
+
+        ends, _ = _resolve(local)
+        ends = exits[ends[:count] - count]
+        values = known[ends].reshape(-1, m)
+        # of equal targets the one held longest is kept and the fresh draws are repeats
+        order = np.argsort(2 * values + fresh[unsettled], axis=1, kind="stable")
+        ordered = np.take_along_axis(values, order, axis=1)
+        repeats = np.zeros(values.shape, dtype=bool)
+        np.put_along_axis(repeats, order[:, 1:], ordered[:, 1:] == ordered[:, :-1], axis=1)
+        redrawing = repeats.any(axis=1)
+
+        flags = np.zeros(2 * count, dtype=bool)
+        flags[:count] = repeats.ravel()
+        _, on_chain = _resolve(local, flags)
+        waiting = on_chain[local[:count]].reshape(-1, m).any(axis=1)
+
+        done = ~redrawing & ~waiting
+        settled = np.repeat(done, m)
+        pointers[slots[settled]] = ends[settled]
+        redraw = repeats & (redrawing & ~waiting)[:, None]
+        fresh[unsettled] = redraw
+        rows = np.repeat(unsettled, m)[redraw.ravel()]
+        pointers[slots[redraw.ravel()]] = (rng.random(len(rows)) * slots_before[rows]).astype(np.int64)
+        unsettled = unsettled[~done]
+
+    sources = np.concatenate([np.arange(1, m + 1), np.repeat(new_nodes, m)])
+    targets = np.concatenate([np.zeros(m, dtype=np.int64), known[pointers[target_slots]].ravel()])
+    return CSRGraph.from_edges(sources, targets, num_nodes=n)
+
+
+def watts_strogatz_graph(n: int, k: int, p: float, seed: Optional[int] = None) -> CSRGraph:
+    """
+    Watts–Strogatz small world: a ring lattice with every edge rewired with probability ``p``.
+
+    Every node is joined to its ``k // 2`` neighbours on each side; a rewired edge
+    keeps its first endpoint and gets a uniformly random new one. All rewirings are
+    drawn at once and only those that produce a self-loop, an existing edge or the
+    old edge again are redrawn, as in ``nx.watts_strogatz_graph``.
+
+    Args:
+        n (int): Number of nodes.
+        k (int): Each node is joined with its ``k`` nearest neighbours in the ring.
+        p (float): Rewiring probability.
+        seed (Optional[int]): Random seed.
+
+    Returns:
+        CSRGraph: The graph.
+    """
+    if k > n:
+        raise ValueError("k > n, choose smaller k or larger n")
+    if k == n:
+        return erdos_renyi_graph(n, 1.0)
+    rng = np.random.default_rng(seed)
+    offsets = np.repeat(np.arange(1, k // 2 + 1), n)
+    sources = np.tile(np.arange(n, dtype=np.int64), k // 2)
+    lattice = (sources + offsets) % n
+    rewire = rng.random(len(sources)) < p
+    kept = np.sort(_edge_codes(sources[~rewire], lattice[~rewire], n))
+
+    rewired_sources, old_targets = sources[rewire], lattice[rewire]
+    targets = old_targets.copy()
+    pending = np.arange(len(targets))
+    for _ in range(_MAX_REWIRING_ROUNDS):
+        if not len(pending):
+            break
+        targets[pending] = rng.integers(0, n, size=len(pending))
+        codes = _edge_codes(rewired_sources, targets, n)
+        invalid = ((rewired_sources == targets) | (targets == old_targets)
+                   | np.isin(codes, kept) | _repeated(codes))
+        pending = np.flatnonzero(invalid)
+    else:
+        # nodes that are joined to (almost) everything keep their lattice edge, and so
+        # does any edge rewired onto such a kept edge, until no edge is doubled
+        old_codes = _edge_codes(rewired_sources, old_targets, n)
+        reverted = np.zeros(len(targets), dtype=bool)
+        reverted[pending] = True
+        while True:
+            targets[reverted] = old_targets[reverted]
+            clash = ~reverted & np.isin(_edge_codes(rewired_sources, targets, n), old_codes[reverted])
+            if not clash.any():
+                break
+            reverted |= clash
+    return CSRGraph.from_edges(np.concatenate([sources[~rewire], rewired_sources]),
+                               np.concatenate([lattice[~rewire], targets]), num_nodes=n)
+
+
+def configuration_model(degrees: Sequence[int], seed: Optional[int] = None) -> CSRGraph:
+    """
+    Configuration model by stub shuffling.
+
+    Every node gets as many stubs as its degree and a random permutation pairs
+    them up. Self-loops and multi-edges are dropped, as ``nx.Graph(nx.configuration_model(...))``
+    collapses multi-edges.
+
+    Args:
+        degrees (Sequence[int]): Degree of every node; the sum must be even.
+        seed (Optional[int]): Random seed.
+
+    Returns:
+        CSRGraph: The graph.
+    """
+    degrees = np.asarray(degrees, dtype=np.int64)
+    if degrees.sum() % 2:
+        raise ValueError("Invalid degree sequence: sum of degrees must be even")
+    rng = np.random.default_rng(seed)
+    stubs = rng.permutation(np.repeat(np.arange(len(degrees)), degrees))
+    return CSRGraph.from_edges(stubs[0::2], stubs[1::2], num_nodes=len(degrees))
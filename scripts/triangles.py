@@ -0,0 +1,84 @@
+from typing import NamedTuple, Union
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from graph_csr import CSRGraph, as_csr
+from metrics_cache import memoize_metric
+
+
+class ClusteringStats(NamedTuple):
+    """
+    Everything derived from one triangle count.
+
+    Attributes:
+        triangles (np.ndarray): Number of triangles through every node.
+        local_clustering (np.ndarray): Local clustering coefficient of every node, as ``nx.clustering``.
+        average_clustering (float): Mean local coefficient, as ``nx.average_clustering``.
+        transitivity (float): Global clustering coefficient, as ``nx.transitivity``.
+    """
+    triangles: np.ndarray
+    local_clustering: np.ndarray
+    average_clustering: float
+    transitivity: float
+
+
+def triangle_counts(G: Union[nx.Graph, CSRGraph]) -> np.ndarray:
+    """
+    Counts the triangles through every node with degree-ordered forward intersection.
+
+    Every edge is oriented from the endpoint of lower (degree, index) rank to the
+    higher one, so each triangle ``i < j < k`` appears exactly once as the paths
+    ``i -> j -> k`` closed by ``i -> k``. Two sparse products over this oriented
+    adjacency ``U`` count the triangles in every role: ``(U @ U) * U`` gives the
+    lowest and highest node, ``(U.T @ U) * U`` the middle one. Orienting towards
+    high degrees keeps both products at O(m^1.5).
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+
+    Returns:
+        np.ndarray: Number of triangles through every node, in node order.
+    """
+    G = as_csr(G)
+    n = G.number_of_nodes()
+    sources, targets = G.edges()
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), G.degrees()))] = np.arange(n)
+    flip = rank[sources] > rank[targets]
+    low = np.where(flip, targets, sources)
+    high = np.where(flip, sources, targets)
+    oriented = sparse.csr_matrix((np.ones(len(low), dtype=np.int64), (low, high)), shape=(n, n))
+
+    closing = (oriented @ oriented).multiply(oriented)
+    middle = (oriented.T @ oriented).multiply(oriented)
+    triangles = (np.asarray(closing.sum(axis=1)).ravel()
+                 + np.asarray(closing.sum(axis=0)).ravel()
+                 + np.asarray(middle.sum(axis=1)).ravel())
+    return triangles.astype(np.int64)
+
+
+@memoize_metric()
+def clustering_stats(G: Union[nx.Graph, CSRGraph]) -> ClusteringStats:
+    """
+    Local, average and global clustering from a single triangle count.
+
+    Args:
+        G (Union[nx.Graph, CSRGraph]): The graph.
+
+    Returns:
+        ClusteringStats: Per-node triangles and the three clustering coefficients.
+    """
+    G = as_csr(G)
+    triangles = triangle_counts(G)
+    degrees = G.degrees().astype(float)
+    pairs = degrees * (degrees - 1) / 2
+    local = np.divide(triangles, pairs, out=np.zeros(len(pairs)), where=pairs > 0)
+    total_pairs = pairs.sum()
+    return ClusteringStats(
+        triangles=triangles,
+        local_clustering=local,
+        average_clustering=float(local.mean()) if len(local) else 0.0,
+        transitivity=float(triangles.sum() / total_pairs) if total_pairs else 0.0,
+    )
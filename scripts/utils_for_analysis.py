@@ -1,65 +1,168 @@
+import contextlib
+from typing import Any, Dict
+
 import networkx as nx
-from scipy import stats
 import numpy as np
 
+from degree_stats import degree_histogram, fit_power_law
+from distances import approximate_distance_metrics, component_distance_metrics, distance_metrics
+from graph_csr import CSRGraph, as_csr
+from metrics_cache import memoize_metric
+from random_graphs import barabasi_albert_graph, configuration_model, erdos_renyi_graph, watts_strogatz_graph
+from triangles import clustering_stats
+
+
+@memoize_metric()
+def get_component_labels(G) -> np.ndarray:
+    return G.connected_components()[1]
+
+
+@memoize_metric()
+def get_degree_sequence(G) -> np.ndarray:
+    return G.degrees()
+
 
 def get_largest_component(G):
-    largest_component = max(nx.connected_components(G), key=len)
-    return G.subgraph(largest_component)
-
-
-def get_nodes_degree(G: nx.Graph) -> list:
-    node_degree = [v for k, v in G.degree]
-    print("Максимальная степень вершины = {}".format(
-        max(node_degree))
-        )
-    print("Средняя степень вершины = {}".format(
-        round(np.mean(node_degree), 4))
-        )
+    labels = get_component_labels(G)
+    in_largest = labels == np.argmax(np.bincount(labels))
+    if isinstance(G, CSRGraph):
+        return G.subgraph(in_largest)
+    nodes = list(G.nodes)
+    return G.subgraph([nodes[i] for i in np.flatnonzero(in_largest)])
+
+
+def get_nodes_degree(G: nx.Graph, instrumentation=None) -> np.ndarray:
+    """
+    Degree of every node; the maximum and mean degree are reported as a ``node_degrees``
+    event of ``instrumentation`` (e.g. ``code/instrumentation.Instrumentation``), if given.
+    """
+    node_degree = get_degree_sequence(G).copy()
+    if instrumentation is not None and len(node_degree):
+        instrumentation.event('node_degrees', max_degree=int(node_degree.max()),
+                              mean_degree=round(float(node_degree.mean()), 4))
     return node_degree
 
 
-def get_network_summary(G):
-    num_nodes = G.number_of_nodes()
-    num_edges = G.number_of_edges()
-    print(f"Количество вершин: {num_nodes}")
-    print(f"Количество ребер: {num_edges}")
+def _span(instrumentation, name: str):
+    """Span of ``instrumentation`` (e.g. ``code/instrumentation.Instrumentation``), or a no-op without one."""
+    return instrumentation.span(name) if instrumentation is not None else contextlib.nullcontext()
+
+
+def network_summary(G, workers: int = 1, approximate: bool = False, time_budget: float = None,
+                    relative_error: float = 0.01, instrumentation=None) -> Dict[str, Any]:
+    """
+    Computes the main characteristics of the network and returns them as values.
+
+    All distance metrics come from a single BFS sweep (see ``distances.distance_metrics``).
+    ``shortest_paths`` is a histogram: ``shortest_paths[d]`` is the number of ordered
+    node pairs at distance ``d``, instead of the list of every pairwise distance.
+    ``workers`` > 1 spreads the sweep over that many processes.
+
+    With ``approximate=True`` the distances are estimated from sampled sources within
+    ``time_budget`` seconds or ``relative_error`` (see ``distances.approximate_distance_metrics``):
+    ``diameter_bounds`` holds the bounds of the diameter, ``radius`` is an upper bound and
+    ``average_shortest_path_length_ci`` a 95% confidence interval.
+
+    ``power_law`` is the discrete power-law fit of the degree distribution
+    (``degree_stats.fit_power_law``), None for a graph without edges; test it with
+    ``degree_stats.power_law_gof``.
+
+    Every step is timed as an ``analysis.*`` span of ``instrumentation`` when one is given.
 
-    largest_cc = get_largest_component(G)
+    Returns:
+        Dict[str, Any]: Numbers of nodes and edges, distance metrics, degrees,
+        clustering coefficients and the power-law fit.
+    """
+    summary = {'approximate': approximate, 'num_nodes': G.number_of_nodes(), 'num_edges': G.number_of_edges()}
 
-    diameter = nx.diameter(largest_cc)
-    radius = nx.radius(largest_cc)
-    print(f"Диаметр: {diameter}")
-    print(f"Радиус: {radius}")
+    with _span(instrumentation, 'analysis.distances'):
+        if approximate:
+            distances = approximate_distance_metrics(G, relative_error=relative_error, time_budget=time_budget)
+            summary['radius'] = distances['radius_upper_bound']
+            summary['diameter_bounds'] = distances['diameter_bounds']
+            summary['average_shortest_path_length_ci'] = distances['average_shortest_path_length_ci']
+            summary['samples'] = distances['samples']
+        else:
+            distances = distance_metrics(G, workers=workers)
+            summary['radius'] = distances['radius']
+    summary['diameter'] = distances['diameter']
+    summary['average_shortest_path_length'] = distances['average_shortest_path_length']
+    summary['shortest_paths'] = distances['histogram']
 
-    node_degree = get_nodes_degree(G)
-    global_cc = round(nx.transitivity(G), 4)
-    avg_local_cc = round(nx.average_clustering(G), 4)
-    print(f"Глобальный коэффициент кластеризации: {global_cc}")
-    print(f"Средний локальный коэффициент кластеризации: {avg_local_cc}")
+    with _span(instrumentation, 'analysis.degrees'):
+        summary['node_degree'] = get_degree_sequence(G).copy()
+    with _span(instrumentation, 'analysis.clustering'):
+        clustering = clustering_stats(G)
+    summary['transitivity'] = clustering.transitivity
+    summary['average_clustering'] = clustering.average_clustering
+    summary['local_clustering'] = clustering.local_clustering
 
-    local_ccs = [nx.clustering(G, node) for node in G.nodes()]
+    with _span(instrumentation, 'analysis.power_law'):
+        degrees = summary['node_degree']
+        summary['power_law'] = fit_power_law(degree_histogram(degrees)) if degrees.any() else None
+    return summary
 
-    avg_shortest_path = round(nx.average_shortest_path_length(largest_cc), 4)
-    print(f"Средняя длина кратчайшего пути: {avg_shortest_path}")
 
-    shortest_paths = []
-    for node in G.nodes():
-        for length in nx.shortest_path_length(G, source=node).values():
-            shortest_paths.append(length)
+def print_network_summary(summary: Dict[str, Any]) -> None:
+    print(f"Количество вершин: {summary['num_nodes']}")
+    print(f"Количество ребер: {summary['num_edges']}")
+    if summary['approximate']:
+        print(f"Диаметр: {summary['diameter']} (границы: {summary['diameter_bounds']})")
+        print(f"Радиус: не больше {summary['radius']}")
+    else:
+        print(f"Диаметр: {summary['diameter']}")
+        print(f"Радиус: {summary['radius']}")
 
-    params = stats.powerlaw.fit(node_degree)
-    print(f"Параметры распределения степеней вершин: {params}")
+    node_degree = summary['node_degree']
+    print("Максимальная степень вершины = {}".format(max(node_degree)))
+    print("Средняя степень вершины = {}".format(round(np.mean(node_degree), 4)))
+    print(f"Глобальный коэффициент кластеризации: {round(summary['transitivity'], 4)}")
+    print(f"Средний локальный коэффициент кластеризации: {round(summary['average_clustering'], 4)}")
 
-    return (local_ccs, shortest_paths, node_degree, params)
+    print(f"Средняя длина кратчайшего пути: {round(summary['average_shortest_path_length'], 4)}")
+    if summary['approximate']:
+        low, high = summary['average_shortest_path_length_ci']
+        print(f"Доверительный интервал: [{round(low, 4)}, {round(high, 4)}] по {summary['samples']} источникам")
 
+    params = summary['power_law']
+    if params is None:
+        return
+    print(f"Степенной закон распределения степеней вершин: alpha = {round(params.alpha, 4)} "
+          f"± {round(params.sigma, 4)}, k_min = {params.xmin}, KS = {round(params.ks, 4)}")
 
-def get_model_properties(graph):
-    degrees = [degree for node, degree in graph.degree()]
-    largest_component = get_largest_component(graph)
-    diameter = nx.diameter(get_largest_component(largest_component))
-    clustering = nx.average_clustering(largest_component)
-    avg_path = nx.average_shortest_path_length(largest_component) if nx.is_connected(largest_component) else "Граф не связный"
+
+def get_network_summary(G, workers: int = 1, approximate: bool = False,
+                        time_budget: float = None, relative_error: float = 0.01,
+                        verbose: bool = True, instrumentation=None):
+    """
+    Returns, and with ``verbose`` prints, the main characteristics of the network.
+
+    See ``network_summary``, which returns all of them as a dictionary; this keeps
+    the tuple of local clustering coefficients, the ``shortest_paths`` histogram,
+    the degrees and the power-law fit ``params``.
+    """
+    summary = network_summary(G, workers=workers, approximate=approximate, time_budget=time_budget,
+                              relative_error=relative_error, instrumentation=instrumentation)
+    if verbose:
+        print_network_summary(summary)
+    return (summary['local_clustering'].tolist(), summary['shortest_paths'], summary['node_degree'],
+            summary['power_law'])
+
+
+def get_model_properties(graph, workers: int = 1, approximate: bool = False,
+                         time_budget: float = None, relative_error: float = 0.01):
+    csr = as_csr(graph)
+    labels = get_component_labels(csr)
+    # local clustering only depends on the node's own component
+    in_largest = labels == np.argmax(np.bincount(labels))
+    clustering = float(clustering_stats(csr).local_clustering[in_largest].mean())
+    if approximate:
+        # the diameter is then the double-sweep/iFUB lower bound
+        distances = approximate_distance_metrics(csr, relative_error=relative_error, time_budget=time_budget)
+    else:
+        distances = distance_metrics(csr, workers=workers)
+    diameter = distances['diameter']
+    avg_path = distances['average_shortest_path_length']
     return diameter, clustering, avg_path
 
 
@@ -71,20 +174,20 @@ def print_model_properties(model_name: str = 'ER', properties: list = []):
     print(f"  Средний кратчайший путь: {round(properties[2], 4)}")
 
 
-def compare_network_models(G: nx.Graph, node_degrees: list, p: float, m_ba: int, p_ws: float = 0.4):
+def compare_network_models(G: nx.Graph, node_degrees: list, p: float, m_ba: int, p_ws: float = 0.4, workers: int = 1):
     n = G.number_of_nodes()
-    er_graph = nx.erdos_renyi_graph(n, p)
-    ba_graph = nx.barabasi_albert_graph(n, m_ba)
+    er_graph = erdos_renyi_graph(n, p)
+    ba_graph = barabasi_albert_graph(n, m_ba)
     k = int(round(np.mean(node_degrees)))
     p_ws = 0.4
-    ws_graph = nx.watts_strogatz_graph(n, k, p_ws)
+    ws_graph = watts_strogatz_graph(n, k, p_ws)
 
-    config_model = nx.Graph(nx.configuration_model(node_degrees))
+    config_model = configuration_model(node_degrees)
 
-    er_props = get_model_properties(er_graph)
-    ba_props = get_model_properties(ba_graph)
-    ws_props = get_model_properties(ws_graph)
-    config_model_props = get_model_properties(config_model)
+    er_props = get_model_properties(er_graph, workers=workers)
+    ba_props = get_model_properties(ba_graph, workers=workers)
+    ws_props = get_model_properties(ws_graph, workers=workers)
+    config_model_props = get_model_properties(config_model, workers=workers)
     print_model_properties(model_name='ER', properties=er_props)
     print_model_properties(model_name='BA', properties=ba_props)
     print_model_properties(model_name='WS', properties=ws_props)
@@ -101,45 +204,78 @@ def calculate_difference(real_props: list, model_props: list):
     return diameter_diff, clustering_diff, path_diff
 
 
-def compare_graphs(graph):
+def graph_comparison(graph, models: Dict[str, Any], workers: int = 1, instrumentation=None) -> Dict[str, Dict[str, Any]]:
+    """
+    Compares a network with random models, per component for the distances.
+
+    Args:
+        graph: The network.
+        models (Dict[str, Any]): Model graphs by name.
+        workers (int): Processes of the distance sweeps.
+        instrumentation: Times the ``analysis.clustering`` and ``analysis.distances`` steps, optional.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: For ``edges``, ``average_clustering``,
+        ``average_shortest_path_length`` and ``diameter``, the value of every graph by name;
+        the network's components are named ``My network 0``, ``My network 1``, ...
+    """
+    comparison = {'edges': {'My network': graph.number_of_edges()}, 'average_clustering': {},
+                  'average_shortest_path_length': {}, 'diameter': {}}
+    for name, model in models.items():
+        comparison['edges'][name] = model.number_of_edges()
+
+    with _span(instrumentation, 'analysis.clustering'):
+        comparison['average_clustering']['My network'] = clustering_stats(graph).average_clustering
+        for name, model in models.items():
+            comparison['average_clustering'][name] = clustering_stats(model).average_clustering
+
+    with _span(instrumentation, 'analysis.distances'):
+        distances = {f'My network {i}': component
+                     for i, component in enumerate(component_distance_metrics(graph, workers=workers))}
+        for name, model in models.items():
+            distances[name] = distance_metrics(model, workers=workers)
+    for name, metrics in distances.items():
+        comparison['average_shortest_path_length'][name] = metrics['average_shortest_path_length']
+        comparison['diameter'][name] = metrics['diameter']
+    return comparison
+
+
+def print_graph_comparison(comparison: Dict[str, Dict[str, Any]]) -> None:
+    titles = {
+        'edges': "Compare the number of edges",
+        'average_clustering': "Compare average clustering coefficients",
+        'average_shortest_path_length': "Compare average path length",
+        'diameter': "Compare graph diameter",
+    }
+    for metric, title in titles.items():
+        print(" ")
+        print(title)
+        print(" ")
+        for name, value in comparison[metric].items():
+            print(f"{name}: " + str(value))
+
+
+def compare_graphs(graph, workers: int = 1, verbose: bool = True, instrumentation=None,
+                   return_comparison: bool = False):
+    """
+    Generates ER, BA and small-world models of the network's size and compares them
+    with it (see ``graph_comparison``); ``verbose`` also prints the comparison.
+
+    Returns:
+        Tuple: The ER, BA and small-world graphs as ``nx.Graph``, followed by the
+        comparison dictionary if ``return_comparison`` is set.
+    """
     n = nx.number_of_nodes(graph)
     m = nx.number_of_edges(graph)
     k = np.mean([v for k, v in graph.degree()])
-    erdos = nx.erdos_renyi_graph(n, p=m / float(n * (n - 1) / 2))
-    barabasi = nx.barabasi_albert_graph(n, m=int(k) - 7)
-    small_world = nx.watts_strogatz_graph(n, int(k), p=0.04)
-    print(" ")
-    print("Compare the number of edges")
-    print(" ")
-    print("My network: " + str(nx.number_of_edges(graph)))
-    print("Erdos: " + str(nx.number_of_edges(erdos)))
-    print("Barabasi: " + str(nx.number_of_edges(barabasi)))
-    print("SW: " + str(nx.number_of_edges(small_world)))
-    print(" ")
-    print("Compare average clustering coefficients")
-    print(" ")
-    print("My network: " + str(nx.average_clustering(graph)))
-    print("Erdos: " + str(nx.average_clustering(erdos)))
-    print("Barabasi: " + str(nx.average_clustering(barabasi)))
-    print("SW: " + str(nx.average_clustering(small_world)))
-    print(" ")
-    print("Compare average path length")
-    print(" ")
-    for i, c in enumerate(nx.connected_components(graph)):
-        conn_g = graph.subgraph(c)
-        print(f'My network {i}: ' + str(nx.average_shortest_path_length(conn_g)))
-    print("Erdos: " + str(nx.average_shortest_path_length(erdos)))
-    print("Barabasi: " + str(nx.average_shortest_path_length(barabasi)))
-    print("SW: " + str(nx.average_shortest_path_length(small_world)))
-    print(" ")
-    print("Compare graph diameter")
-    print(" ")
-    for i, c in enumerate(nx.connected_components(graph)):
-        conn_g = graph.subgraph(c)
-        print(f'My network {i}: ' + str(nx.diameter(conn_g)))
-    print("Erdos: " + str(nx.diameter(erdos)))
-    print("Barabasi: " + str(nx.diameter(barabasi)))
-    print("SW: " + str(nx.diameter(small_world)))
-
-
-    return erdos, barabasi, small_world
+    with _span(instrumentation, 'analysis.models'):
+        erdos = erdos_renyi_graph(n, p=m / float(n * (n - 1) / 2))
+        barabasi = barabasi_albert_graph(n, m=int(k) - 7)
+        small_world = watts_strogatz_graph(n, int(k), p=0.04)
+    comparison = graph_comparison(graph, {"Erdos": erdos, "Barabasi": barabasi, "SW": small_world},
+                                  workers=workers, instrumentation=instrumentation)
+    if verbose:
+        print_graph_comparison(comparison)
+    # the models are generated and compared as CSRGraph, callers get networkx graphs as before
+    models = (erdos.to_networkx(), barabasi.to_networkx(), small_world.to_networkx())
+    return (*models, comparison) if return_comparison else models
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# code/ and scripts/ modules import their siblings by plain name; the stdlib
+# `code` module is already imported by pytest, so code/ is not used as a package
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
@@ -0,0 +1,36 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from distances import approximate_distance_metrics, diameter_bounds
+from graph_csr import as_csr
+
+
+def random_connected_graphs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    produced = 0
+    while produced < count:
+        n = int(rng.integers(2, 40))
+        G = nx.gnp_random_graph(n, float(rng.uniform(0.05, 0.5)), seed=int(rng.integers(2 ** 31)))
+        G = G.subgraph(max(nx.connected_components(G), key=len)).copy()
+        if G.number_of_nodes() > 1:
+            produced += 1
+            yield G
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 7, 64])
+def test_diameter_bounds_exact_without_budget(batch_size):
+    for G in random_connected_graphs(400, seed=batch_size):
+        lower, upper = diameter_bounds(as_csr(G), batch_size=batch_size)
+        assert lower == upper == nx.diameter(G)
+
+
+def test_approximate_distance_metrics_bounds():
+    G = nx.connected_watts_strogatz_graph(400, 6, 0.1, seed=1)
+    metrics = approximate_distance_metrics(G, relative_error=0.01, seed=0)
+    low, high = metrics['diameter_bounds']
+    assert low <= nx.diameter(G) <= high
+    assert metrics['radius_upper_bound'] >= nx.radius(G)
+    low, high = metrics['average_shortest_path_length_ci']
+    assert low <= metrics['average_shortest_path_length'] <= high
+    assert metrics['average_shortest_path_length'] == pytest.approx(nx.average_shortest_path_length(G), rel=0.05)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from bfs_crawler import BFSCrawler, IntIdSet, _merge_counts, load_edges
+from crawler import ConcurrentCrawler
+from vk_stub_server import StubVKServer, generate_friendships
+
+FRIENDSHIPS = generate_friendships(300, avg_friends=8, seed=4)
+
+
+def _crawl(tmp_path, depth, max_nodes=None, chunk_size=1000, batch_size=25):
+    path = str(tmp_path / 'edges.bin')
+    with StubVKServer(FRIENDSHIPS, requests_per_second=1000) as server:
+        crawler = ConcurrentCrawler('token', requests_per_second=1000, batch_size=batch_size, api_url=server.url)
+        stats = BFSCrawler(crawler, depth=depth, max_nodes=max_nodes, chunk_size=chunk_size).crawl('1', path)
+        requests = server.request_count
+    return stats, load_edges(path), requests
+
+
+def _undirected(edges):
+    return [frozenset(edge) for edge in edges.tolist()]
+
+
+def test_int_id_set_and_merge_counts():
+    ids = IntIdSet()
+    ids.update(np.array([5, 3, 9]))
+    ids.update(np.array([3, 12]))
+    assert len(ids) == 4 and 9 in ids and 4 not in ids
+    np.testing.assert_array_equal(ids.contains(np.array([12, 13, 3])), [True, False, True])
+    merged_ids, merged_counts = _merge_counts(np.array([2, 7]), np.array([1, 2]), np.array([7, 7, 1]))
+    np.testing.assert_array_equal(merged_ids, [1, 2, 7])
+    np.testing.assert_array_equal(merged_counts, [1, 1, 4])
+
+
+def test_depth_one_writes_the_seed_edges(tmp_path):
+    stats, edges, requests = _crawl(tmp_path, depth=1)
+    assert stats == {'nodes_fetched': 1, 'nodes_seen': 1, 'edges_written': len(FRIENDSHIPS[1]), 'depth_reached': 1}
+    assert edges.dtype == np.int64 and sorted(edges[:, 1].tolist()) == FRIENDSHIPS[1]
+    assert set(edges[:, 0].tolist()) == {1} and requests == 1
+
+
+@pytest.mark.parametrize('chunk_size', [3, 1000])
+def test_depth_two_writes_every_edge_once(tmp_path, chunk_size):
+    stats, edges, _ = _crawl(tmp_path, depth=2, chunk_size=chunk_size)
+    expanded = [1] + FRIENDSHIPS[1]
+    expected = {frozenset((user, friend)) for user in expanded for friend in FRIENDSHIPS[user]}
+    written = _undirected(edges)
+    assert len(written) == len(set(written)) == stats['edges_written']
+    assert set(written) == expected
+    assert stats['nodes_fetched'] == len(expanded) and stats['depth_reached'] == 2
+    # users of the last level are not queued, so they are not counted as seen
+    assert stats['nodes_seen'] == len(expanded)
+
+
+def test_budget_stops_the_crawl(tmp_path):
+    stats, edges, requests = _crawl(tmp_path, depth=3, max_nodes=20, batch_size=5)
+    assert stats['nodes_fetched'] == 20
+    # one partly filled batch per level at most beyond the 20 users
+    assert requests <= 20 // 5 + stats['depth_reached']
+    assert set(edges[:, 0].tolist()) <= set(FRIENDSHIPS) and len(set(edges[:, 0].tolist())) == 20
+    written = _undirected(edges)
+    assert len(written) == len(set(written))
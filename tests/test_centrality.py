@@ -0,0 +1,79 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from centrality import (betweenness_centrality, centrality, closeness_centrality, degree_centrality,
+                        eigenvector_centrality, pagerank, sampled_betweenness)
+from metrics_cache import metrics_cache
+
+GRAPHS = [
+    nx.Graph(nx.karate_club_graph().edges()),
+    nx.gnp_random_graph(120, 0.04, seed=1),
+    nx.barabasi_albert_graph(300, 2, seed=2),
+]
+
+
+def values(mapping, G):
+    return np.array([mapping[node] for node in G])
+
+
+@pytest.mark.parametrize('G', GRAPHS)
+def test_degree_and_closeness_match_networkx(G):
+    np.testing.assert_allclose(degree_centrality(G), values(nx.degree_centrality(G), G))
+    np.testing.assert_allclose(closeness_centrality(G), values(nx.closeness_centrality(G), G))
+
+
+@pytest.mark.parametrize('G', GRAPHS)
+def test_pagerank_matches_networkx(G):
+    np.testing.assert_allclose(pagerank(G, tol=1e-10), values(nx.pagerank(G, tol=1e-10), G), atol=1e-8)
+
+
+def test_eigenvector_matches_networkx():
+    G = GRAPHS[0]
+    np.testing.assert_allclose(eigenvector_centrality(G, tol=1e-10),
+                               values(nx.eigenvector_centrality(G, tol=1e-10), G), atol=1e-5)
+
+
+@pytest.mark.parametrize('G', GRAPHS)
+@pytest.mark.parametrize('normalized', [True, False])
+def test_betweenness_matches_networkx(G, normalized):
+    np.testing.assert_allclose(betweenness_centrality(G, normalized=normalized, batch_size=16),
+                               values(nx.betweenness_centrality(G, normalized=normalized), G), atol=1e-9)
+
+
+def test_sampled_betweenness_within_error():
+    G = nx.barabasi_albert_graph(1500, 2, seed=3)
+    estimate = sampled_betweenness(G, epsilon=0.1, delta=0.1, seed=0)
+    assert estimate.samples < G.number_of_nodes()
+    exact = betweenness_centrality(G)
+    assert np.abs(estimate.values - exact).max() <= estimate.epsilon
+
+
+def test_sampled_betweenness_is_exact_when_all_sources_fit():
+    G = GRAPHS[2]
+    estimate = sampled_betweenness(G, epsilon=0.05, delta=0.1, seed=0)
+    assert estimate.epsilon == 0.0
+    np.testing.assert_allclose(estimate.values, values(nx.betweenness_centrality(G), G), atol=1e-12)
+
+
+def test_centrality_pairs_use_node_ids():
+    G = nx.relabel_nodes(GRAPHS[0], lambda node: f'id{node}')
+    pairs = dict(centrality(G, 'degree'))
+    assert pairs == pytest.approx(nx.degree_centrality(G))
+
+
+def test_process_pool_matches_networkx_on_disconnected_graph():
+    G = nx.disjoint_union(nx.barabasi_albert_graph(150, 2, seed=4), nx.cycle_graph(20))
+    # the cache ignores ``workers``, so every call has to compute
+    metrics_cache.clear()
+    np.testing.assert_allclose(closeness_centrality(G, workers=2, batch_size=16),
+                               values(nx.closeness_centrality(G), G))
+    metrics_cache.clear()
+    np.testing.assert_allclose(betweenness_centrality(G, workers=2, batch_size=16),
+                               values(nx.betweenness_centrality(G), G), atol=1e-9)
+    metrics_cache.clear()
+
+
+def test_unknown_centrality_is_rejected():
+    with pytest.raises(ValueError, match='Unknown centrality'):
+        centrality(GRAPHS[0], 'katz')
@@ -0,0 +1,98 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from communities import (attach_communities, community_summary, detect_communities, label_propagation_communities,
+                         louvain_communities, modularity)
+from metrics_cache import metrics_cache
+from node_table import node_table
+
+
+def partition(labels, G):
+    nodes = list(G)
+    return [{nodes[i] for i in np.flatnonzero(labels == label)} for label in np.unique(labels)]
+
+
+GRAPHS = [
+    nx.Graph(nx.karate_club_graph().edges()),
+    nx.planted_partition_graph(6, 40, 0.3, 0.01, seed=1),
+    nx.barabasi_albert_graph(1000, 3, seed=2),
+]
+
+
+@pytest.mark.parametrize('G', GRAPHS)
+@pytest.mark.parametrize('resolution', [0.5, 1.0, 2.0])
+def test_modularity_matches_networkx(G, resolution):
+    labels = louvain_communities(G, resolution=resolution)
+    assert modularity(G, labels, resolution=resolution) == pytest.approx(
+        nx.community.modularity(G, partition(labels, G), resolution=resolution))
+
+
+@pytest.mark.parametrize('G', GRAPHS)
+def test_louvain_is_as_good_as_networkx(G):
+    labels = louvain_communities(G, seed=0)
+    reference = nx.community.modularity(G, nx.community.louvain_communities(G, seed=0))
+    assert modularity(G, labels) >= reference - 0.02
+    # largest community first, and every community is connected
+    sizes = np.bincount(labels)
+    assert np.all(np.diff(sizes) <= 0)
+    assert all(nx.is_connected(G.subgraph(community)) for community in partition(labels, G))
+
+
+def test_louvain_recovers_planted_partition():
+    G = GRAPHS[1]
+    labels = louvain_communities(G)
+    planted = {node: node // 40 for node in G}
+    for community in partition(labels, G):
+        assert len({planted[node] for node in community}) == 1
+
+
+def test_label_propagation_finds_planted_partition():
+    G = GRAPHS[1]
+    labels = label_propagation_communities(G, seed=0)
+    assert modularity(G, labels) > 0.6
+    assert detect_communities(G, 'label_propagation', seed=0).tolist() == labels.tolist()
+    with pytest.raises(ValueError):
+        detect_communities(G, 'unknown')
+
+
+def test_partitions_are_cached_until_the_graph_changes():
+    G = nx.Graph(GRAPHS[1])
+    metrics_cache.clear()
+    labels = louvain_communities(G)
+    assert louvain_communities(G) is labels
+    assert louvain_communities(G, resolution=2.0) is not labels
+    G.remove_edges_from(list(G.edges(0)))
+    assert louvain_communities(G) is not labels
+    metrics_cache.clear()
+
+
+def test_attach_communities_feeds_the_node_table():
+    G = nx.Graph(GRAPHS[0])
+    labels = detect_communities(G)
+    attach_communities(G, labels)
+    assert [G.nodes[node]['community'] for node in G] == labels.tolist()
+    table = node_table(G)
+    np.testing.assert_array_equal(table.columns['community'], labels)
+    np.testing.assert_array_equal(table.where(community=0), np.flatnonzero(labels == 0))
+
+
+def test_community_summary_matches_networkx():
+    G = GRAPHS[0]
+    labels = louvain_communities(G)
+    summary = community_summary(G, labels)
+    for label, community in enumerate(partition(labels, G)):
+        subgraph = G.subgraph(community)
+        row = summary.loc[label]
+        assert row['size'] == len(community)
+        assert row['internal_edges'] == subgraph.number_of_edges()
+        assert row['cut_edges'] == nx.cut_size(G, community)
+        assert row['density'] == pytest.approx(nx.density(subgraph))
+        assert row['clustering'] == pytest.approx(nx.average_clustering(subgraph))
+
+
+def test_community_summary_of_edgeless_graph():
+    G = nx.empty_graph(3)
+    summary = community_summary(G, np.arange(3))
+    assert summary['size'].tolist() == [1, 1, 1]
+    assert summary['internal_edges'].sum() == 0 and summary['cut_edges'].sum() == 0
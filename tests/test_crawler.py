@@ -0,0 +1,155 @@
+import time
+
+import pytest
+
+from crawler import (ConcurrentCrawler, TokenBucket, build_friends_execute_code,
+                     fetch_friends_of_each_friend_concurrent, request_friends_ids_batch)
+from get_friends import VKAPIError
+from instrumentation import RETRIES, Instrumentation, JSONMetricsSink
+from response_cache import FRIENDS_IDS, ResponseCache
+from vk_stub_server import StubVKServer, generate_friendships
+
+FRIENDSHIPS = generate_friendships(100, avg_friends=12, seed=1)
+
+
+def expected(user_id):
+    return [str(friend) for friend in FRIENDSHIPS[int(user_id)]]
+
+
+def test_execute_code_limits_calls():
+    assert build_friends_execute_code(['1', '2']).count('API.friends.get') == 2
+    with pytest.raises(ValueError):
+        build_friends_execute_code([str(user_id) for user_id in range(26)])
+
+
+def test_batch_returns_errors_of_failed_sub_calls():
+    with StubVKServer(FRIENDSHIPS, requests_per_second=100, private_users=[3]) as server:
+        results = request_friends_ids_batch(['1', '3', '999', '2'], 'token', api_url=server.url)
+    assert results[0] == expected(1)
+    assert results[3] == expected(2)
+    assert isinstance(results[1], VKAPIError) and results[1].code == 30
+    assert isinstance(results[2], VKAPIError) and results[2].code == 18
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 25])
+def test_fetch_many_matches_friendships(batch_size):
+    users = [str(user_id) for user_id in range(1, 61)]
+    with StubVKServer(FRIENDSHIPS, requests_per_second=1000) as server:
+        results = ConcurrentCrawler('token', requests_per_second=1000, batch_size=batch_size,
+                                    api_url=server.url).fetch_many(users)
+        assert server.request_count == -(-len(users) // batch_size)
+    assert results == {user: expected(user) for user in users}
+
+
+def test_profile_errors_are_not_retried_but_cached(tmp_path):
+    users = ['1', '2', '3', '999']
+    with StubVKServer(FRIENDSHIPS, requests_per_second=1000, private_users=[3]) as server, \
+            ResponseCache(str(tmp_path / 'cache.db')) as cache:
+        results = ConcurrentCrawler('token', requests_per_second=1000, batch_size=25, api_url=server.url,
+                                    cache=cache).fetch_many(users)
+        assert server.request_count == 1
+        assert cache.get(FRIENDS_IDS, '3') == [] and cache.get(FRIENDS_IDS, '999') == []
+    assert results == {'1': expected(1), '2': expected(2), '3': [], '999': []}
+
+
+def test_transient_sub_call_errors_are_retried_and_not_cached(tmp_path):
+    users = [str(user_id) for user_id in range(1, 11)]
+    with StubVKServer(FRIENDSHIPS, requests_per_second=1000, flaky_users={2: 1, 5: 10}) as server, \
+            ResponseCache(str(tmp_path / 'cache.db')) as cache:
+        crawler = ConcurrentCrawler('token', requests_per_second=1000, batch_size=25, max_retries=3,
+                                    api_url=server.url, cache=cache)
+        results = crawler.fetch_many(users)
+        # one request for all, one retrying users 2 and 5, two more for user 5
+        assert server.request_count == 4
+        assert cache.missing(FRIENDS_IDS, users) == ['5']
+    assert results['2'] == expected(2)
+    assert isinstance(results['5'], VKAPIError) and results['5'].code == 10
+    assert all(results[user] == expected(user) for user in users if user != '5')
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=50)
+    start = time.monotonic()
+    waits = [bucket.acquire() for _ in range(11)]
+    assert time.monotonic() - start >= 10 / 50 * 0.95
+    assert waits[0] == 0.0 and sum(waits) > 0
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_crawler_below_quota_is_never_rate_limited():
+    users = [str(user_id) for user_id in range(1, 31)]
+    with StubVKServer(FRIENDSHIPS, requests_per_second=20) as server:
+        start = time.monotonic()
+        results = ConcurrentCrawler('token', requests_per_second=15, api_url=server.url).fetch_many(users)
+        elapsed = time.monotonic() - start
+        assert server.rate_limited_count == 0
+    assert elapsed >= (len(users) - 1) / 15 * 0.95
+    assert results == {user: expected(user) for user in users}
+
+
+def test_rate_limited_requests_are_retried():
+    users = [str(user_id) for user_id in range(1, 21)]
+    instrumentation = Instrumentation()
+    with StubVKServer(FRIENDSHIPS, requests_per_second=5) as server:
+        crawler = ConcurrentCrawler('token', requests_per_second=1000, max_retries=1000, api_url=server.url,
+                                    instrumentation=instrumentation)
+        results = crawler.fetch_many(users)
+        assert server.rate_limited_count > 0
+        assert instrumentation.counter(RETRIES) == server.rate_limited_count
+    assert results == {user: expected(user) for user in users}
+
+
+def test_rate_limit_errors_after_the_last_retry_are_returned():
+    users = [str(user_id) for user_id in range(1, 11)]
+    with StubVKServer(FRIENDSHIPS, requests_per_second=2) as server:
+        results = ConcurrentCrawler('token', requests_per_second=1000, max_retries=0,
+                                    api_url=server.url).fetch_many(users)
+    errors = [result for result in results.values() if isinstance(result, VKAPIError)]
+    assert errors and all(error.code == 6 for error in errors)
+    assert all(results[user] == expected(user) for user in users if not isinstance(results[user], VKAPIError))
+
+
+@pytest.mark.parametrize('batch_size', [1, 25])
+def test_fetch_friends_of_each_friend_concurrent(batch_size):
+    with StubVKServer(FRIENDSHIPS, requests_per_second=1000, private_users=[FRIENDSHIPS[1][0]]) as server:
+        friends = fetch_friends_of_each_friend_concurrent('1', 'token', requests_per_second=1000,
+                                                          batch_size=batch_size, api_url=server.url)
+    assert [friend['id'] for friend in friends] == FRIENDSHIPS[1]
+    for friend in friends:
+        friends_ids = [] if friend['id'] == FRIENDSHIPS[1][0] else expected(friend['id'])
+        assert friend['friends_ids'] == friends_ids
+        assert friend['friends_count'] == len(friends_ids)
+
+
+@pytest.mark.parametrize('batch_size', [1, 5])
+def test_invalid_token_stops_the_crawl(tmp_path, batch_size):
+    users = [str(user_id) for user_id in range(1, 61)]
+    recorder = Instrumentation()
+    sink = recorder.add_sink(JSONMetricsSink(str(tmp_path / 'metrics.json')))
+    with StubVKServer(FRIENDSHIPS, requests_per_second=1000, access_tokens=['valid']) as server:
+        crawler = ConcurrentCrawler('invalid', requests_per_second=1000, max_workers=4, batch_size=batch_size,
+                                    api_url=server.url, instrumentation=recorder)
+        with pytest.raises(VKAPIError) as error:
+            crawler.fetch_many(users)
+        assert error.value.code == 5
+        # only the requests already in flight reach the server
+        assert server.request_count <= crawler.max_workers
+        assert [event['code'] for event in sink.events if event['name'] == 'friends_failed'] == [5]
+
+        # the crawler keeps refusing without asking the API again
+        requests_before = server.request_count
+        with pytest.raises(VKAPIError):
+            crawler.fetch_many(users[:3])
+        assert server.request_count == requests_before
+
+
+def test_invalid_token_stops_fetch_friends_of_each_friend_concurrent():
+    with StubVKServer(FRIENDSHIPS, requests_per_second=1000, access_tokens=['valid']) as server:
+        with pytest.raises(VKAPIError) as error:
+            fetch_friends_of_each_friend_concurrent('1', 'invalid', requests_per_second=1000, api_url=server.url)
+        assert error.value.code == 5
+        assert server.request_count == 1
@@ -0,0 +1,68 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from degree_stats import (DegreeCounter, degree_histogram, fit_power_law, power_law_gof, sample_power_law,
+                          streaming_degree_histogram)
+from get_friends import save_graph_binary
+
+# VK-like IDs, no isolated nodes so that edge lists hold every node
+G = nx.relabel_nodes(nx.barabasi_albert_graph(500, 3, seed=2), lambda node: 10 ** 8 + 37 * node)
+EXPECTED = nx.degree_histogram(G)
+
+
+def _edges():
+    return np.array(list(G.edges()), dtype=np.int64)
+
+
+def test_streaming_histogram_of_a_binary_graph(tmp_path):
+    save_graph_binary(G, str(tmp_path))
+    for chunk_size in (7, 1 << 22):
+        np.testing.assert_array_equal(streaming_degree_histogram(str(tmp_path), chunk_size=chunk_size), EXPECTED)
+
+
+def test_streaming_histogram_of_edge_list_files(tmp_path):
+    text = str(tmp_path / 'edges.txt')
+    with open(text, 'w') as file:
+        file.write('# source target\n')
+    with open(text, 'ab') as file:
+        nx.write_edgelist(G, file, data=False)
+    npy = str(tmp_path / 'edges.npy')
+    np.save(npy, _edges())
+    for path in (text, npy):
+        np.testing.assert_array_equal(streaming_degree_histogram(path, chunk_size=100), EXPECTED)
+
+
+def test_streaming_histogram_of_chunks():
+    edges = _edges()
+    chunks = ((chunk[:, 0], chunk[:, 1]) for chunk in np.array_split(edges, 9))
+    np.testing.assert_array_equal(streaming_degree_histogram(chunks), EXPECTED)
+
+
+def test_degree_counter_counts_isolated_nodes_and_self_loops():
+    counter = DegreeCounter()
+    counter.update(np.array([5, 5]), np.array([9, 5]))
+    np.testing.assert_array_equal(counter.histogram(number_of_nodes=4), [2, 1, 0, 1])
+    np.testing.assert_array_equal(degree_histogram([0, 2, 2]), [1, 0, 2])
+
+
+def test_fit_power_law_recovers_alpha_and_xmin():
+    rng = np.random.default_rng(1)
+    tail = sample_power_law(2.5, 4, 20000, rng)
+    assert tail.min() == 4
+    # a flat body below xmin, which the scan has to leave out
+    histogram = degree_histogram(np.concatenate([tail, rng.integers(1, 4, size=8000)]))
+    fit = fit_power_law(histogram)
+    assert fit.xmin == 4 and fit.n_tail == 20000
+    assert fit.alpha == pytest.approx(2.5, abs=3 * fit.sigma)
+    assert fit_power_law(histogram, xmin=4) == fit
+
+
+def test_power_law_gof_is_a_probability():
+    rng = np.random.default_rng(3)
+    histogram = degree_histogram(sample_power_law(2.2, 2, 3000, rng))
+    p_value = power_law_gof(histogram, n_bootstrap=10, workers=1, scan_xmin=False)
+    assert 0.0 <= p_value <= 1.0
+    assert power_law_gof(histogram, n_bootstrap=10, workers=2, scan_xmin=False) == p_value
+    # degrees concentrated around 20 are no power law
+    assert power_law_gof(degree_histogram(rng.poisson(20, 3000)), n_bootstrap=10, workers=1) < 0.1
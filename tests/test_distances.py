@@ -0,0 +1,77 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from distances import bfs_sweep, component_distance_metrics, distance_metrics, parallel_bfs_sweep
+from metrics_cache import metrics_cache
+from utils_for_analysis import get_network_summary, get_nodes_degree, network_summary
+
+
+def test_distance_metrics_match_networkx():
+    for seed in range(50):
+        G = nx.connected_watts_strogatz_graph(int(10 + seed), 4, 0.3, seed=seed)
+        metrics = distance_metrics(G)
+        assert metrics['diameter'] == nx.diameter(G)
+        assert metrics['radius'] == nx.radius(G)
+        assert metrics['average_shortest_path_length'] == pytest.approx(nx.average_shortest_path_length(G))
+
+
+def test_distance_histogram_counts_ordered_pairs():
+    G = nx.karate_club_graph()
+    histogram = distance_metrics(G)['histogram']
+    expected = np.bincount([d for _, lengths in nx.all_pairs_shortest_path_length(G) for d in lengths.values()])
+    np.testing.assert_array_equal(histogram, expected)
+
+
+def test_component_distance_metrics_per_component():
+    G = nx.disjoint_union(nx.path_graph(5), nx.cycle_graph(8))
+    components = component_distance_metrics(G)
+    assert sorted(component['diameter'] for component in components) == [4, 4]
+    assert sorted(component['average_shortest_path_length'] for component in components) == pytest.approx(
+        sorted(nx.average_shortest_path_length(G.subgraph(c)) for c in nx.connected_components(G)))
+
+
+
+def test_parallel_sweep_matches_serial_sweep():
+    G = nx.disjoint_union(nx.barabasi_albert_graph(400, 2, seed=5), nx.path_graph(50))
+    G.add_nodes_from(range(450, 455))
+    serial = bfs_sweep(G, batch_size=16)
+    parallel = parallel_bfs_sweep(G, workers=2, batch_size=16)
+    for name in serial._fields:
+        np.testing.assert_array_equal(getattr(parallel, name), getattr(serial, name))
+
+    sources = np.arange(3, 455, 7)
+    np.testing.assert_array_equal(parallel_bfs_sweep(G, sources=sources, workers=2, batch_size=8).histogram,
+                                  bfs_sweep(G, sources=sources).histogram)
+
+
+def test_distance_metrics_do_not_depend_on_workers():
+    G = nx.connected_watts_strogatz_graph(300, 6, 0.1, seed=2)
+    # the cache ignores ``workers``, so both runs have to compute
+    metrics_cache.clear()
+    serial = distance_metrics(G, batch_size=16)
+    metrics_cache.clear()
+    parallel = distance_metrics(G, batch_size=16, workers=2)
+    metrics_cache.clear()
+    for name, value in serial.items():
+        np.testing.assert_array_equal(parallel[name], value)
+
+
+def test_network_summary_matches_networkx_on_the_largest_component():
+    G = nx.disjoint_union(nx.connected_watts_strogatz_graph(60, 4, 0.2, seed=3), nx.path_graph(30))
+    largest = G.subgraph(max(nx.connected_components(G), key=len))
+    summary = network_summary(G)
+    assert summary['diameter'] == nx.diameter(largest)
+    assert summary['radius'] == nx.radius(largest)
+    assert summary['average_shortest_path_length'] == pytest.approx(nx.average_shortest_path_length(largest))
+    expected = np.bincount([d for _, lengths in nx.all_pairs_shortest_path_length(G) for d in lengths.values()])
+    np.testing.assert_array_equal(summary['shortest_paths'], expected)
+
+
+def test_network_summary_of_edgeless_graph():
+    G = nx.empty_graph(3)
+    np.testing.assert_array_equal(get_nodes_degree(G), [0, 0, 0])
+    local_ccs, shortest_paths, degrees, params = get_network_summary(G, verbose=False)
+    assert local_ccs == [0.0, 0.0, 0.0] and params is None
+    np.testing.assert_array_equal(shortest_paths, [3])
+    np.testing.assert_array_equal(degrees, [0, 0, 0])
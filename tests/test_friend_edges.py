@@ -0,0 +1,93 @@
+import random
+
+import networkx as nx
+
+from get_friends import build_friend_edges, create_friends_network_graph
+
+
+def _merged(friends):
+    """One record per ID with the union of its ``friends_ids``, in order of first appearance."""
+    merged = {}
+    for friend in friends:
+        record = merged.setdefault(str(friend['id']), {'id': str(friend['id']), 'friends_ids': []})
+        record['friends_ids'] += friend.get('friends_ids', [])
+    return list(merged.values())
+
+
+def _pairwise_mutual(friends):
+    """The pairwise scan ``create_friends_network_graph`` used before the indexed build."""
+    G = nx.Graph()
+    G.add_nodes_from(str(friend['id']) for friend in friends)
+    for i, friend1 in enumerate(friends):
+        for friend2 in friends[i + 1:]:
+            friend1_id, friend2_id = str(friend1['id']), str(friend2['id'])
+            if friend2_id in friend1.get('friends_ids', []) and friend1_id in friend2.get('friends_ids', []):
+                G.add_edge(friend1_id, friend2_id)
+    return G
+
+
+def _either_side(friends):
+    """The per-edge loop ``create_graph_from_json`` used before the indexed build."""
+    G = nx.Graph()
+    G.add_nodes_from(str(friend['id']) for friend in friends)
+    for friend in friends:
+        for other_id in friend.get('friends_ids', []):
+            if G.has_node(other_id):
+                G.add_edge(str(friend['id']), other_id)
+    return G
+
+
+def _edges(node_ids, edges):
+    return {frozenset((node_ids[i], node_ids[j])) for i, j in edges.tolist()}
+
+
+def _random_friends(seed, n=60, duplicates=0):
+    rng = random.Random(seed)
+    ids = [str(100 + i) for i in range(n)]
+    friends = [{'id': int(user_id), 'friends_ids': rng.sample(ids + ['999999'], rng.randint(0, 15))}
+               for user_id in ids]
+    for _ in range(duplicates):
+        friends.append({'id': int(rng.choice(ids)), 'friends_ids': rng.sample(ids, rng.randint(0, 15))})
+    rng.shuffle(friends)
+    return friends
+
+
+def test_matches_the_pairwise_scan_on_unique_ids():
+    for seed in range(5):
+        friends = _random_friends(seed)
+        for reciprocal, reference in ((True, _pairwise_mutual), (False, _either_side)):
+            node_ids, edges = build_friend_edges(friends, reciprocal=reciprocal)
+            expected = reference(friends)
+            assert node_ids == list(expected)
+            assert _edges(node_ids, edges) == {frozenset(edge) for edge in expected.edges()}
+
+
+def test_duplicate_ids_merge_their_friend_lists():
+    for seed in range(5):
+        friends = _random_friends(seed, duplicates=10)
+        for reciprocal, reference in ((True, _pairwise_mutual), (False, _either_side)):
+            node_ids, edges = build_friend_edges(friends, reciprocal=reciprocal)
+            expected = reference(_merged(friends))
+            assert node_ids == list(expected)
+            assert _edges(node_ids, edges) == {frozenset(edge) for edge in expected.edges()}
+
+
+def test_duplicate_records_naming_themselves_give_no_mutual_self_loop():
+    friends = [{'id': 1, 'friends_ids': ['1', '2']}, {'id': 2, 'friends_ids': ['1']}, {'id': 1, 'friends_ids': ['1']}]
+    node_ids, edges = build_friend_edges(friends, reciprocal=True)
+    assert _edges(node_ids, edges) == {frozenset(('1', '2'))}
+    node_ids, edges = build_friend_edges(friends, reciprocal=False)
+    assert _edges(node_ids, edges) == {frozenset(('1', '2')), frozenset(('1',))}
+
+
+def test_network_graph_keeps_one_node_per_friend():
+    friends = [
+        {'id': 1, 'first_name': 'Anna', 'friends_ids': ['2']},
+        {'id': 2, 'first_name': 'Boris', 'friends_ids': []},
+        {'id': 1, 'first_name': 'Anna', 'city': {'title': 'Tver'}, 'friends_ids': []},
+        {'id': 2, 'first_name': 'Boris', 'friends_ids': ['1']},
+    ]
+    G = create_friends_network_graph(friends)
+    assert sorted(G) == ['1', '2']
+    assert G.nodes['1']['city'] == 'Tver'
+    assert list(G.edges()) == [('1', '2')]
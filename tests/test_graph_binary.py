@@ -0,0 +1,18 @@
+import networkx as nx
+import numpy as np
+
+from get_friends import load_graph_arrays, load_graph_binary, save_graph_binary
+from graph_csr import CSRGraph
+
+
+def test_round_trip_keeps_self_loops_out_of_the_csr_arrays(tmp_path):
+    G = nx.Graph([(1, 2), (2, 3), (3, 3), (1, 1)])
+    G.nodes[2]['name'] = 'two'
+    save_graph_binary(G, str(tmp_path))
+    loaded = load_graph_binary(str(tmp_path))
+    assert dict(loaded.nodes(data=True)) == dict(G.nodes(data=True))
+    assert {frozenset(edge) for edge in loaded.edges()} == {frozenset(edge) for edge in G.edges()}
+    csr = CSRGraph(**load_graph_arrays(str(tmp_path)))
+    assert csr.number_of_edges() == 2
+    np.testing.assert_array_equal(csr.degrees(), [1, 2, 1])
+
@@ -0,0 +1,42 @@
+import networkx as nx
+import numpy as np
+
+from graph_csr import CSRGraph, as_csr
+
+
+def test_from_networkx_round_trip():
+    G = nx.karate_club_graph()
+    nx.set_node_attributes(G, {node: f'name{node}' for node in G}, 'name')
+    csr = CSRGraph.from_networkx(G)
+    assert csr.number_of_nodes() == G.number_of_nodes()
+    assert csr.number_of_edges() == G.number_of_edges()
+    np.testing.assert_array_equal(csr.degrees(), [degree for _, degree in G.degree()])
+    back = csr.to_networkx()
+    assert nx.utils.graphs_equal(nx.Graph(back.edges()), nx.Graph(G.edges()))
+    assert back.nodes[3]['name'] == 'name3'
+
+
+def test_from_edges_drops_duplicates_and_self_loops():
+    csr = CSRGraph.from_edges(np.array([0, 1, 1, 2, 2]), np.array([1, 0, 1, 0, 0]), num_nodes=4)
+    assert csr.number_of_edges() == 2
+    np.testing.assert_array_equal(csr.degrees(), [2, 1, 1, 0])
+    sources, targets = csr.edges()
+    assert sorted(zip(sources.tolist(), targets.tolist())) == [(0, 1), (0, 2)]
+
+
+def test_edgeless_graph():
+    csr = CSRGraph.from_edges(np.array([], dtype=np.int64), np.array([], dtype=np.int64), num_nodes=3)
+    assert csr.number_of_nodes() == 3 and csr.number_of_edges() == 0
+    np.testing.assert_array_equal(csr.degrees(), [0, 0, 0])
+    assert csr.connected_components()[0] == 3
+    assert csr.largest_component().number_of_nodes() == 1
+    assert as_csr(nx.empty_graph(3)).number_of_edges() == 0
+    assert CSRGraph.from_edges([1], [1], num_nodes=2).number_of_edges() == 0
+
+
+def test_empty_graph():
+    csr = as_csr(nx.Graph())
+    assert csr.number_of_nodes() == 0 and csr.number_of_edges() == 0
+    assert csr.largest_component().number_of_nodes() == 0
+    assert csr.subgraph(np.array([], dtype=np.int64)).number_of_nodes() == 0
+    assert csr.to_networkx().number_of_nodes() == 0
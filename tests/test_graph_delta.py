@@ -0,0 +1,104 @@
+import json
+import random
+
+import networkx as nx
+
+from get_friends import create_graph_from_json, save_graph_binary
+from graph_delta import IncrementalGraph, apply_delta, diff_graphs, diff_snapshot, refresh_graph
+
+FIRST = [
+    {'id': 1, 'first_name': 'A', 'last_name': 'One', 'friends_ids': ['2', '3', '99']},
+    {'id': 2, 'first_name': 'B', 'last_name': 'Two', 'friends_ids': ['1', '3']},
+    {'id': 3, 'first_name': 'C', 'last_name': 'Three', 'friends_ids': ['1', '4']},
+    {'id': 4, 'first_name': 'D', 'last_name': 'Four', 'friends_ids': []},
+]
+SECOND = [
+    {'id': 1, 'first_name': 'A', 'last_name': 'One', 'friends_ids': ['2', '5']},
+    {'id': 2, 'first_name': 'B', 'last_name': 'Renamed', 'friends_ids': ['1', '3']},
+    {'id': 3, 'first_name': 'C', 'last_name': 'Three', 'friends_ids': ['5']},
+    {'id': 5, 'first_name': 'E', 'last_name': 'Five', 'friends_ids': ['1', '3']},
+]
+
+
+def _write(path, records):
+    path.write_text(json.dumps(records), encoding='utf-8')
+    return str(path)
+
+
+def _same_graph(a, b):
+    return dict(a.nodes(data=True)) == dict(b.nodes(data=True)) and \
+        {frozenset(edge) for edge in a.edges()} == {frozenset(edge) for edge in b.edges()}
+
+
+def _assert_metrics(incremental):
+    graph = incremental.graph
+    assert incremental.degrees == dict(graph.degree())
+    assert incremental.triangles == nx.triangles(graph)
+    components = {}
+    for node, label in incremental.components.items():
+        components.setdefault(label, set()).add(node)
+    assert sorted(map(sorted, components.values())) == sorted(map(sorted, nx.connected_components(graph)))
+
+
+def test_diff_snapshot_and_apply_delta_match_a_rebuild(tmp_path):
+    graph = create_graph_from_json(_write(tmp_path / 'first.json', FIRST))
+    second = _write(tmp_path / 'second.json', SECOND)
+    delta = diff_snapshot(graph, second)
+    assert list(delta.added_nodes) == ['5'] and delta.removed_nodes == ['4'] and list(delta.changed_nodes) == ['2']
+    assert {frozenset(edge) for edge in delta.removed_edges} == {frozenset(('1', '3')), frozenset(('3', '4'))}
+    apply_delta(graph, delta)
+    assert _same_graph(graph, create_graph_from_json(second))
+    assert diff_snapshot(graph, second).is_empty()
+
+
+def test_diff_graphs_round_trips():
+    old = nx.gnm_random_graph(30, 60, seed=1)
+    new = nx.gnm_random_graph(35, 70, seed=2)
+    new.nodes[3]['name'] = 'changed'
+    updated = old.copy()
+    apply_delta(updated, diff_graphs(old, new))
+    assert _same_graph(updated, new)
+
+
+def test_incremental_graph_metrics_follow_random_edits():
+    rng = random.Random(0)
+    incremental = IncrementalGraph(nx.gnm_random_graph(40, 80, seed=3))
+    for _ in range(300):
+        u, v = rng.randrange(45), rng.randrange(45)
+        action = rng.random()
+        if action < 0.45:
+            incremental.add_edge(u, v)
+        elif action < 0.9:
+            incremental.remove_edge(u, v)
+        else:
+            incremental.remove_node(u)
+    _assert_metrics(incremental)
+
+
+def test_refresh_graph_matches_a_rebuild(tmp_path):
+    directory = str(tmp_path / 'graph')
+    IncrementalGraph(create_graph_from_json(_write(tmp_path / 'first.json', FIRST))).save(directory)
+    second = _write(tmp_path / 'second.json', SECOND)
+    incremental, delta = refresh_graph(directory, second)
+    assert not delta.is_empty()
+    assert _same_graph(incremental.graph, create_graph_from_json(second))
+    _assert_metrics(incremental)
+    reloaded = IncrementalGraph.load(directory)
+    assert _same_graph(reloaded.graph, incremental.graph)
+    assert reloaded.degrees == incremental.degrees and reloaded.triangles == incremental.triangles
+
+
+def test_load_recomputes_metrics_of_another_graph(tmp_path):
+    IncrementalGraph(nx.path_graph(4)).save(str(tmp_path))
+    save_graph_binary(nx.complete_graph(4), str(tmp_path))
+    loaded = IncrementalGraph.load(str(tmp_path))
+    assert loaded.degrees == {node: 3 for node in range(4)}
+    assert loaded.triangles == {node: 3 for node in range(4)}
+
+
+def test_incremental_graph_keeps_self_loops_and_their_metrics(tmp_path):
+    incremental = IncrementalGraph(nx.Graph([('1', '2'), ('2', '2')]))
+    incremental.save(str(tmp_path))
+    loaded = IncrementalGraph.load(str(tmp_path))
+    assert loaded.graph.has_edge('2', '2')
+    assert loaded.degrees == dict(loaded.graph.degree()) == {'1': 1, '2': 3}
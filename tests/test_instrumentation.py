@@ -0,0 +1,40 @@
+import networkx as nx
+
+from get_friends import save_graph, save_graph_binary
+from instrumentation import Instrumentation, JSONMetricsSink, instrumentation
+from utils_for_analysis import compare_graphs, get_nodes_degree
+
+
+def test_saving_is_reported_as_events(tmp_path, capsys):
+    sink = instrumentation.add_sink(JSONMetricsSink(str(tmp_path / 'metrics.json')))
+    try:
+        G = nx.path_graph(['1', '2', '3'])
+        save_graph(G, str(tmp_path / 'graph.gml'))
+        save_graph_binary(G, str(tmp_path / 'graph'))
+    finally:
+        instrumentation.remove_sink(sink)
+    assert capsys.readouterr().out == ''
+    assert [(event['name'], event['nodes'], event['edges']) for event in sink.events] == [('graph_saved', 3, 2)] * 2
+
+
+def test_compare_graphs_returns_the_comparison_without_printing(capsys):
+    G = nx.barabasi_albert_graph(200, 5, seed=0)
+    recorder = Instrumentation()
+    *models, comparison = compare_graphs(G, verbose=False, instrumentation=recorder, return_comparison=True)
+    assert capsys.readouterr().out == ''
+    assert len(models) == 3 and all(isinstance(model, nx.Graph) for model in models)
+    assert comparison['edges'] == {'My network': G.number_of_edges(), 'Erdos': models[0].number_of_edges(),
+                                   'Barabasi': models[1].number_of_edges(), 'SW': models[2].number_of_edges()}
+    assert set(comparison['diameter']) == {'My network 0', 'Erdos', 'Barabasi', 'SW'}
+    assert {'analysis.models', 'analysis.clustering', 'analysis.distances'} <= set(recorder.metrics()['spans'])
+    erdos, barabasi, small_world = compare_graphs(nx.barabasi_albert_graph(100, 5, seed=1), verbose=False)
+    assert small_world.number_of_nodes() == 100
+
+
+def test_get_nodes_degree_reports_an_event(tmp_path, capsys):
+    recorder = Instrumentation()
+    sink = recorder.add_sink(JSONMetricsSink(str(tmp_path / 'metrics.json')))
+    get_nodes_degree(nx.star_graph(4), instrumentation=recorder)
+    assert capsys.readouterr().out == ''
+    assert [(event['name'], event['max_degree'], event['mean_degree']) for event in sink.events] == \
+        [('node_degrees', 4, 1.6)]
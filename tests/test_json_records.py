@@ -0,0 +1,73 @@
+import json
+import random
+
+import networkx as nx
+import pytest
+
+from get_friends import create_graph_from_json, friend_node_attributes, iter_json_records, save_to_json, save_to_jsonl
+
+RECORDS = [12345, {'id': 1, 'friends_ids': ['2', '3']}, -0.25e10, 'text', True, None, [1, 22, 333], 678]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8, 1 << 16])
+def test_values_split_across_chunks_are_decoded_whole(tmp_path, chunk_size):
+    path = tmp_path / 'records.json'
+    path.write_text(json.dumps(RECORDS), encoding='utf-8')
+    assert list(iter_json_records(str(path), chunk_size=chunk_size)) == RECORDS
+
+
+def test_json_lines_and_invalid_files(tmp_path):
+    lines = tmp_path / 'records.jsonl'
+    lines.write_text('\n'.join(json.dumps(record) for record in RECORDS) + '\n', encoding='utf-8')
+    assert list(iter_json_records(str(lines))) == RECORDS
+    not_array = tmp_path / 'object.json'
+    not_array.write_text('{"id": 1}', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_records(str(not_array)))
+    truncated = tmp_path / 'truncated.json'
+    truncated.write_text('[1, 2, {"id"', encoding='utf-8')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records(str(truncated), chunk_size=4))
+
+
+def _friends(count=80, seed=0):
+    rng = random.Random(seed)
+    ids = list(range(100, 100 + count))
+    for user_id in ids:
+        yield {
+            'id': user_id,
+            'first_name': rng.choice(['Анна', 'Борис', 'Zoë']),
+            'last_name': 'Иванов',
+            'sex': rng.choice([1, 2, 0]),
+            'city': {'id': 2, 'title': 'Санкт-Петербург'} if rng.random() < 0.5 else None,
+            'bdate': '1.1.1990',
+            'friends_count': rng.randint(0, 20),
+            'friends_ids': [str(friend) for friend in rng.sample(ids + [1, 2], rng.randint(0, 12))],
+        }
+
+
+def _in_memory_graph(friends):
+    G = nx.Graph()
+    for friend in friends:
+        friend_id, attributes = friend_node_attributes(friend)
+        G.add_node(friend_id, **attributes)
+    for friend in friends:
+        for other_id in friend['friends_ids']:
+            if other_id in G:
+                G.add_edge(str(friend['id']), other_id)
+    return G
+
+
+@pytest.mark.parametrize('suffix', ['jsonl', 'json'])
+def test_saved_friends_build_the_same_graph(tmp_path, suffix):
+    friends = list(_friends())
+    path = str(tmp_path / f'friends.{suffix}')
+    if suffix == 'jsonl':
+        save_to_jsonl(_friends(), path)
+    else:
+        save_to_json(friends, path)
+    assert list(iter_json_records(path, chunk_size=7)) == friends
+
+    G, expected = create_graph_from_json(path), _in_memory_graph(friends)
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert {frozenset(edge) for edge in G.edges()} == {frozenset(edge) for edge in expected.edges()}
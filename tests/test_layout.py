@@ -0,0 +1,49 @@
+import networkx as nx
+import numpy as np
+
+from graph_csr import as_csr
+from layout import LayoutCache, _coarsen, compute_layout, multilevel_layout
+
+
+def _same_layout(a, b):
+    return a.keys() == b.keys() and all(np.allclose(a[node], b[node]) for node in a)
+
+
+def test_initial_with_mostly_new_nodes_is_ignored():
+    G = nx.barabasi_albert_graph(300, 2, seed=1)
+    unrelated = {node + 1000: np.zeros(2) for node in range(300)}
+    unrelated.update({node: np.ones(2) for node in range(10)})
+    assert _same_layout(multilevel_layout(G, seed=0, initial=unrelated), multilevel_layout(G, seed=0))
+
+
+def test_cache_warm_starts_only_from_overlapping_graphs(tmp_path):
+    cache = LayoutCache(str(tmp_path))
+    G = nx.barabasi_albert_graph(300, 2, seed=1)
+    compute_layout(G, cache_dir=str(tmp_path))
+    other = nx.relabel_nodes(nx.barabasi_albert_graph(300, 2, seed=2), lambda node: node + 1000)
+    assert cache.closest(other) is None
+    assert _same_layout(compute_layout(other, cache_dir=str(tmp_path)), multilevel_layout(other, seed=0))
+
+    refreshed = G.copy()
+    refreshed.add_edges_from([(300, 0), (301, 5)])
+    assert cache.closest(refreshed) is not None
+    assert compute_layout(refreshed, cache_dir=str(tmp_path)).keys() == set(refreshed)
+
+
+def test_coarsening_collapses_the_leaves_of_hubs():
+    sources, targets = as_csr(nx.star_graph(200)).edges()
+    coarse, count = _coarsen(201, sources, targets, np.random.default_rng(0))
+    assert count == 1 and np.all(coarse == 0)
+
+
+def test_layout_keeps_neighbours_close():
+    G = nx.grid_2d_graph(30, 30)
+    pos = multilevel_layout(G, seed=0)
+    points = np.array([pos[node] for node in G])
+    index = {node: i for i, node in enumerate(G)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()])
+    edge_lengths = np.linalg.norm(points[edges[:, 0]] - points[edges[:, 1]], axis=1)
+    pairs = np.random.default_rng(0).integers(len(points), size=(5000, 2))
+    distances = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+    # about 1 / 15 for a flat 30 x 30 grid
+    assert np.median(edge_lengths) < 0.1 * np.median(distances)
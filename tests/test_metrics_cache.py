@@ -0,0 +1,62 @@
+import networkx as nx
+import numpy as np
+
+import metrics_cache as cache_module
+from distances import distance_metrics
+from graph_csr import CSRGraph
+from metrics_cache import MetricsCache, graph_fingerprint, memoize_metric, metrics_cache
+from utils_for_analysis import get_largest_component
+
+
+def test_fingerprint_is_computed_once_per_graph_until_it_changes(monkeypatch):
+    hashed = []
+    hash_csr = cache_module._hash_csr
+    monkeypatch.setattr(cache_module, '_hash_csr', lambda csr: hashed.append(csr) or hash_csr(csr))
+    G = nx.path_graph(5)
+    first = graph_fingerprint(G)
+    assert graph_fingerprint(G) == first and len(hashed) == 1
+    G.add_edge(4, 0)
+    assert graph_fingerprint(G) != first and len(hashed) == 2
+    assert graph_fingerprint(nx.path_graph(5)) == first
+    assert graph_fingerprint(CSRGraph.from_networkx(nx.path_graph(5))) == first
+
+
+def test_memoized_metric_gets_the_same_csr_on_every_call():
+    seen = []
+
+    @memoize_metric()
+    def number_of_nodes(G, offset=0):
+        seen.append(G)
+        return G.number_of_nodes() + offset
+
+    metrics_cache.clear()
+    G = nx.cycle_graph(6)
+    assert number_of_nodes(G) == number_of_nodes(G) == 6
+    assert number_of_nodes(G, offset=1) == 7
+    assert len(seen) == 2 and isinstance(seen[0], CSRGraph) and seen[0] is seen[1]
+
+
+def test_edge_swaps_keeping_the_counts_are_noticed():
+    G = nx.path_graph(6)
+    assert distance_metrics(G)['diameter'] == 5
+    first = graph_fingerprint(G)
+    G.remove_edges_from([(4, 5), (2, 3)])
+    G.add_edges_from([(0, 5), (0, 3)])
+    assert graph_fingerprint(G) != first
+    assert distance_metrics(G)['diameter'] == nx.diameter(G) == 4
+
+    H = nx.path_graph(6)
+    assert get_largest_component(H).number_of_nodes() == 6
+    H.remove_edge(2, 3)
+    H.add_edge(0, 2)
+    assert get_largest_component(H).number_of_nodes() == 3
+
+
+def test_memory_is_bounded_by_bytes():
+    cache = MetricsCache(max_bytes=10_000)
+    for key in range(5):
+        cache.get_or_compute(key, lambda: np.zeros(500))
+    assert cache.nbytes <= 10_000
+    assert cache.get_or_compute(4, lambda: None) is not None and cache.get_or_compute(0, lambda: None) is None
+    assert cache.get_or_compute('large', lambda: np.zeros(5000)) is not None
+    assert 'large' not in cache._entries and cache.nbytes <= 10_000
@@ -0,0 +1,89 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_csr import CSRGraph
+from node_table import NodeTable, attribute_frame, node_table
+from plot_utils import create_df_with_param
+
+
+def _graph(ids):
+    g = nx.Graph()
+    for vk_id in ids:
+        g.add_node(str(vk_id), vk_id=vk_id, name=f'user{vk_id}', bdate='1.1.2000', friends_count=vk_id % 7)
+    g.add_edges_from(zip(list(g)[:-1], list(g)[1:]))
+    return g
+
+
+def test_node_table_is_rebuilt_when_nodes_are_replaced():
+    g = _graph(range(1, 6))
+    assert node_table(g) is node_table(g)
+    assert sorted(node_table(g).vk_ids.tolist()) == [1, 2, 3, 4, 5]
+    g.remove_node('5')
+    g.add_node('9', vk_id=9, name='user9')
+    assert sorted(node_table(g).vk_ids.tolist()) == [1, 2, 3, 4, 9]
+
+
+def test_attribute_frame_keeps_every_attribute():
+    g = _graph(range(1, 6))
+    frame = create_df_with_param(g)
+    assert sorted(frame.columns) == ['bdate', 'friends_count', 'name']
+    assert frame.index.name == 'vk_id'
+    assert frame.loc[3, 'friends_count'] == 3
+    csr_frame = attribute_frame(CSRGraph.from_networkx(g))
+    assert sorted(csr_frame.columns) == sorted(frame.columns)
+    assert np.array_equal(csr_frame.index.to_numpy(), frame.index.to_numpy())
+
+
+def _table():
+    g = _graph(range(1, 7))
+    for node, sex, city in zip(g, [1, 2, 1, 0, 2, 1], ['Tver', 'Kazan', 'Moscow', 'Tver', None, 'Kazan']):
+        g.nodes[node]['sex'] = sex
+        if city is not None:
+            g.nodes[node]['city'] = {'id': 1, 'title': city}
+    return NodeTable.from_graph(g)
+
+
+def test_add_metric_from_array_or_pairs():
+    table = _table()
+    values = np.arange(6, dtype=float)
+    assert table.add_metric('rank', values) is values
+    column = table.add_metric('score', [('3', 0.5), (5, 2.0), ('999', 7.0), ('not an id', 1.0)])
+    np.testing.assert_array_equal(column, [np.nan, np.nan, 0.5, np.nan, 2.0, np.nan])
+    assert table.columns['score'] is column
+    with pytest.raises(ValueError):
+        table.add_metric('short', np.zeros(3))
+
+
+def test_where_combines_conditions():
+    table = _table()
+    table.add_metric('score', np.array([0.1, 0.9, 0.4, np.nan, 0.7, 0.2]))
+    assert table.where(sex='female').tolist() == [0, 2, 5]
+    assert table.where(city_title={'Tver', 'Kazan'}).tolist() == [0, 1, 3, 5]
+    assert table.where(sex='female', city_title=['Kazan']).tolist() == [5]
+    assert table.where(score=lambda column: column > 0.3).tolist() == [1, 2, 4]
+    assert table.where(vk_id={2, 6}).tolist() == [1, 5]
+    assert table.where(city_title='Omsk').tolist() == []
+
+
+def test_top_ranks_largest_first_with_nan_last():
+    table = _table()
+    table.add_metric('score', np.array([0.1, 0.9, 0.4, np.nan, 0.7, 0.2]))
+    assert table.top('score', 3).tolist() == [1, 4, 2]
+    assert table.top('score', -1).tolist() == [1, 4, 2, 5, 0, 3]
+    assert table.top('score', 0).tolist() == []
+    assert table.top('score', 2, rows=table.where(sex='female')).tolist() == [2, 5]
+    frame = table.frame(table.top('score', 2), ['name', 'score', 'missing'])
+    assert frame.index.tolist() == [2, 5] and list(frame.columns) == ['name', 'score']
+
+
+def test_attribute_edits_need_a_refresh():
+    g = _graph(range(1, 6))
+    table = node_table(g)
+    table.add_metric('score', np.ones(5))
+    g.nodes['2']['name'] = 'renamed'
+    assert node_table(g) is table and table.columns['name'][1] == 'user2'
+    refreshed = node_table(g, refresh=True)
+    assert refreshed is not table and refreshed.columns['name'][1] == 'renamed'
+    assert 'score' not in refreshed.columns
+    assert node_table(g) is refreshed
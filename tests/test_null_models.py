@@ -0,0 +1,54 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from null_models import (PROPERTIES, RunningStats, generate_model, model_parameters, replica_seeds,
+                         run_null_model_ensemble)
+from utils_for_analysis import get_model_properties
+
+G = nx.barabasi_albert_graph(60, 3, seed=0)
+MODELS = ('ER', 'WS')
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(0).normal(3.0, 2.0, size=25)
+    stats = RunningStats()
+    for value in values:
+        stats.add(float(value))
+    summary = stats.summary(real_value=1.5)
+    assert summary['mean'] == pytest.approx(values.mean())
+    assert summary['std'] == pytest.approx(values.std(ddof=1))
+    np.testing.assert_allclose([summary['q5'], summary['q50'], summary['q95']],
+                               np.quantile(values, [0.05, 0.5, 0.95]))
+    assert summary['z'] == pytest.approx((1.5 - values.mean()) / values.std(ddof=1))
+    constant = RunningStats()
+    constant.add(2.0)
+    constant.add(2.0)
+    assert np.isnan(constant.summary(1.0)['z'])
+
+
+def test_ensemble_does_not_depend_on_the_number_of_workers():
+    serial = run_null_model_ensemble(G, n_replicas=3, models=MODELS, seed=7, workers=1)
+    parallel = run_null_model_ensemble(G, n_replicas=3, models=MODELS, seed=7, workers=2)
+    # z is NaN for properties that do not vary, which assert_equal treats as equal
+    np.testing.assert_equal(serial, parallel)
+    other = run_null_model_ensemble(G, n_replicas=3, models=MODELS, seed=8, workers=1)
+    assert other['ER']['avg_path']['mean'] != serial['ER']['avg_path']['mean']
+
+
+def test_ensemble_z_scores_match_numpy_on_the_replicas():
+    summary = run_null_model_ensemble(G, n_replicas=4, models=MODELS, seed=3, workers=1)
+    params = model_parameters(G)
+    real = dict(zip(PROPERTIES, get_model_properties(G)))
+    replicas = {model: [] for model in MODELS}
+    for model, seed in replica_seeds(3, MODELS, 4):
+        replicas[model].append(get_model_properties(generate_model(model, params, seed)))
+    for model in MODELS:
+        values = np.array(replicas[model], dtype=float)
+        for column, name in enumerate(PROPERTIES):
+            stats = summary[model][name]
+            assert stats['mean'] == pytest.approx(values[:, column].mean())
+            std = values[:, column].std(ddof=1)
+            assert stats['std'] == pytest.approx(std)
+            if std > 0:
+                assert stats['z'] == pytest.approx((real[name] - values[:, column].mean()) / std)
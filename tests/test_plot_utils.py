@@ -0,0 +1,93 @@
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+import pytest
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.image import AxesImage
+
+from plot_utils import create_df_with_param, draw_graph, show_graph
+
+
+def _graph(n=40):
+    g = nx.relabel_nodes(nx.barabasi_albert_graph(n, 2, seed=0), lambda node: str(1000 + node))
+    for node in g:
+        g.nodes[node].update(vk_id=int(node), name=f'user{node}')
+    return g
+
+
+def _positions(g):
+    return nx.circular_layout(g)
+
+
+@pytest.fixture
+def ax():
+    fig, ax = plt.subplots()
+    yield ax
+    plt.close(fig)
+
+
+@pytest.mark.parametrize('render', ['vector', 'raster'])
+def test_edges_are_one_collection(ax, render):
+    g = _graph()
+    draw_graph(g, _positions(g), ax=ax, render=render)
+    edges, = [artist for artist in ax.collections if isinstance(artist, LineCollection)]
+    nodes, = [artist for artist in ax.collections if isinstance(artist, PathCollection)]
+    assert len(edges.get_segments()) == g.number_of_edges()
+    assert len(nodes.get_offsets()) == g.number_of_nodes()
+    assert edges.get_rasterized() == nodes.get_rasterized() == (render == 'raster')
+    assert not ax.images
+
+
+def test_density_draws_edges_as_an_image(ax):
+    g = _graph()
+    draw_graph(g, _positions(g), ax=ax, render='density', density_bins=32)
+    assert not [artist for artist in ax.collections if isinstance(artist, LineCollection)]
+    image, = ax.images
+    assert isinstance(image, AxesImage) and image.get_array().shape == (32, 32)
+    assert image.get_array().max() > 0
+
+
+def test_auto_render_draws_small_graphs_as_vectors(ax):
+    g = _graph()
+    draw_graph(g, _positions(g), ax=ax)
+    assert not ax.images
+    assert not any(artist.get_rasterized() for artist in ax.collections)
+
+
+def test_labels_the_top_nodes(ax):
+    g = _graph()
+    parameter = [(node, float(i)) for i, node in enumerate(g)]
+    draw_graph(g, _positions(g), parameter=parameter, number=5, ax=ax)
+    assert [text.get_text() for text in ax.texts] == [f'user{node}' for node, _ in parameter[::-1][:5]]
+
+
+def test_labels_the_highest_degree_nodes_without_parameter(ax):
+    g = _graph()
+    draw_graph(g, _positions(g), number=3, ax=ax)
+    expected = sorted(g, key=lambda node: -g.degree(node))[:3]
+    assert [text.get_text() for text in ax.texts] == [f'user{node}' for node in expected]
+
+
+@pytest.mark.parametrize('extension', ['png', 'svg'])
+def test_show_graph_writes_the_file_and_closes_the_figure(tmp_path, extension):
+    g = _graph()
+    path = tmp_path / f'graph.{extension}'
+    plt.close('all')
+    parameter = [(node, degree / 10) for node, degree in g.degree()]
+    frame = show_graph(g, parameter, number=4, figsize=(4, 3), save_file=str(path), show=False, layout='spring')
+    assert path.stat().st_size > 0
+    assert plt.get_fignums() == []
+    assert frame['parameter'].tolist() == sorted((value for _, value in parameter), reverse=True)
+
+
+def test_parameter_frame_is_sorted_by_the_parameter():
+    g = _graph(10)
+    parameter = [(node, float(i % 4)) for i, node in enumerate(g)]
+    frame = create_df_with_param(g, parameter, parameter_name='score')
+    assert len(frame) == 10
+    assert np.all(np.diff(frame['score'].to_numpy()) <= 0)
+    assert frame.loc[1001, 'name'] == 'user1001'
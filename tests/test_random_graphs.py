@@ -0,0 +1,74 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from random_graphs import barabasi_albert_graph, configuration_model, erdos_renyi_graph, watts_strogatz_graph
+
+
+def assert_simple(G):
+    sources, targets = G.edges()
+    assert np.all(sources < targets)
+    assert len(set(zip(sources.tolist(), targets.tolist()))) == G.number_of_edges()
+
+
+def test_erdos_renyi_edge_count():
+    n, p = 2000, 0.01
+    counts = [erdos_renyi_graph(n, p, seed=seed).number_of_edges() for seed in range(5)]
+    expected = p * n * (n - 1) / 2
+    assert abs(np.mean(counts) - expected) < 4 * np.sqrt(expected * (1 - p) / len(counts))
+    assert erdos_renyi_graph(10, 0.0).number_of_edges() == 0
+    assert erdos_renyi_graph(10, 1.0).number_of_edges() == 45
+    assert_simple(erdos_renyi_graph(n, p, seed=0))
+
+
+def test_erdos_renyi_is_seeded():
+    first, second = erdos_renyi_graph(300, 0.05, seed=7), erdos_renyi_graph(300, 0.05, seed=7)
+    np.testing.assert_array_equal(first.indices, second.indices)
+
+
+@pytest.mark.parametrize('p', [0.0, 0.05, 0.3])
+def test_sparse_erdos_renyi_draws(p):
+    # small graphs may draw no edge at all
+    for seed in range(300):
+        G = erdos_renyi_graph(6, p, seed=seed)
+        assert G.number_of_nodes() == 6
+        assert G.number_of_edges() <= 15
+        assert_simple(G)
+
+
+@pytest.mark.parametrize('n, m', [(10, 1), (500, 3), (2000, 5)])
+def test_barabasi_albert_matches_networkx_counts(n, m):
+    G = barabasi_albert_graph(n, m, seed=1)
+    assert G.number_of_nodes() == n
+    assert G.number_of_edges() == nx.barabasi_albert_graph(n, m, seed=1).number_of_edges() == (n - m) * m
+    assert G.degrees()[m + 1:].min() >= m
+    assert_simple(G)
+
+
+def test_barabasi_albert_is_heavy_tailed():
+    degrees = barabasi_albert_graph(5000, 3, seed=2).degrees()
+    assert degrees.max() > 10 * np.median(degrees)
+
+
+def test_watts_strogatz_lattice_and_rewiring():
+    lattice = watts_strogatz_graph(30, 4, 0.0, seed=0)
+    assert nx.utils.graphs_equal(lattice.to_networkx(), nx.watts_strogatz_graph(30, 4, 0.0))
+    for p in (0.1, 0.5, 1.0):
+        G = watts_strogatz_graph(500, 6, p, seed=3)
+        assert G.number_of_edges() == 500 * 3
+        assert_simple(G)
+    # nodes joined to everything keep their lattice edges
+    for seed in range(10):
+        G = watts_strogatz_graph(20, 18, 0.9, seed=seed)
+        assert G.number_of_edges() == nx.watts_strogatz_graph(20, 18, 0.9, seed=seed).number_of_edges() == 180
+        assert_simple(G)
+
+
+def test_configuration_model_keeps_degrees_up_to_dropped_edges():
+    degrees = np.array([d for _, d in nx.powerlaw_cluster_graph(1000, 3, 0.1, seed=5).degree()])
+    G = configuration_model(degrees, seed=0)
+    assert np.all(G.degrees() <= degrees)
+    assert G.degrees().sum() >= 0.95 * degrees.sum()
+    assert_simple(G)
+    with pytest.raises(ValueError):
+        configuration_model([1, 2])
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from crawler import ConcurrentCrawler
+from get_friends import VKAPIError
+from response_cache import FRIENDS_IDS, ResponseCache
+from vk_stub_server import StubVKServer, generate_friendships
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with ResponseCache(str(tmp_path / 'cache.db')) as cache:
+        yield cache
+
+
+def test_put_get_and_ttl(tmp_path):
+    with ResponseCache(str(tmp_path / 'cache.db'), ttl=0.2) as cache:
+        cache.put(FRIENDS_IDS, '1', ['2', '3'])
+        assert cache.get(FRIENDS_IDS, '1') == ['2', '3']
+        assert cache.missing(FRIENDS_IDS, ['1', '4']) == ['4']
+        time.sleep(0.3)
+        assert cache.get(FRIENDS_IDS, '1') is None
+        assert cache.missing(FRIENDS_IDS, ['1']) == ['1']
+        assert cache.purge_expired() == 1
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    with ResponseCache(path) as cache:
+        cache.put(FRIENDS_IDS, '1', ['2'])
+    with ResponseCache(path) as cache:
+        assert cache.get(FRIENDS_IDS, '1') == ['2']
+
+
+@pytest.mark.parametrize('batch_size', [1, 5])
+def test_resume_after_token_expiry(cache, batch_size):
+    friendships = generate_friendships(60, avg_friends=10, seed=2)
+    users = [str(user_id) for user_id in range(1, 31)]
+    with StubVKServer(friendships, requests_per_second=1000, access_tokens=['old'], private_users=[7]) as server:
+        crawler = ConcurrentCrawler('old', requests_per_second=1000, batch_size=batch_size, api_url=server.url,
+                                    cache=cache)
+        first = crawler.fetch_many(users[:15])
+        assert all(first[user] == [str(friend) for friend in friendships[int(user)]] for user in first if user != '7')
+        assert first['7'] == []
+
+        # the token expires: the crawl stops and nothing is cached for the users requested with it
+        server.access_tokens.clear()
+        with pytest.raises(VKAPIError) as error:
+            crawler.fetch_many(users[15:])
+        assert error.value.code == 5
+        assert cache.missing(FRIENDS_IDS, users) == users[15:]
+
+        server.access_tokens.add('new')
+        requests_before = server.request_count
+        resumed = ConcurrentCrawler('new', requests_per_second=1000, batch_size=batch_size, api_url=server.url,
+                                    cache=cache).fetch_many(users)
+        assert resumed == {**first, **{user: [str(friend) for friend in friendships[int(user)]]
+                                       for user in users[15:]}}
+        assert server.request_count - requests_before == -(-15 // batch_size)
@@ -0,0 +1,30 @@
+import networkx as nx
+import pytest
+
+from snapshot_store import SnapshotStore
+
+
+def _same_graph(a, b):
+    return dict(a.nodes(data=True)) == dict(b.nodes(data=True)) and \
+        {frozenset(edge) for edge in a.edges()} == {frozenset(edge) for edge in b.edges()}
+
+
+@pytest.mark.parametrize('relabel', [lambda node: node, lambda node: str(node + 100)])
+def test_graph_at_rebuilds_every_snapshot_after_reopening(tmp_path, relabel):
+    first = nx.relabel_nodes(nx.path_graph(5), relabel)
+    for node in first:
+        first.nodes[node]['name'] = f'user {node}'
+    second = first.copy()
+    second.add_edge(relabel(4), relabel(7))
+    second.nodes[relabel(7)]['name'] = 'new'
+    second.nodes[relabel(1)]['name'] = 'renamed'
+    second.remove_node(relabel(0))
+
+    store = SnapshotStore(str(tmp_path))
+    store.add_graph(first, timestamp=1.0)
+    store.add_graph(second, timestamp=2.0)
+    reopened = SnapshotStore(str(tmp_path))
+    assert _same_graph(reopened.graph_at(1.0), first)
+    assert _same_graph(reopened.graph_at(2.0), second)
+    delta = reopened.load_delta(1)
+    assert list(delta.added_nodes) == [relabel(7)] and list(delta.changed_nodes) == [relabel(1)]
@@ -0,0 +1,47 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_csr import as_csr
+from triangles import clustering_stats, triangle_counts
+
+GRAPHS = [
+    nx.karate_club_graph(),
+    nx.gnp_random_graph(150, 0.08, seed=3),
+    nx.powerlaw_cluster_graph(300, 4, 0.5, seed=4),
+    nx.disjoint_union(nx.complete_graph(6), nx.path_graph(4)),
+]
+
+
+@pytest.mark.parametrize('G', GRAPHS)
+def test_triangle_counts_match_networkx(G):
+    triangles = nx.triangles(G)
+    np.testing.assert_array_equal(triangle_counts(G), [triangles[node] for node in G])
+
+
+@pytest.mark.parametrize('G', GRAPHS)
+def test_clustering_matches_networkx(G):
+    stats = clustering_stats(as_csr(G))
+    clustering = nx.clustering(G)
+    np.testing.assert_allclose(stats.local_clustering, [clustering[node] for node in G])
+    assert stats.average_clustering == pytest.approx(nx.average_clustering(G))
+    assert stats.transitivity == pytest.approx(nx.transitivity(G))
+
+
+def test_self_loops_and_isolated_nodes_are_ignored():
+    G = nx.karate_club_graph()
+    G.add_edges_from([(0, 0), (5, 5)])
+    G.add_nodes_from(['isolated', 'alone'])
+    triangles = nx.triangles(G)
+    np.testing.assert_array_equal(triangle_counts(G), [triangles[node] for node in G])
+    stats = clustering_stats(G)
+    clustering = nx.clustering(G)
+    np.testing.assert_allclose(stats.local_clustering, [clustering[node] for node in G])
+    assert stats.average_clustering == pytest.approx(nx.average_clustering(G))
+
+
+def test_graphs_without_triangles():
+    for G in (nx.Graph(), nx.empty_graph(4), nx.star_graph(5)):
+        stats = clustering_stats(G)
+        assert stats.triangles.sum() == 0
+        assert stats.average_clustering == stats.transitivity == 0.0